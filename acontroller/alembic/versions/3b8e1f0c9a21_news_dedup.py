@@ -0,0 +1,34 @@
+"""add: news near-duplicate detection
+
+Revision ID: 3b8e1f0c9a21
+Revises: e7f943bcd257
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8e1f0c9a21'
+down_revision: Union[str, None] = 'e7f943bcd257'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('news', sa.Column('canonical_id', sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_news_canonical_id'), 'news', ['canonical_id'], unique=False)
+    op.create_table('news_signatures',
+    sa.Column('article_id', sa.Integer(), nullable=False),
+    sa.Column('signature', sa.LargeBinary(), nullable=False),
+    sa.PrimaryKeyConstraint('article_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('news_signatures')
+    op.drop_index(op.f('ix_news_canonical_id'), table_name='news')
+    op.drop_column('news', 'canonical_id')
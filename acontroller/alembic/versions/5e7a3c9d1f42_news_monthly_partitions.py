@@ -0,0 +1,95 @@
+"""add: monthly range partitioning of news
+
+Revision ID: 5e7a3c9d1f42
+Revises: 9c4d2a7e5b13
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e7a3c9d1f42'
+down_revision: Union[str, None] = '9c4d2a7e5b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE news RENAME TO news_unpartitioned")
+    # The id sequence would be dropped together with the old table
+    op.execute("ALTER SEQUENCE news_id_seq OWNED BY NONE")
+    # timestamptz like the model and news_keys, stored timestamps are UTC
+    op.execute(
+        "ALTER TABLE news_unpartitioned ALTER COLUMN publication_datetime "
+        "TYPE timestamp with time zone USING publication_datetime AT TIME ZONE 'UTC'"
+    )
+    op.execute(
+        "CREATE TABLE news (LIKE news_unpartitioned INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (publication_datetime)"
+    )
+    # Partitions of the months present in the data, the current and next 3 months.
+    # Later months are created by the application (services/partitions.py)
+    op.execute("""
+        DO $$
+        DECLARE
+            month date;
+        BEGIN
+            FOR month IN
+                SELECT date_trunc('month', publication_datetime)::date FROM news_unpartitioned
+                UNION
+                SELECT generate_series(
+                    date_trunc('month', now()), date_trunc('month', now()) + interval '3 months',
+                    interval '1 month'
+                )::date
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF news FOR VALUES FROM (%L) TO (%L)',
+                    'news_y' || to_char(month, 'YYYY') || 'm' || to_char(month, 'MM'),
+                    month, (month + interval '1 month')::date
+                );
+            END LOOP;
+        END $$;
+    """)
+    op.execute("CREATE TABLE news_default PARTITION OF news DEFAULT")
+
+    op.execute("INSERT INTO news SELECT * FROM news_unpartitioned")
+    op.drop_table('news_unpartitioned')
+    op.execute("ALTER SEQUENCE news_id_seq OWNED BY news.id")
+
+    # Unique constraints of a partitioned table must include the partition key
+    op.create_primary_key('news_pkey', 'news', ['id', 'publication_datetime'])
+    op.create_unique_constraint(
+        'news_news_id_publication_datetime_key', 'news', ['news_id', 'publication_datetime']
+    )
+    op.create_unique_constraint(
+        'news_url_publication_datetime_key', 'news', ['url', 'publication_datetime']
+    )
+    op.create_index(op.f('ix_news_id'), 'news', ['id'], unique=False)
+    op.create_index(op.f('ix_news_canonical_id'), 'news', ['canonical_id'], unique=False)
+    op.create_index(
+        op.f('ix_news_publication_datetime'), 'news', ['publication_datetime'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE news RENAME TO news_partitioned")
+    op.execute("ALTER SEQUENCE news_id_seq OWNED BY NONE")
+    op.execute("CREATE TABLE news (LIKE news_partitioned INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO news SELECT * FROM news_partitioned")
+    op.execute(
+        "ALTER TABLE news ALTER COLUMN publication_datetime "
+        "TYPE timestamp without time zone USING publication_datetime AT TIME ZONE 'UTC'"
+    )
+    # Drops the attached partitions too, detached months are kept as standalone tables
+    op.drop_table('news_partitioned')
+    op.execute("ALTER SEQUENCE news_id_seq OWNED BY news.id")
+
+    op.create_primary_key('news_pkey', 'news', ['id'])
+    op.create_unique_constraint('news_news_id_key', 'news', ['news_id'])
+    op.create_unique_constraint('news_url_key', 'news', ['url'])
+    op.create_index(op.f('ix_news_id'), 'news', ['id'], unique=False)
+    op.create_index(op.f('ix_news_canonical_id'), 'news', ['canonical_id'], unique=False)
@@ -0,0 +1,42 @@
+"""add: news content hash for idempotent upserts
+
+Revision ID: 9c4d2a7e5b13
+Revises: 3b8e1f0c9a21
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4d2a7e5b13'
+down_revision: Union[str, None] = '3b8e1f0c9a21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Databases created by init_db() (metadata.create_all) already have these constraints
+UNIQUE_CONSTRAINTS = {'news_news_id_key': 'news_id', 'news_url_key': 'url'}
+
+
+def upgrade() -> None:
+    # Existing rows keep NULL and are re-embedded once on their next upsert
+    op.add_column('news', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    for name, column in UNIQUE_CONSTRAINTS.items():
+        op.execute(f"""
+            DO $$
+            BEGIN
+                IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = '{name}') THEN
+                    ALTER TABLE news ADD CONSTRAINT {name} UNIQUE ({column});
+                END IF;
+            END $$;
+        """)
+
+
+def downgrade() -> None:
+    for name in reversed(list(UNIQUE_CONSTRAINTS)):
+        op.execute(f"ALTER TABLE news DROP CONSTRAINT IF EXISTS {name}")
+    op.drop_column('news', 'content_hash')
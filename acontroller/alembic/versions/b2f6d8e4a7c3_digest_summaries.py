@@ -0,0 +1,36 @@
+"""add: cached news summaries for digests
+
+Revision ID: b2f6d8e4a7c3
+Revises: 5e7a3c9d1f42
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2f6d8e4a7c3'
+down_revision: Union[str, None] = '5e7a3c9d1f42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('news_summaries',
+    sa.Column('article_id', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=True),
+    sa.Column('summary', sa.Text(), nullable=False),
+    sa.Column('model', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('article_id')
+    )
+    # Generated digests are not uploaded anywhere yet
+    op.alter_column('digests', 's3_url', existing_type=sa.String(), nullable=True)
+
+
+def downgrade() -> None:
+    op.alter_column('digests', 's3_url', existing_type=sa.String(), nullable=False)
+    op.drop_table('news_summaries')
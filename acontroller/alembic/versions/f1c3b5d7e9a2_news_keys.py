@@ -0,0 +1,43 @@
+"""add: global news_id / url keys of partitioned news
+
+Revision ID: f1c3b5d7e9a2
+Revises: d4a9e1c7b8f6
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c3b5d7e9a2'
+down_revision: Union[str, None] = 'd4a9e1c7b8f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('news_keys',
+    sa.Column('news_id', sa.String(), nullable=False),
+    sa.Column('url', sa.String(), nullable=False),
+    sa.Column('article_id', sa.Integer(), nullable=False),
+    sa.Column('publication_datetime', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('news_id'),
+    sa.UniqueConstraint('url')
+    )
+    op.create_index(op.f('ix_news_keys_article_id'), 'news_keys', ['article_id'], unique=False)
+    # Rows re-inserted since partitioning under a new publication_datetime: the latest one wins
+    op.execute("""
+        INSERT INTO news_keys (news_id, url, article_id, publication_datetime)
+        SELECT news_id, url, id, publication_datetime
+        FROM news
+        ORDER BY publication_datetime DESC, id DESC
+        ON CONFLICT DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_news_keys_article_id'), table_name='news_keys')
+    op.drop_table('news_keys')
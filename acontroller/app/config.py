@@ -10,12 +10,19 @@ class Settings(BaseSettings):
     DB_POOL_RECYCLE: int = 3600  # 1 hour
     DB_POOL_TIMEOUT: int = 30
 
+    # Optional streaming replica for read-only endpoints, falls back to DATABASE_URL if unhealthy
+    READ_REPLICA_DATABASE_URL: Optional[str] = None
+    READ_REPLICA_HEALTH_CHECK_INTERVAL: int = 10  # seconds
+    READ_REPLICA_CONNECT_TIMEOUT: int = 5  # seconds
+    READ_REPLICA_MAX_LAG_SECONDS: Optional[float] = None  # replay lag above which the replica is skipped
+
     POSTGRES_PASSWORD: Optional[str] = None
     POSTGRES_DB: Optional[str] = None
 
     # RAG / Vector DB
     QDRANT_URL: str = "http://localhost:6333"
     QDRANT_PORT: Optional[int] = 6333
+    EMBEDDER_BACKEND: Optional[str] = None  # overrides embedding_model.backend of public_config.yaml
 
     # Backend URL (self)
     ARTICLE_CONTROLLER_BACKEND_URL: Optional[str] = None
@@ -23,6 +30,21 @@ class Settings(BaseSettings):
     # OpenAI / LLM
     OPENAI_API_KEY: Optional[str] = None
 
+    # Admission control: concurrency limit and bounded wait queue per expensive endpoint,
+    # requests beyond that get 429 (queue full) or 503 (queue timeout) with Retry-After
+    VECTORS_MAX_CONCURRENCY: int = 8  # per /vectors endpoint
+    VECTORS_MAX_QUEUE: int = 32
+    VECTORS_QUEUE_TIMEOUT: float = 10  # seconds
+    # Digests are built by the search job workers (POST /digests), at most this many at once
+    DIGESTS_MAX_CONCURRENCY: int = 2
+
+    # Admin / profiling
+    ADMIN_API_TOKEN: Optional[str] = None
+    PROFILING_ENABLED: bool = False  # capture profiles of slow requests
+    PROFILING_SLOW_REQUEST_MS: int = 5000
+    PROFILING_BUFFER_SIZE: int = 50
+    PROFILING_SAMPLE_INTERVAL_MS: int = 5
+
     class Config:
         env_file = ".env"
 
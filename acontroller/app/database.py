@@ -1,19 +1,61 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from time import perf_counter
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from typing import AsyncGenerator
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from typing import AsyncGenerator, AsyncIterator, Optional
 from acontroller.app.config import settings
+from acontroller.app.utils.metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_WAIT,
+    DB_REPLICA_HEALTHY,
+    record_request_stage,
+)
 # from common.common import news
 from acontroller.app.models.base import Base
 
-__all__ = ["engine", "AsyncSessionLocal", "get_db"]
+__all__ = [
+    "engine", "read_engine", "replica_health",
+    "AsyncSessionLocal", "AsyncReadSessionLocal", "get_db", "get_read_db", "read_session",
+    "replication_lag_bound",
+]
+
+logger = logging.getLogger(__name__)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Connection pool measuring how long callers wait for a connection.
+    """
+    engine_name = "primary"
+
+    def connect(self):
+        start = perf_counter()
+        try:
+            return super().connect()
+        finally:
+            elapsed = perf_counter() - start
+            DB_POOL_WAIT.labels(self.engine_name).observe(elapsed)
+            record_request_stage("db_pool_wait", elapsed)
+
+
+class ReplicaTimedQueuePool(TimedQueuePool):
+    engine_name = "replica"
+
 
 engine = create_async_engine(
     settings.DATABASE_URL,
+    poolclass=TimedQueuePool,
     pool_size=settings.DB_POOL_SIZE,
     max_overflow=settings.DB_MAX_OVERFLOW,
     pool_recycle=settings.DB_POOL_RECYCLE,
     pool_timeout=settings.DB_POOL_TIMEOUT,
 )
+DB_POOL_CHECKED_OUT.labels("primary").set_function(lambda: engine.pool.checkedout())
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
@@ -22,6 +64,89 @@ AsyncSessionLocal = sessionmaker(
     autoflush=True,
 )
 
+read_engine: Optional[AsyncEngine] = None
+AsyncReadSessionLocal = None
+if settings.READ_REPLICA_DATABASE_URL:
+    read_engine = create_async_engine(
+        settings.READ_REPLICA_DATABASE_URL,
+        poolclass=ReplicaTimedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        # Fail over to the primary quickly instead of waiting for the default connect timeout
+        connect_args={"timeout": settings.READ_REPLICA_CONNECT_TIMEOUT},
+    )
+    DB_POOL_CHECKED_OUT.labels("replica").set_function(lambda: read_engine.pool.checkedout())
+    AsyncReadSessionLocal = sessionmaker(
+        bind=read_engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autoflush=True,
+    )
+
+
+class ReplicaHealth:
+    """
+    Health of the read replica: periodically checked, and marked unhealthy as soon as
+    a connection fails, so read-only queries fall back to the primary until the next
+    successful check.
+    """
+
+    # Replay lag of a standby, 0 on a primary
+    LAG_QUERY = text(
+        "SELECT CASE WHEN pg_is_in_recovery() "
+        "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+        "ELSE 0 END"
+    )
+
+    def __init__(self, engine: Optional[AsyncEngine], max_lag_seconds: Optional[float] = None):
+        """
+        :param engine: Engine of the replica, None if no replica is configured
+        :param max_lag_seconds: Replay lag above which the replica is considered unhealthy
+        """
+        self.engine = engine
+        self.max_lag_seconds = max_lag_seconds
+        self.healthy = engine is not None
+        self.lag_seconds: Optional[float] = None
+        DB_REPLICA_HEALTHY.set(self.healthy)
+
+    @property
+    def available(self) -> bool:
+        return self.engine is not None and self.healthy
+
+    def set_healthy(self, healthy: bool, reason: str = ""):
+        if healthy != self.healthy:
+            if healthy:
+                logger.info("Read replica is healthy, routing read-only queries to it")
+            else:
+                logger.warning(f"Read replica is unhealthy, falling back to the primary: {reason}")
+        self.healthy = healthy
+        DB_REPLICA_HEALTHY.set(healthy)
+
+    async def check(self):
+        if self.engine is None:
+            return
+        try:
+            async with self.engine.connect() as conn:
+                self.lag_seconds = float(
+                    await asyncio.wait_for(
+                        conn.scalar(self.LAG_QUERY), settings.READ_REPLICA_CONNECT_TIMEOUT
+                    )
+                )
+        except (OSError, DBAPIError, asyncio.TimeoutError) as e:
+            self.set_healthy(False, str(e) or type(e).__name__)
+            return
+
+        if self.max_lag_seconds is not None and self.lag_seconds > self.max_lag_seconds:
+            self.set_healthy(False, f"replication lag {self.lag_seconds:.1f}s")
+        else:
+            self.set_healthy(True)
+
+
+replica_health = ReplicaHealth(read_engine, settings.READ_REPLICA_MAX_LAG_SECONDS)
+
+
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         try:
@@ -29,6 +154,58 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         finally:
             await session.close()
 
+
+async def open_read_session() -> AsyncSession:
+    """
+    Session of the read replica if it is available, otherwise of the primary.
+    """
+    if replica_health.available:
+        session = AsyncReadSessionLocal()
+        try:
+            # Connect eagerly so a failing replica is detected before the route runs
+            await session.connection()
+            return session
+        except (OSError, DBAPIError) as e:
+            await session.close()
+            replica_health.set_healthy(False, str(e) or type(e).__name__)
+    return AsyncSessionLocal()
+
+
+@asynccontextmanager
+async def read_session() -> AsyncIterator[AsyncSession]:
+    """
+    Read-only session opened only when needed, e.g. after a cache check.
+    Writes made just before may not be visible yet if the replica lags behind the primary.
+    """
+    session = await open_read_session()
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+def replication_lag_bound(session: AsyncSession) -> Optional[float]:
+    """
+    Upper bound of how far the data seen by the session may lag behind the primary.
+    The replica is skipped once a check finds a lag above READ_REPLICA_MAX_LAG_SECONDS,
+    the lag grows by at most the time until the next check.
+
+    :return: 0 for the primary, None if the lag of the replica is not bounded
+    """
+    if read_engine is None or session.bind is not read_engine:
+        return 0.0
+    if replica_health.max_lag_seconds is None:
+        return None
+    return replica_health.max_lag_seconds + settings.READ_REPLICA_HEALTH_CHECK_INTERVAL
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session for read-only endpoints, see read_session.
+    """
+    async with read_session() as session:
+        yield session
+
 async def init_db():
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+        await conn.run_sync(Base.metadata.create_all)
@@ -1,17 +1,45 @@
+import asyncio
 import os
 from contextlib import asynccontextmanager
 from pathlib import Path
 
 import yaml
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import select
 # from numpy.f2py.crackfortran import publicpattern
 
 from acontroller.app.config import settings
-from acontroller.app.routes import news, vectors, science
+from acontroller.app.models.news_article import NewsArticle
+from acontroller.app.routes import admin, digests, jobs, news, vectors, science
 from acontroller.app.services.rag import TextEmbedder, CommonRAG, OpenAILLM
-from acontroller.app.database import engine
+from acontroller.app.services.actual_feed import ActualFeed
+from acontroller.app.services.dedup import NearDuplicateIndex
+from acontroller.app.services.digest import DigestBuilder
+from acontroller.app.services.jobs import SearchJobQueue
+from acontroller.app.services.partitions import MonthlyPartitions
+from acontroller.app.services.rate_limiter import OpenAIRateLimiter
+from acontroller.app.database import AsyncSessionLocal, engine, read_engine, read_session, replica_health
 from acontroller.app.database import init_db
+from acontroller.app.utils.metrics import (
+    CONTENT_TYPE_LATEST,
+    ServerTimingMiddleware,
+    generate_latest,
+)
+from acontroller.app.utils.http_cache import ListingCache
+from acontroller.app.utils.admission import AdmissionLimiter
+from acontroller.app.utils.deadline import LatencyBudget
+from acontroller.app.utils.periodic import run_periodically
+from acontroller.app.utils.single_flight import SingleFlight
+from acontroller.app.utils.profiling import ProfilingMiddleware, RequestProfiler
+
+request_profiler = RequestProfiler(
+    admin_token=settings.ADMIN_API_TOKEN,
+    enabled=settings.PROFILING_ENABLED,
+    slow_request_ms=settings.PROFILING_SLOW_REQUEST_MS,
+    buffer_size=settings.PROFILING_BUFFER_SIZE,
+    sample_interval_ms=settings.PROFILING_SAMPLE_INTERVAL_MS,
+)
 
 
 @asynccontextmanager
@@ -22,6 +50,12 @@ async def lifespan(app: FastAPI):
     with open(config_path) as f:
         public_config = yaml.safe_load(f)
 
+    # Shared budget of all OpenAI calls of the process
+    app.state.rate_limiter = OpenAIRateLimiter(public_config["rate_limits"])
+    embedder_backend = (
+        settings.EMBEDDER_BACKEND or public_config["embedding_model"]["backend"]
+    )
+
     app.state.news_embedder = TextEmbedder(
         qdrant_url=settings.QDRANT_URL,
         embedding_model_name=public_config["embedding_model"]["name"],
@@ -32,6 +66,12 @@ async def lifespan(app: FastAPI):
         default_top_k=public_config["rag_search"]["default_top_k"],
         max_top_k=public_config["rag_search"]["max_top_k"],
         qdrant_port=int(os.environ.get("QDRANT_PORT", 6333)),
+        batch_window_ms=public_config["embedding_model"]["batch_window_ms"],
+        batch_max_size=public_config["embedding_model"]["batch_max_size"],
+        rate_limiter=app.state.rate_limiter,
+        embedder_backend=embedder_backend,
+        tiering=public_config["rag_search"]["news_tiering"],
+        matryoshka=public_config["rag_search"]["matryoshka"],
     )
     app.state.science_embedder = TextEmbedder(
         qdrant_url=settings.QDRANT_URL,
@@ -43,18 +83,129 @@ async def lifespan(app: FastAPI):
         default_top_k=public_config["rag_search"]["default_top_k"],
         max_top_k=public_config["rag_search"]["max_top_k"],
         qdrant_port=int(os.environ.get("QDRANT_PORT", 6333)),
+        batch_window_ms=public_config["embedding_model"]["batch_window_ms"],
+        batch_max_size=public_config["embedding_model"]["batch_max_size"],
+        rate_limiter=app.state.rate_limiter,
+        embedder_backend=embedder_backend,
+        matryoshka=public_config["rag_search"]["matryoshka"],
+    )
+    app.state.llm = OpenAILLM(
+        public_config["llm_model"]["name"], rate_limiter=app.state.rate_limiter
     )
-    app.state.llm = OpenAILLM(public_config["llm_model"]["name"])
     app.state.rag = CommonRAG(
         app.state.science_embedder, app.state.news_embedder, app.state.llm
     )
+    app.state.digest_builder = DigestBuilder(
+        app.state.llm, AsyncSessionLocal, **public_config["digest"]
+    )
     await app.state.science_embedder.init_collection()
 
     await app.state.news_embedder.init_collection()
 
     await init_db()
+
+    # Future monthly partitions of news are created ahead of time, checked daily
+    app.state.news_partitions = MonthlyPartitions(
+        "news", months_ahead=public_config["news_partitions"]["months_ahead"]
+    )
+
+    async def ensure_news_partitions():
+        async with AsyncSessionLocal() as session:
+            await app.state.news_partitions.ensure(session)
+
+    await ensure_news_partitions()
+    background_tasks = [
+        asyncio.create_task(run_periodically(
+            public_config["news_partitions"]["check_interval_hours"] * 3600,
+            ensure_news_partitions,
+            "news partitions",
+        )),
+    ]
+    if read_engine is not None:
+        await replica_health.check()
+        background_tasks.append(asyncio.create_task(run_periodically(
+            settings.READ_REPLICA_HEALTH_CHECK_INTERVAL,
+            replica_health.check,
+            "read replica health check",
+        )))
+    # Ranking of /science/actual, offered new articles on ingest and recomputed periodically
+    app.state.actual_feed = ActualFeed(**public_config["actual_feed"])
+
+    async def refresh_actual_feed():
+        async with read_session() as session:
+            await app.state.actual_feed.refresh(session)
+
+    await refresh_actual_feed()
+    background_tasks.append(asyncio.create_task(run_periodically(
+        app.state.actual_feed.refresh_interval_minutes * 60,
+        refresh_actual_feed,
+        "actual feed refresh",
+    )))
+    news_qdrant = app.state.news_embedder.qdrant_manager
+    if news_qdrant.tiering_enabled:
+        async def news_published(ids):
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(
+                    select(NewsArticle.id, NewsArticle.publication_datetime)
+                    .where(NewsArticle.id.in_(ids))
+                )
+                return dict(result.all())
+
+        async def tier_news():
+            # Points stored before tiering get their publication time first, then can be moved
+            await news_qdrant.backfill_published(news_published)
+            await news_qdrant.move_to_cold()
+
+        background_tasks.append(asyncio.create_task(run_periodically(
+            news_qdrant.move_interval.total_seconds(),
+            tier_news,
+            "news tiering",
+            run_at_start=True,
+        )))
+
+    app.state.listing_cache = ListingCache(**public_config["listing_cache"])
+    # Identical concurrent /vectors requests share one computation
+    app.state.vector_single_flight = SingleFlight("vectors")
+    app.state.latency_budget = LatencyBudget(**public_config["latency_budget"])
+    # Calibration of news and science scores merged by /vectors/all
+    app.state.federated_score_floors = public_config["federated_search"]["score_floors"]
+
+    # Background vector searches and digest builds, jobs left running by a previous process are reclaimed
+    app.state.search_jobs = SearchJobQueue(
+        AsyncSessionLocal, jobs.search_job_handler(app), **public_config["search_jobs"]
+    )
+    background_tasks.extend(app.state.search_jobs.start())
+    background_tasks.append(asyncio.create_task(run_periodically(
+        app.state.search_jobs.cleanup_interval_minutes * 60,
+        app.state.search_jobs.cleanup,
+        "search jobs cleanup",
+        run_at_start=True,
+    )))
+
+    # Limits of the expensive endpoints, list routes and /health are not limited
+    app.state.admission = {
+        name: AdmissionLimiter(
+            name,
+            settings.VECTORS_MAX_CONCURRENCY,
+            settings.VECTORS_MAX_QUEUE,
+            settings.VECTORS_QUEUE_TIMEOUT,
+        )
+        for name in ("vectors/science", "vectors/news", "vectors/all")
+    }
+    app.state.news_dedup = NearDuplicateIndex(**public_config["news_dedup"])
+    async with AsyncSessionLocal() as session:
+        await app.state.news_dedup.load(session)
+
+    app.state.profiler = request_profiler
+    request_profiler.start()
     yield
-    engine.dispose()
+    request_profiler.stop()
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await engine.dispose()
+    if read_engine is not None:
+        await read_engine.dispose()
 
 
 app = FastAPI(
@@ -71,13 +222,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "ETag", "Last-Modified", "Retry-After"],
 )
+app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(ProfilingMiddleware, profiler=request_profiler)
 
 app.include_router(news.router, prefix="/api/v1", tags=["news"])
 app.include_router(science.router, prefix="/api/v1", tags=["science"])
 app.include_router(vectors.router, prefix="/api/v1", tags=["vectors"])
+app.include_router(digests.router, prefix="/api/v1", tags=["digests"])
+app.include_router(jobs.router, prefix="/api/v1", tags=["jobs"])
+app.include_router(admin.router, prefix="/api/v1", tags=["admin"])
 
 
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+
+@app.get("/metrics")
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy.dialects.postgresql import ARRAY as PG_ARRAY
+from acontroller.app.models.base import Base
+
+
+class Digest(Base):
+    __tablename__ = "digests"
+
+    id = Column(Integer, primary_key=True)
+    start_datetime = Column(DateTime, nullable=False, index=True)
+    end_datetime = Column(DateTime, nullable=False, index=True)
+    s3_url = Column(String, nullable=True)
+    article_ids = Column(PG_ARRAY(String), nullable=True)
+    title = Column(String, nullable=True)
+    body = Column(String, nullable=False)
+
+    def __repr__(self):
+        return f"<Digest(id='{self.id}', title='{self.title}')>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Integer
+from sqlalchemy import Column, String, DateTime, Integer, UniqueConstraint
 from sqlalchemy.dialects.postgresql import ARRAY as PG_ARRAY
 from sqlalchemy.orm import relationship
 from acontroller.app.models.base import Base
@@ -6,17 +6,31 @@ from acontroller.app.models.base import Base
 
 class NewsArticle(Base):
     __tablename__ = "news"
+    # Range partitioned by month, unique constraints must include the partition key;
+    # news_id and url are globally unique through news_keys (models/news_key.py).
+    # Partitions are created by services/partitions.py
+    __table_args__ = (
+        UniqueConstraint("news_id", "publication_datetime",
+                         name="news_news_id_publication_datetime_key"),
+        UniqueConstraint("url", "publication_datetime",
+                         name="news_url_publication_datetime_key"),
+        {"postgresql_partition_by": "RANGE (publication_datetime)"},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
-    publication_datetime = Column(DateTime(timezone=True), nullable=False)
-    url = Column(String, nullable=False, unique=True)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    publication_datetime = Column(DateTime(timezone=True), primary_key=True, index=True)
+    url = Column(String, nullable=False)
     text = Column(String, nullable=False)
     source_name = Column(String, nullable=False)
-    news_id = Column(String, nullable=False, unique=True)
+    news_id = Column(String, nullable=False)
     tags = Column(PG_ARRAY(String), nullable=True)
     persons = Column(PG_ARRAY(String), nullable=True)
     title = Column(String, nullable=True)
     topic = Column(String, nullable=True)
+    # id of the article this one is a near-duplicate of, duplicates are not embedded
+    canonical_id = Column(Integer, nullable=True, index=True)
+    # sha256 of text, unchanged text of a re-sent article is not embedded again
+    content_hash = Column(String(64), nullable=True)
 
     def __repr__(self):
         return f"<NewsArticle(news_id='{self.news_id}', title='{self.title}')>"
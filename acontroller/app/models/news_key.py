@@ -0,0 +1,20 @@
+from sqlalchemy import Column, DateTime, Integer, String
+from acontroller.app.models.base import Base
+
+
+class NewsKey(Base):
+    """
+    Global unique keys of news articles. Unique constraints of the partitioned news
+    table include publication_datetime, this table keeps news_id and url unique
+    across all months for idempotent upserts.
+    """
+    __tablename__ = "news_keys"
+
+    news_id = Column(String, primary_key=True)
+    url = Column(String, nullable=False, unique=True)
+    article_id = Column(Integer, nullable=False, index=True)  # news.id
+    # Partition key of the article, with article_id - the primary key of news
+    publication_datetime = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<NewsKey(news_id='{self.news_id}', article_id='{self.article_id}')>"
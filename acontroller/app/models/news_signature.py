@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, LargeBinary
+from acontroller.app.models.base import Base
+
+
+class NewsSignature(Base):
+    """
+    MinHash signature of a canonical news article for near-duplicate detection.
+    """
+    __tablename__ = "news_signatures"
+
+    article_id = Column(Integer, primary_key=True)  # news.id
+    signature = Column(LargeBinary, nullable=False)  # uint32 minhashes
+
+    def __repr__(self):
+        return f"<NewsSignature(article_id='{self.article_id}')>"
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, DateTime, Integer, String, Text, func
+from acontroller.app.models.base import Base
+
+
+class NewsSummary(Base):
+    """
+    Cached short summary of a news article, reused by digests of overlapping windows.
+    """
+    __tablename__ = "news_summaries"
+
+    article_id = Column(Integer, primary_key=True)  # news.id
+    content_hash = Column(String(64), nullable=True)  # news.content_hash the summary was made from
+    summary = Column(Text, nullable=False)
+    model = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<NewsSummary(article_id='{self.article_id}')>"
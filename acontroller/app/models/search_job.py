@@ -0,0 +1,26 @@
+from sqlalchemy import Column, DateTime, Integer, String, Text, func
+from sqlalchemy.dialects.postgresql import JSONB
+from acontroller.app.models.base import Base
+
+
+class SearchJob(Base):
+    """
+    Vector search run in the background, see services/jobs.py.
+    """
+    __tablename__ = "search_jobs"
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex
+    route = Column(String, nullable=False)  # science / news / all, or digest
+    params = Column(JSONB, nullable=False)  # VectorSearch, or DigestCreate
+    status = Column(String, nullable=False, default="queued", index=True)  # queued / running / done / failed
+    result = Column(JSONB, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)  # running jobs with a stale heartbeat are reclaimed
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<SearchJob(id='{self.id}', status='{self.status}')>"
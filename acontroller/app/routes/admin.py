@@ -0,0 +1,104 @@
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from acontroller.app.config import settings
+from acontroller.app.database import get_db
+from acontroller.app.services.partitions import parse_month
+from acontroller.app.utils.profiling import ADMIN_TOKEN_HEADER
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+async def require_admin(
+    admin_token: Optional[str] = Header(None, alias=ADMIN_TOKEN_HEADER),
+):
+    if (
+        settings.ADMIN_API_TOKEN is None
+        or admin_token is None
+        or not secrets.compare_digest(admin_token, settings.ADMIN_API_TOKEN)
+    ):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+class ProfilingSettings(BaseModel):
+    enabled: bool = Field(..., description="Сохранять профили медленных запросов")
+    slow_request_ms: Optional[float] = Field(
+        None, gt=0, description="Порог длительности медленного запроса, мс"
+    )
+
+
+@router.get("/profiling", dependencies=[Depends(require_admin)])
+async def get_profiling(request: Request):
+    return request.app.state.profiler.status()
+
+
+@router.put("/profiling", dependencies=[Depends(require_admin)])
+async def set_profiling(profiling: ProfilingSettings, request: Request):
+    """
+    Включает или выключает захват профилей медленных запросов без перезапуска.
+    """
+    request.app.state.profiler.configure(profiling.enabled, profiling.slow_request_ms)
+    return request.app.state.profiler.status()
+
+
+@router.get("/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles(request: Request):
+    return request.app.state.profiler.list()
+
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def download_profile(profile_id: int, request: Request):
+    """
+    Скачивание профиля: pstats (cProfile) или collapsed stacks (для flamegraph).
+    """
+    profile = request.app.state.profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    if profile.format == "pstats":
+        filename, media_type = f"profile_{profile.id}.prof", "application/octet-stream"
+    else:
+        filename, media_type = f"profile_{profile.id}.collapsed", "text/plain"
+    return Response(
+        profile.data,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/partitions/news", dependencies=[Depends(require_admin)])
+async def list_news_partitions(request: Request, db: AsyncSession = Depends(get_db)):
+    return await request.app.state.news_partitions.list(db)
+
+
+@router.post("/partitions/news/{month}/detach", dependencies=[Depends(require_admin)])
+async def detach_news_partition(
+    month: str, request: Request, db: AsyncSession = Depends(get_db)
+):
+    """
+    Отсоединяет партицию новостей за прошедший месяц (YYYY-MM).
+    Новости месяца остаются в отдельной таблице и пропадают из выдачи и поиска.
+    """
+    try:
+        name = await request.app.state.news_partitions.detach(db, parse_month(month))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    request.app.state.listing_cache.bump("news")
+    return {"detached": name}
+
+
+@router.get("/listing_cache", dependencies=[Depends(require_admin)])
+async def listing_cache_stats(request: Request):
+    return request.app.state.listing_cache.stats()
+
+
+@router.get("/admission", dependencies=[Depends(require_admin)])
+async def admission_stats(request: Request):
+    """
+    Занятые слоты, глубина очереди и отказы admission control по эндпоинтам.
+    """
+    return {name: limiter.stats() for name, limiter in request.app.state.admission.items()}
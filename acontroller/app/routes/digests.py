@@ -0,0 +1,53 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from acontroller.app.database import get_read_db
+from acontroller.app.models.digest import Digest as ModelsDigest
+from acontroller.app.services.digest import naive_utc
+from common.common.digest import Digest as SchemasDigest
+from common.common.digest import DigestCreate, DigestFilter
+from common.common.jobs import SearchJob as SchemasSearchJob
+
+router = APIRouter(prefix="/digests", tags=["digests"])
+
+
+@router.post("", response_model=SchemasSearchJob, status_code=202)
+async def create_digest(digest_data: DigestCreate, request: Request):
+    """
+    Ставит в очередь построение дайджеста новостей за период (map-reduce по статьям)
+    и сразу возвращает задачу. Построение занимает минуты, результат — сохранённый
+    дайджест — через GET /jobs/{id}.
+    Краткие изложения статей кэшируются, пересекающиеся периоды их переиспользуют.
+    """
+    if digest_data.end_datetime <= digest_data.start_datetime:
+        raise HTTPException(status_code=422, detail="end_datetime must be after start_datetime")
+    return await request.app.state.search_jobs.submit(
+        "digest", digest_data.model_dump(mode="json")
+    )
+
+
+@router.get("", response_model=List[SchemasDigest])
+async def get_digests(
+    filters: DigestFilter = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+):
+    stmt = select(ModelsDigest)
+    if filters.start_date is not None:
+        stmt = stmt.where(ModelsDigest.end_datetime >= naive_utc(filters.start_date))
+    if filters.end_date is not None:
+        stmt = stmt.where(ModelsDigest.start_datetime <= naive_utc(filters.end_date))
+    stmt = stmt.order_by(ModelsDigest.start_datetime.desc())
+
+    result = await db.execute(stmt.offset(filters.skip).limit(filters.limit))
+    return result.scalars().all()
+
+
+@router.get("/{digest_id}", response_model=SchemasDigest)
+async def get_digest(digest_id: int, db: AsyncSession = Depends(get_read_db)):
+    digest = await db.get(ModelsDigest, digest_id)
+    if digest is None:
+        raise HTTPException(status_code=404, detail="Digest not found")
+    return digest
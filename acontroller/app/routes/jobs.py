@@ -0,0 +1,84 @@
+import asyncio
+from typing import Literal
+
+from fastapi import APIRouter, FastAPI, HTTPException, Query, Request
+
+from acontroller.app.config import settings
+from acontroller.app.routes.vectors import all_collections_search, news_search, science_search
+from acontroller.app.services.rate_limiter import Priority, current_priority
+from common.common.digest import Digest as SchemasDigest
+from common.common.digest import DigestCreate
+from common.common.jobs import SearchJob as SchemasSearchJob
+from common.common.routes_vectors import VectorSearch
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+SEARCHES = {
+    "science": science_search,
+    "news": news_search,
+    "all": all_collections_search,
+}
+
+
+def search_job_handler(app: FastAPI):
+    """
+    Обработчик задач очереди: тот же поиск, что у синхронных /vectors, вне HTTP-запроса,
+    или построение дайджеста (POST /digests).
+    """
+    # Одновременно строится не больше DIGESTS_MAX_CONCURRENCY дайджестов
+    digest_slots = asyncio.Semaphore(settings.DIGESTS_MAX_CONCURRENCY)
+
+    async def build_digest(params: dict):
+        digest_data = DigestCreate(**params)
+        # Воркер выполняет и поиски: приоритет меняется только на время дайджеста
+        token = current_priority.set(Priority.REINDEX)
+        try:
+            async with digest_slots:
+                digest = await app.state.digest_builder.build(
+                    digest_data.start_datetime, digest_data.end_datetime, digest_data.title
+                )
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        finally:
+            current_priority.reset(token)
+        return SchemasDigest.model_validate(digest).model_dump(mode="json")
+
+    async def handle(route: str, params: dict):
+        if route == "digest":
+            return await build_digest(params)
+        search_params = VectorSearch(**params)
+        # Поиск берёт из запроса только app (app.state)
+        request = Request({"type": "http", "app": app, "headers": []})
+        deadline = app.state.latency_budget.start(search_params.latency_budget_ms)
+        return await SEARCHES[route](request, search_params, deadline)
+
+    return handle
+
+
+@router.post("/vectors/{route}", response_model=SchemasSearchJob, status_code=202)
+async def submit_search_job(
+    route: Literal["science", "news", "all"], search_params: VectorSearch, request: Request
+):
+    """
+    Ставит поиск в очередь и сразу возвращает задачу, результат — через GET /jobs/{id}.
+    Для долгих запросов (много перефразировок, большой top_k), которые не укладываются
+    в таймауты прокси.
+    """
+    return await request.app.state.search_jobs.submit(route, search_params.model_dump(mode="json"))
+
+
+@router.get("/{job_id}", response_model=SchemasSearchJob)
+async def get_search_job(
+    job_id: str,
+    request: Request,
+    wait: float = Query(0, ge=0, le=60, description="Long poll: ждать завершения до wait секунд"),
+):
+    """
+    Статус и результат задачи. С wait > 0 ответ приходит сразу после завершения задачи
+    или по истечении wait.
+    """
+    jobs = request.app.state.search_jobs
+    job = await jobs.wait(job_id, wait) if wait > 0 else await jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
@@ -1,89 +1,357 @@
-from typing import Annotated, List
+from typing import Annotated, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
-from sqlalchemy import select
+from pydantic import TypeAdapter
+from sqlalchemy import (
+    and_, delete, func, insert, literal, or_, select, true, tuple_, union_all, update,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
-from acontroller.app.database import get_db
+from acontroller.app.database import get_db, read_session, replication_lag_bound
+from acontroller.app.services.rate_limiter import Priority, openai_priority
+from acontroller.app.services.rag import logger
+from acontroller.app.utils.metrics import NEWS_DUPLICATES, stage
+from acontroller.app.utils.utils import content_hash
 from acontroller.app.models.news_article import NewsArticle as ModelsNewsArticle
+from acontroller.app.models.news_key import NewsKey
+from acontroller.app.models.news_signature import NewsSignature
 from common.common.news_article import NewsArticle as SchemasNewsArticle
 from common.common.news_article import NewsArticleCreate as SchemasNewsArticleCreate
+from common.common.news_article import NewsArticleUpdate as SchemasNewsArticleUpdate
 from common.common.routes_news import NewsArticleFilter
 from sqlalchemy.exc import IntegrityError
 
 router = APIRouter(prefix="/news", tags=["news"])
 
+NEWS_LIST_ADAPTER = TypeAdapter(List[SchemasNewsArticle])
+
 
 @router.get("/articles", response_model=List[SchemasNewsArticle])
 async def get_articles(
+    request: Request,
     filters: NewsArticleFilter = Depends(),
-    db: AsyncSession = Depends(get_db)
 ):
-    stmt = select(ModelsNewsArticle)
-
-    if filters.id is not None:
-        stmt = stmt.where(ModelsNewsArticle.id == filters.id)
-    if filters.title is not None:
-        stmt = stmt.where(ModelsNewsArticle.title.ilike(f"%{filters.title}%"))
-    if filters.source_name is not None:
-        stmt = stmt.where(ModelsNewsArticle.source_name == filters.source_name)
-    if filters.start_date is not None:
-        stmt = stmt.where(ModelsNewsArticle.publication_datetime >= filters.start_date)
-    if filters.end_date is not None:
-        stmt = stmt.where(ModelsNewsArticle.publication_datetime <= filters.end_date)
-    if filters.section is not None:
-        stmt = stmt.where(ModelsNewsArticle.topic == filters.section)
-    if filters.limit is not None:
-        stmt = stmt.limit(filters.limit)
-    if filters.order_by == 'publication_datetime':
-        stmt = stmt.order_by(ModelsNewsArticle.publication_datetime.desc())
-    if filters.order_by == 'id':
-        stmt = stmt.order_by(ModelsNewsArticle.id)
+    """
+    List news articles. Supports ETag / Last-Modified conditional requests,
+    unchanged listings are answered from memory without a database query.
+    """
+    async def render() -> bytes:
+        stmt = select(ModelsNewsArticle)
 
-    result = await db.execute(stmt)
-    return result.scalars().all()
+        if filters.id is not None:
+            stmt = stmt.where(ModelsNewsArticle.id == filters.id)
+        if filters.title is not None:
+            stmt = stmt.where(ModelsNewsArticle.title.ilike(f"%{filters.title}%"))
+        if filters.source_name is not None:
+            stmt = stmt.where(ModelsNewsArticle.source_name == filters.source_name)
+        if filters.start_date is not None:
+            stmt = stmt.where(ModelsNewsArticle.publication_datetime >= filters.start_date)
+        if filters.end_date is not None:
+            stmt = stmt.where(ModelsNewsArticle.publication_datetime <= filters.end_date)
+        if filters.section is not None:
+            stmt = stmt.where(ModelsNewsArticle.topic == filters.section)
+        if filters.limit is not None:
+            stmt = stmt.limit(filters.limit)
+        if filters.order_by == 'publication_datetime':
+            stmt = stmt.order_by(ModelsNewsArticle.publication_datetime.desc())
+        if filters.order_by == 'id':
+            stmt = stmt.order_by(ModelsNewsArticle.id)
+
+        async with read_session() as db:
+            result = await db.execute(stmt)
+            rows = NEWS_LIST_ADAPTER.validate_python(result.scalars().all(), from_attributes=True)
+            lag = replication_lag_bound(db)
+        return NEWS_LIST_ADAPTER.dump_json(rows), lag
+
+    return await request.app.state.listing_cache.respond(
+        request, "news", filters.model_dump_json(), render
+    )
+
+
+# Columns of the Qdrant payload (news_payload), besides the id
+NEWS_PAYLOAD_COLUMNS = (
+    "title", "url", "publication_datetime", "source_name", "tags", "persons", "topic",
+)
+
+
+def news_upsert_statement(values: dict):
+    """
+    Single statement inserting a news article, or updating the stored article with
+    the same news_id (or, failing that, the same url). news is partitioned by
+    publication_datetime, so news_id and url are kept globally unique in news_keys:
+    - existing: the key of the stored article, locked until the commit
+    - claimed: otherwise a new key with the next news id, ON CONFLICT DO NOTHING
+    - updated: the stored article, rewritten in place (canonical_id is kept)
+    - inserted: the new article, or the stored one again if its month was detached
+    - rekeyed: the key follows changed news_id, url and publication_datetime
+
+    Selects the article with whether it existed, its previous content_hash and
+    whether its Qdrant payload fields changed.
+    """
+    news = ModelsNewsArticle.__table__
+    columns = list(values)
+    literals = [literal(values[column], news.c[column].type) for column in columns]
+
+    existing = (
+        select(NewsKey.news_id, NewsKey.article_id, NewsKey.publication_datetime)
+        .where(or_(NewsKey.news_id == values["news_id"], NewsKey.url == values["url"]))
+        .order_by((NewsKey.news_id == values["news_id"]).desc())
+        .limit(1)
+        .with_for_update()
+        .cte("existing")
+    )
+    claimed = (
+        pg_insert(NewsKey)
+        .from_select(
+            ["news_id", "url", "article_id", "publication_datetime"],
+            select(
+                literal(values["news_id"]),
+                literal(values["url"]),
+                func.nextval("news_id_seq"),
+                literal(values["publication_datetime"], NewsKey.publication_datetime.type),
+            ).where(~select(existing).exists()),
+        )
+        .on_conflict_do_nothing()
+        .returning(NewsKey.article_id)
+        .cte("claimed")
+    )
+    previous = (
+        select(news)
+        .join(existing, and_(
+            news.c.id == existing.c.article_id,
+            news.c.publication_datetime == existing.c.publication_datetime,
+        ))
+        .cte("previous")
+    )
+    updated = (
+        update(news)
+        .where(news.c.id == previous.c.id)
+        .where(news.c.publication_datetime == previous.c.publication_datetime)
+        .values(values)
+        .returning(*news.c)
+        .cte("updated")
+    )
+    inserted = (
+        insert(news)
+        .from_select(
+            ["id", *columns],
+            union_all(
+                select(claimed.c.article_id, *literals),
+                select(existing.c.article_id, *literals).where(~select(previous).exists()),
+            ),
+        )
+        .returning(*news.c)
+        .cte("inserted")
+    )
+    rekeyed = (
+        update(NewsKey)
+        .where(NewsKey.news_id == existing.c.news_id)
+        .values(
+            news_id=values["news_id"],
+            url=values["url"],
+            publication_datetime=values["publication_datetime"],
+        )
+        .returning(NewsKey.news_id)
+        .cte("rekeyed")
+    )
+
+    article = union_all(select(updated), select(inserted)).subquery("article")
+    db_news = aliased(ModelsNewsArticle, article, adapt_on_names=True)
+    payload_changed = tuple_(*(previous.c[column] for column in NEWS_PAYLOAD_COLUMNS)) \
+        .is_distinct_from(tuple_(*(article.c[column] for column in NEWS_PAYLOAD_COLUMNS)))
+    return (
+        select(
+            db_news,
+            previous.c.id.is_not(None).label("existed"),
+            previous.c.content_hash,
+            payload_changed.label("payload_changed"),
+        )
+        .select_from(article)
+        .outerjoin(previous, true())
+        .add_cte(rekeyed)
+        .execution_options(populate_existing=True)
+    )
+
+
+async def upsert_news(db: AsyncSession, values: dict):
+    """
+    Insert or update a news article in one round trip, see news_upsert_statement.
+
+    :return: The article, and the row with content_hash and payload_changed of the
+        stored article (None for a new article)
+    """
+    # A concurrent copy of a new article claims its key after the snapshot of the
+    # statement was taken: nothing is written, the second run finds the key
+    for _ in range(2):
+        row = (await db.execute(news_upsert_statement(values))).first()
+        if row is not None:
+            return row[0], row if row.existed else None
+    raise HTTPException(409, "News article was changed concurrently, retry")
+
+
+def news_payload(db_news) -> dict:
+    """
+    Qdrant payload of a news article: its id, display fields (raw search results need
+    no database query) and categorical metadata.
+    """
+    return {
+        "id": int(db_news.id),
+        "title": db_news.title,
+        "url": db_news.url,
+        "date": db_news.publication_datetime.isoformat() if db_news.publication_datetime else None,
+        "source_name": db_news.source_name,
+        "tags": db_news.tags,
+        "persons": db_news.persons,
+        "topic": db_news.topic,
+    }
+
+
+async def embed_canonical_news(request: Request, db: AsyncSession, db_news, signature):
+    """
+    Index the article for near-duplicate detection and store its embedding.
+    """
+    news_dedup = request.app.state.news_dedup
+    # Indexed before the commit so concurrent reposts are detected too
+    news_dedup.add(db_news.id, signature, db_news.publication_datetime)
+    await db.merge(NewsSignature(article_id=db_news.id, signature=signature.tobytes()))
+
+    await request.app.state.rag.news_embedder.store_embedding(
+        text=db_news.text,
+        point_id=db_news.id,
+        metadata=news_payload(db_news),
+        published=db_news.publication_datetime,
+    )
+
+
+async def reindex_changed_news(request: Request, db: AsyncSession, db_news, signature):
+    """
+    Handle the changed text of a stored article. A duplicate is checked again
+    and becomes canonical if it no longer matches, a canonical article is re-embedded
+    into the same Qdrant point.
+
+    :return: Id added to the dedup index, None if the article stays a duplicate
+    """
+    if db_news.canonical_id is not None:
+        duplicate = request.app.state.news_dedup.find_duplicate(signature, exclude=db_news.id)
+        if duplicate is not None:
+            db_news.canonical_id = duplicate[0]
+            return None
+        db_news.canonical_id = None
 
+    await embed_canonical_news(request, db, db_news, signature)
+    return db_news.id
 
-@router.post("/articles", response_model=SchemasNewsArticle)
+
+async def promote_duplicate(request: Request, db: AsyncSession, canonical_id: int) -> Optional[int]:
+    """
+    Replace a deleted canonical article with its earliest duplicate: the duplicate
+    becomes canonical and is embedded, the other duplicates are linked to it.
+
+    :return: Id added to the dedup index, None if the article had no duplicates
+    """
+    result = await db.execute(
+        select(ModelsNewsArticle)
+        .where(ModelsNewsArticle.canonical_id == canonical_id)
+        .order_by(ModelsNewsArticle.publication_datetime, ModelsNewsArticle.id)
+        .limit(1)
+    )
+    successor = result.scalars().first()
+    if successor is None:
+        return None
+
+    await db.execute(
+        update(ModelsNewsArticle)
+        .where(ModelsNewsArticle.canonical_id == canonical_id)
+        .where(ModelsNewsArticle.id != successor.id)
+        .values(canonical_id=successor.id)
+    )
+    successor.canonical_id = None
+    signature = request.app.state.news_dedup.signature(successor.text)
+    await embed_canonical_news(request, db, successor, signature)
+    logger.info(f"News {successor.id} replaces deleted canonical article {canonical_id}")
+    return successor.id
+
+
+@router.post("/articles", response_model=SchemasNewsArticle,
+             dependencies=[Depends(openai_priority(Priority.INGEST))])
 async def create_news(
     news_data: SchemasNewsArticleCreate,
     request: Request,
     db: AsyncSession = Depends(get_db),
 ):
     """
-    Create a new news article and store its embedding.
+    Create or update (by news_id, or by url) a news article and store its embedding.
+    - Re-sent articles with unchanged text only refresh metadata, without embedding.
+    - Changed text is re-embedded into the same Qdrant point.
+    - Near-duplicates of recent articles are linked to the canonical article
+      and are not embedded.
     """
+    news_dedup = request.app.state.news_dedup
+    indexed_id = None
     try:
-        db_news = ModelsNewsArticle(**news_data.model_dump())
-        db.add(db_news)
-        await db.flush()
-        await db.refresh(db_news)
-        text = db_news.text
+        values = news_data.model_dump()
+        values["content_hash"] = content_hash(news_data.text)
 
-        metadata = {"id": int(db_news.id)}
-        await request.app.state.rag.news_embedder.store_embedding(
-            text=text, point_id=db_news.id, metadata=metadata
-        )
+        with stage("news", "db_upsert"):
+            db_news, previous = await upsert_news(db, values)
 
-        await db.commit()
+        if previous is not None and previous.content_hash == values["content_hash"]:
+            # Re-sent article with unchanged text: nothing to embed, the point keeps
+            # the payload and tier of the stored metadata
+            if db_news.canonical_id is None and previous.payload_changed:
+                await request.app.state.rag.news_embedder.update_payload(
+                    point_id=db_news.id,
+                    metadata=news_payload(db_news),
+                    published=db_news.publication_datetime,
+                )
+        elif previous is not None:
+            with stage("news", "dedup"):
+                signature = news_dedup.signature(db_news.text)
+            indexed_id = await reindex_changed_news(request, db, db_news, signature)
+        else:
+            with stage("news", "dedup"):
+                signature = news_dedup.signature(db_news.text)
+                duplicate = news_dedup.find_duplicate(signature, exclude=db_news.id)
+            if duplicate is not None:
+                db_news.canonical_id = duplicate[0]
+                NEWS_DUPLICATES.inc()
+                logger.info(
+                    f"News {db_news.id} is a near-duplicate of {duplicate[0]} "
+                    f"(similarity {duplicate[1]:.2f}), embedding skipped"
+                )
+            else:
+                await embed_canonical_news(request, db, db_news, signature)
+                indexed_id = db_news.id
+
+        with stage("news", "db_commit"):
+            await db.commit()
+        request.app.state.listing_cache.bump("news")
         return db_news
 
     except IntegrityError:
         await db.rollback()
+        if indexed_id is not None:
+            news_dedup.remove(indexed_id)
         raise HTTPException(422, "Database integrity error")
 
     except Exception:
         await db.rollback()
+        if indexed_id is not None:
+            news_dedup.remove(indexed_id)
         raise
 
 
-
 @router.delete("/articles")
 async def delete_news(
+        request: Request,
         id: int = Query(..., description="ID новости для удаления"),
         db: AsyncSession = Depends(get_db)):
     """
     Delete a news article by ID.
+    Duplicates of a deleted canonical article stay searchable: the earliest of them
+    becomes canonical in its place.
     """
     stmt = select(ModelsNewsArticle).where(ModelsNewsArticle.id == id)
     result = await db.execute(stmt)
@@ -91,30 +359,87 @@ async def delete_news(
     if db_news is None:
         raise HTTPException(status_code=404, detail="News not found")
 
-    await db.delete(db_news)
-    await db.commit()
+    news_dedup = request.app.state.news_dedup
+    indexed_id = None
+    try:
+        if db_news.canonical_id is None:
+            indexed_id = await promote_duplicate(request, db, db_news.id)
+        await db.delete(db_news)
+        await db.execute(delete(NewsSignature).where(NewsSignature.article_id == id))
+        await db.execute(delete(NewsKey).where(NewsKey.article_id == id))
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        if indexed_id is not None:
+            news_dedup.remove(indexed_id)
+        raise
+    news_dedup.remove(id)
+    request.app.state.listing_cache.bump("news")
     return {"message": "News deleted successfully"}
 
 
-#
-# @router.put("/{news_id}")
-# async def update_news(
-#     news_id: str, news_update: SchemasNewsArticleUpdate, db: AsyncSession = Depends(get_db)
-# ):
-#     """
-#     Update a news article by ID.
-#     """
-#     stmt = select(ModelsNewsArticle).where(ModelsNewsArticle.news_id == news_id)
-#     result = await db.execute(stmt)
-#     db_news = result.scalars().first()
-#     if db_news is None:
-#         raise HTTPException(status_code=404, detail="News not found")
-#
-#     update_data = news_update.dict(exclude_unset=True)
-#     for field, value in update_data.items():
-#         setattr(db_news, field, value)
-#
-#     await db.commit()
-#     await db.flush()
-#     await db.refresh(db_news)
-#     return db_news
+@router.patch("/articles", response_model=SchemasNewsArticle,
+              dependencies=[Depends(openai_priority(Priority.INGEST))])
+async def update_news(
+        news_update: SchemasNewsArticleUpdate,
+        request: Request,
+        id: int = Query(..., description="ID новости для изменения"),
+        db: AsyncSession = Depends(get_db)):
+    """
+    Partially update a news article by ID.
+    The text is re-embedded only if it changed, metadata changes only update
+    the payload of the existing Qdrant point.
+    """
+    stmt = select(ModelsNewsArticle).where(ModelsNewsArticle.id == id)
+    result = await db.execute(stmt)
+    db_news = result.scalars().first()
+    if db_news is None:
+        raise HTTPException(status_code=404, detail="News not found")
+
+    news_dedup = request.app.state.news_dedup
+    indexed_id = None
+    try:
+        update_data = news_update.model_dump(exclude_unset=True)
+        text_changed = "text" in update_data and update_data["text"] != db_news.text
+        for field, value in update_data.items():
+            setattr(db_news, field, value)
+        if update_data.keys() & {"news_id", "url", "publication_datetime"}:
+            await db.execute(
+                update(NewsKey)
+                .where(NewsKey.article_id == db_news.id)
+                .values(
+                    news_id=db_news.news_id,
+                    url=db_news.url,
+                    publication_datetime=db_news.publication_datetime,
+                )
+            )
+
+        if text_changed:
+            db_news.content_hash = content_hash(db_news.text)
+            with stage("news", "dedup"):
+                signature = news_dedup.signature(db_news.text)
+            indexed_id = await reindex_changed_news(request, db, db_news, signature)
+        elif update_data and db_news.canonical_id is None:
+            await request.app.state.rag.news_embedder.update_payload(
+                point_id=db_news.id,
+                metadata=news_payload(db_news),
+                published=db_news.publication_datetime,
+            )
+
+        with stage("news", "db_commit"):
+            await db.commit()
+        request.app.state.listing_cache.bump("news")
+        await db.refresh(db_news)
+        return db_news
+
+    except IntegrityError:
+        await db.rollback()
+        if indexed_id is not None:
+            news_dedup.remove(indexed_id)
+        raise HTTPException(422, "Database integrity error")
+
+    except Exception:
+        await db.rollback()
+        if indexed_id is not None:
+            news_dedup.remove(indexed_id)
+        raise
@@ -1,61 +1,105 @@
 from sqlalchemy.exc import IntegrityError
 from typing import List, Annotated
 from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from pydantic import TypeAdapter
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from acontroller.app.database import get_db
+from acontroller.app.database import get_db, read_session, replication_lag_bound
+from acontroller.app.services.rate_limiter import Priority, openai_priority
+from acontroller.app.utils.metrics import stage
 from common.common.science_article import ScienceArticle as SchemasScienceArticle
 from common.common.science_article import ScienceArticleCreate as SchemasScienceArticleCreate
+from common.common.science_article import ScienceArticleUpdate as SchemasScienceArticleUpdate
 from acontroller.app.models.science_article import ScienceArticle as ModelsScienceArticle
 from common.common.routes_science import ScienceArticleFilter
-from common.common.routes_actual import ActualList, ActualItem
+from common.common.routes_actual import ActualList
 
 router = APIRouter(prefix="/science", tags=["science"])
 
+SCIENCE_LIST_ADAPTER = TypeAdapter(List[SchemasScienceArticle])
+
+
+def science_payload(db_science_article) -> dict:
+    """
+    Qdrant payload of a science article: its id, display fields (raw search results need
+    no database query) and categorical metadata.
+    """
+    published = db_science_article.published_date
+    return {
+        "id": int(db_science_article.id),
+        "title": db_science_article.title,
+        "url": db_science_article.url,
+        "date": published.isoformat() if published else None,
+        "sphere": db_science_article.sphere,
+        "section": db_science_article.section,
+        "source_name": db_science_article.source_name,
+        "categories": db_science_article.categories,
+    }
+
 
 @router.get("/articles", response_model=List[SchemasScienceArticle])
 async def get_articles(
+    request: Request,
     filters: ScienceArticleFilter = Depends(),
-    db: AsyncSession = Depends(get_db)
 ):
-    stmt = select(ModelsScienceArticle)
-
-    if filters.title is not None:
-        stmt = stmt.where(ModelsScienceArticle.title.ilike(f"%{filters.title}%"))
-    if filters.sphere is not None:
-        stmt = stmt.where(ModelsScienceArticle.sphere.ilike(filters.sphere))
-    if filters.source_name is not None:
-        stmt = stmt.where(ModelsScienceArticle.source_name.ilike(filters.source_name))
-    if filters.start_date is not None:
-        stmt = stmt.where(ModelsScienceArticle.published_date >= filters.start_date)
-    if filters.end_date is not None:
-        stmt = stmt.where(ModelsScienceArticle.published_date <= filters.end_date)
-    if filters.section is not None:
-        stmt = stmt.where(ModelsScienceArticle.section.ilike(filters.section))
-    if filters.id is not None:
-        stmt = stmt.where(ModelsScienceArticle.id == filters.id)
-
-    result = await db.execute(stmt.offset(filters.skip).limit(filters.limit))
-    return result.scalars().all()
-
-@router.post("/articles", response_model=SchemasScienceArticle)
+    """
+    List science articles. Supports ETag / Last-Modified conditional requests,
+    unchanged listings are answered from memory without a database query.
+    """
+    async def render() -> bytes:
+        stmt = select(ModelsScienceArticle)
+
+        if filters.title is not None:
+            stmt = stmt.where(ModelsScienceArticle.title.ilike(f"%{filters.title}%"))
+        if filters.sphere is not None:
+            stmt = stmt.where(ModelsScienceArticle.sphere.ilike(filters.sphere))
+        if filters.source_name is not None:
+            stmt = stmt.where(ModelsScienceArticle.source_name.ilike(filters.source_name))
+        if filters.start_date is not None:
+            stmt = stmt.where(ModelsScienceArticle.published_date >= filters.start_date)
+        if filters.end_date is not None:
+            stmt = stmt.where(ModelsScienceArticle.published_date <= filters.end_date)
+        if filters.section is not None:
+            stmt = stmt.where(ModelsScienceArticle.section.ilike(filters.section))
+        if filters.id is not None:
+            stmt = stmt.where(ModelsScienceArticle.id == filters.id)
+
+        async with read_session() as db:
+            result = await db.execute(stmt.offset(filters.skip).limit(filters.limit))
+            rows = SCIENCE_LIST_ADAPTER.validate_python(
+                result.scalars().all(), from_attributes=True
+            )
+            lag = replication_lag_bound(db)
+        return SCIENCE_LIST_ADAPTER.dump_json(rows), lag
+
+    return await request.app.state.listing_cache.respond(
+        request, "science", filters.model_dump_json(), render
+    )
+
+
+@router.post("/articles", response_model=SchemasScienceArticle,
+             dependencies=[Depends(openai_priority(Priority.INGEST))])
 async def create_articles(
     article_data: SchemasScienceArticleCreate, request: Request, db: AsyncSession = Depends(get_db)
 ):
     try:
-        db_science_article = ModelsScienceArticle(**article_data.model_dump())
-        db.add(db_science_article)
-        await db.flush()
-        await db.refresh(db_science_article)
+        with stage("science", "db_insert"):
+            db_science_article = ModelsScienceArticle(**article_data.model_dump())
+            db.add(db_science_article)
+            await db.flush()
+            await db.refresh(db_science_article)
 
         await request.app.state.rag.science_embedder.store_embedding(
             text=db_science_article.full_summary,
             point_id=db_science_article.id,
-            metadata={"id": int(db_science_article.id)},
+            metadata=science_payload(db_science_article),
         )
 
-        await db.commit()
+        with stage("science", "db_commit"):
+            await db.commit()
+        request.app.state.listing_cache.bump("science")
+        request.app.state.actual_feed.offer(db_science_article)
         return db_science_article
 
     except IntegrityError:
@@ -69,37 +113,81 @@ async def create_articles(
         raise
 
 
+@router.patch("/articles", response_model=SchemasScienceArticle,
+              dependencies=[Depends(openai_priority(Priority.INGEST))])
+async def update_articles(
+    article_update: SchemasScienceArticleUpdate,
+    request: Request,
+    id: int = Query(..., description="ID статьи для изменения"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Partially update a science article by ID.
+    full_summary is re-embedded only if it changed, metadata changes only update
+    the payload of the existing Qdrant point.
+    """
+    stmt = select(ModelsScienceArticle).where(ModelsScienceArticle.id == id)
+    result = await db.execute(stmt)
+    db_science_article = result.scalars().first()
+    if db_science_article is None:
+        raise HTTPException(status_code=404, detail="Science article not found")
+
+    try:
+        update_data = article_update.model_dump(exclude_unset=True)
+        summary_changed = (
+            "full_summary" in update_data
+            and update_data["full_summary"] != db_science_article.full_summary
+        )
+        for field, value in update_data.items():
+            setattr(db_science_article, field, value)
+
+        embedder = request.app.state.rag.science_embedder
+        if summary_changed:
+            await embedder.store_embedding(
+                text=db_science_article.full_summary,
+                point_id=db_science_article.id,
+                metadata=science_payload(db_science_article),
+            )
+        elif update_data:
+            await embedder.update_payload(
+                point_id=db_science_article.id,
+                metadata=science_payload(db_science_article),
+            )
+
+        with stage("science", "db_commit"):
+            await db.commit()
+        request.app.state.listing_cache.bump("science")
+        request.app.state.actual_feed.offer(db_science_article)
+        await db.refresh(db_science_article)
+        return db_science_article
+
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            422,
+            "Database integrity error"
+        )
+    except Exception:
+        await db.rollback()
+        raise
+
 
 @router.get("/actual", response_model=ActualList)
 async def get_actual(
+    request: Request,
     skip: int = 0,
     limit: int = 20,
 ):
-    # --- Временные моковые данные ---
-    mock_actual = [
-        ActualItem(
-            id=1,
-            title="Банк России: мониторинг отраслевых финансовых потоков - рост деловой активности продолжается",
-            body="В марте объем финансовых поступлений, проведенных через Банк России, оказался близок к февральскому значению и на 8,2% выше среднего уровня IV квартала 2024 года. Без учета добывающих отраслей, производства нефтепродуктов и государственного управления входящие платежи увеличились на 17,1%, в то время как в среднем за I квартал рост составил 14,8%."
-        ),
-        ActualItem(
-            id=2,
-            title="ECB Consumer Expectations Survey results – February 2025",
-            body="Median consumer perceptions of inflation over the previous 12 months decreased, while median inflation expectations for the next 12 months and for three years ahead remained unchanged. Expectations for nominal income growth over the next 12 months increased, while expectations for spending growth over the next 12 months decreased."
-        ),
-        ActualItem(
-            id=3,
-            title="ECB launches pilot project for research access to confidential statistical data",
-            body="Anonymised data on individual banks in the entire euro area will be available to academic researchers. Several access modes will be tested with a view to establishing a permanent framework for research access to ECB data."
-        ),
-    ]
-
-    total_mock = len(mock_actual)
-    paginated_mocks = mock_actual[skip : skip + limit]
-
-    return ActualList(items=paginated_mocks, total=total_mock, skip=skip, limit=limit)
+    """
+    Актуальные статьи: готовый рейтинг по relevance_score, свежести и просмотрам/скачиваниям,
+    поддерживается в памяти (обновляется при загрузке статей и по расписанию).
+    """
+    return request.app.state.actual_feed.page(skip, limit)
+
+
 @router.delete("/articles")
 async def delete_news(
+        request: Request,
         id: int = Query(..., description="ID новости для удаления"),
         db: AsyncSession = Depends(get_db)):
     """
@@ -113,4 +201,6 @@ async def delete_news(
 
     await db.delete(db_science)
     await db.commit()
+    request.app.state.listing_cache.bump("science")
+    request.app.state.actual_feed.remove(id)
     return {"message": "Science article deleted successfully"}
@@ -1,23 +1,302 @@
-from fastapi import APIRouter, Depends, Request, Body, HTTPException
+import asyncio
+import copy
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Request, Body, Header, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from acontroller.app.database import get_db
+from acontroller.app.database import read_session
 from acontroller.app.models.news_article import NewsArticle as ModelsNewsArticle
 from acontroller.app.models.science_article import ScienceArticle as ModelsScienceArticle
 
 from common.common.routes_vectors import VectorSearch
 from acontroller.app.services.rag import OpenAIMessage, logger
+from acontroller.app.services.vector_store import DISPLAY_FIELDS
+from acontroller.app.utils.deadline import Deadline
+from acontroller.app.utils.metrics import stage
 from acontroller.app.utils.utils import trim_prompt_to_tokens
 
 router = APIRouter(prefix="/vectors", tags=["vectors"])
 
+LATENCY_BUDGET_HEADER = "X-Latency-Budget-Ms"
 
-@router.post("/science")
-async def vector_search(
+
+def news_filter_statement(search_params: VectorSearch):
+    """
+    Новости, подходящие под фильтры запроса (дубликаты не хранятся в Qdrant).
+    """
+    table = ModelsNewsArticle
+    stmt = select(table.id).where(table.canonical_id.is_(None))
+    if search_params.source_name:
+        stmt = stmt.where(table.source_name == search_params.source_name)
+    if search_params.start_date:
+        stmt = stmt.where(table.publication_datetime >= search_params.start_date)
+    if search_params.end_date:
+        stmt = stmt.where(table.publication_datetime <= search_params.end_date)
+    return stmt
+
+
+def science_filter_statement(search_params: VectorSearch):
+    """
+    Научные статьи, подходящие под фильтры запроса.
+    """
+    table = ModelsScienceArticle
+    stmt = select(table.id)
+    if search_params.source_name:
+        stmt = stmt.where(table.source_name.ilike(search_params.source_name))
+    if search_params.sphere:
+        stmt = stmt.where(table.sphere.ilike(search_params.sphere))
+    if search_params.min_relevance_score is not None:
+        stmt = stmt.where(table.relevance_score >= search_params.min_relevance_score)
+    if search_params.start_date:
+        stmt = stmt.where(table.published_date >= search_params.start_date)
+    if search_params.end_date:
+        stmt = stmt.where(table.published_date <= search_params.end_date)
+    return stmt
+
+
+async def filter_ids(db: AsyncSession, stmt) -> list[int]:
+    result = await db.execute(stmt)
+    return list(result.scalars().all())
+
+
+# Таблица и колонка даты коллекции, для точек без полей отображения в payload
+DISPLAY_COLUMNS = {
+    "news": (ModelsNewsArticle, ModelsNewsArticle.publication_datetime),
+    "science": (ModelsScienceArticle, ModelsScienceArticle.published_date),
+}
+
+
+def display_fields(search_params: VectorSearch) -> Optional[list[str]]:
+    """
+    Поля payload, запрашиваемые у Qdrant: title, url и date нужны только для raw_payload.
+    """
+    return DISPLAY_FIELDS if search_params.raw_return and search_params.raw_payload else None
+
+
+async def fill_display_payload(collection: str, search_params: VectorSearch, points: list[dict]):
+    """
+    Точки, сохранённые до появления title, url и date в payload, дополняются одним запросом к БД.
+    """
+    if display_fields(search_params) is None:
+        return
+    missing = [point["id"] for point in points if "title" not in point.get("payload", {})]
+    if not missing:
+        return
+    table, date_column = DISPLAY_COLUMNS[collection]
+    with stage(collection, "fetch_display"):
+        async with read_session() as db:
+            result = await db.execute(
+                select(table.id, table.title, table.url, date_column.label("date"))
+                .where(table.id.in_(missing))
+            )
+            rows = {row.id: row for row in result.all()}
+    for point in points:
+        row = rows.get(point["id"])
+        if row is not None and "title" not in point.get("payload", {}):
+            point["payload"] = {
+                "title": row.title,
+                "url": row.url,
+                "date": row.date.isoformat() if row.date else None,
+            }
+
+
+def raw_point(point: dict, search_params: VectorSearch) -> dict:
+    """
+    Точка в формате raw_return: id и score, при raw_payload — ещё title, url и date.
+    """
+    result = {"id": point["id"], "score": point["score"]}
+    if display_fields(search_params) is not None:
+        payload = point.get("payload", {})
+        result.update({key: payload.get(key) for key in DISPLAY_FIELDS})
+    return result
+
+
+def best_unique_points(points: list[dict], top_k: int) -> list[dict]:
+    """
+    Для каждого id оставляет точку с максимальным score, возвращает top_k лучших.
+    """
+    best: dict = {}
+    for point in points:
+        key = (point.get("collection"), point["id"])
+        if key not in best or point["score"] > best[key]["score"]:
+            best[key] = point
+    return sorted(best.values(), key=lambda x: x["score"], reverse=True)[:top_k]
+
+
+def cut_at_score_gap(points: list[dict], score_gap: Optional[float]) -> list[dict]:
+    """
+    Адаптивный top_k: точки (по убыванию score) до первого падения score больше чем на
+    score_gap. Если хороших совпадений два, в промпт попадут два документа, а не top_k.
+    """
+    if score_gap is None:
+        return points
+    for i in range(1, len(points)):
+        if points[i - 1]["score"] - points[i]["score"] > score_gap:
+            return points[:i]
+    return points
+
+
+def normalize_scores(points: list[dict], floor: float) -> list[dict]:
+    """
+    Калибровка score точек одной коллекции: (score - floor) / (1 - floor), обрезается снизу нулём.
+    floor — близость несвязанных документов коллекции (у разных коллекций распределения
+    близости сдвинуты по-разному). Абсолютная близость сохраняется: слабое совпадение
+    остаётся слабым, даже если оно лучшее или единственное в своей коллекции.
+    """
+    return [
+        {**point, "raw_score": point["score"],
+         "score": max(point["score"] - floor, 0.0) / (1 - floor)}
+        for point in points
+    ]
+
+
+async def rephrase_query(request: Request, query_text_openai_message: OpenAIMessage) -> str:
+    """
+    Перефразирование запроса для повышения охвата поиска.
+    """
+    rephrase_text = request.app.state.rag.generate_rephrase_promt()
+    rephrase_text = trim_prompt_to_tokens(rephrase_text, 8191, "text-embedding-3-large")
+    rephrase_messages = [
+        OpenAIMessage(role="user", content=rephrase_text),
+        query_text_openai_message,
+    ]
+    return await request.app.state.rag.llm.create_completion(chat=rephrase_messages)
+
+
+def flight_key(route: str, search_params: VectorSearch) -> str:
+    """
+    Ключ single-flight: маршрут и параметры поиска с нормализованными пробелами в тексте запроса.
+    Бюджет времени в ключ не входит: у каждого запроса свой срок, см. SearchProgress.
+    """
+    params = search_params.model_dump(mode="json", exclude={"latency_budget_ms"})
+    params["query_text"] = " ".join(params["query_text"].split())
+    return f"{route}:{json.dumps(params, sort_keys=True, ensure_ascii=False)}"
+
+
+class SearchProgress:
+    """
+    Общее выполнение поиска для всех ожидающих его запросов. Его срок — самый поздний
+    из сроков запросов, ранжированные источники публикуются сразу после поиска: запрос,
+    чей бюджет кончается раньше, получает их без ответа LLM.
+    """
+
+    def __init__(self, deadline: Deadline):
+        self.deadline = copy.copy(deadline)
+        self.sources: Optional[list] = None
+
+    def join(self, deadline: Deadline):
+        self.deadline.extend(deadline)
+
+
+def budget_exceeded() -> HTTPException:
+    return HTTPException(
+        status_code=504,
+        detail="Бюджет времени запроса исчерпан до того, как были найдены источники",
+    )
+
+
+async def run_single_flight(
     request: Request,
-    search_params: VectorSearch = Body(),        # получаем параметры поиска из тела запроса
-    db: AsyncSession = Depends(get_db),           # асинхронная сессия SQLAlchemy
+    route: str,
+    search_params: VectorSearch,
+    search,
+    latency_budget_ms: Optional[int] = None,
+):
+    """
+    Одинаковые одновременные запросы (например, по общей ссылке на дайджест) ждут одно
+    общее выполнение поиска. Сессии БД поиск открывает только на время своих SQL-запросов,
+    соединение возвращается в пул до обращений к OpenAI. Слот admission control занимает
+    только общее выполнение, при перегрузке 429/503 получают все его ожидающие.
+    Бюджет времени из заголовка X-Latency-Budget-Ms используется, если его нет в теле запроса.
+    Срок у каждого запроса свой, от его прихода: по истечении срока запрос получает уже
+    найденные источники без ответа LLM (или 504), общее выполнение продолжается для остальных.
+    """
+    if search_params.latency_budget_ms is None and latency_budget_ms is not None:
+        search_params.latency_budget_ms = latency_budget_ms
+    # Бюджет времени отсчитывается с момента прихода запроса, включая ожидание слота
+    deadline = request.app.state.latency_budget.start(search_params.latency_budget_ms)
+
+    single_flight = request.app.state.vector_single_flight
+    key = flight_key(route, search_params)
+    progress = single_flight.state(key)
+    if progress is None:
+        progress = SearchProgress(deadline)
+    else:
+        progress.join(deadline)
+
+    async def run():
+        async with request.app.state.admission[f"vectors/{route}"].admit():
+            return await search(request, search_params, progress.deadline, progress)
+
+    try:
+        # asyncio.timeout, а не wait_for: поиск состояния и вход в single-flight без переключений
+        async with asyncio.timeout(deadline.timeout()):
+            return await single_flight.run(key, run, state=progress)
+    except TimeoutError:
+        if progress.sources is None:
+            raise budget_exceeded()
+        logger.info(f"Latency budget: {route} request answered with the shared sources")
+        if search_params.raw_return:
+            return progress.sources
+        return degraded_response(None, progress.sources)
+
+
+async def answer_within_budget(
+    request: Request, collection: str, messages: list[OpenAIMessage], deadline: Deadline
+) -> tuple[Optional[str], bool]:
+    """
+    Итоговый ответ LLM в пределах бюджета времени: (ответ, полный ли он).
+    Если времени мало — ответ укорачивается через max_tokens, если не хватает совсем
+    или LLM не успевает к сроку — ответа нет.
+    """
+    budget = request.app.state.latency_budget
+    if not budget.allows_completion(deadline):
+        logger.info(f"Latency budget: no time left for the {collection} completion")
+        return None, False
+    max_tokens = budget.completion_max_tokens(deadline)
+    try:
+        with stage(collection, "completion"):
+            answer = await asyncio.wait_for(
+                request.app.state.rag.llm.create_completion(chat=messages, max_tokens=max_tokens),
+                deadline.timeout(),
+            )
+    except asyncio.TimeoutError:
+        logger.warning(f"Latency budget: {collection} completion did not finish in time")
+        return None, False
+    return answer, max_tokens is None
+
+
+def degraded_response(answer: Optional[str], sources: list[dict]) -> dict:
+    """
+    Ответ, не уложившийся в бюджет времени: ранжированные источники в формате raw_return
+    и укороченный ответ LLM (или None).
+    """
+    return {"answer": answer, "sources": sources, "degraded": True}
+
+
+@router.get("/embedding_batches")
+async def embedding_batches(request: Request):
+    """
+    Гистограмма размеров батчей запросов к эмбеддеру: {размер батча: количество батчей}.
+    """
+    histograms = {}
+    for name, text_embedder in (
+        ("news", request.app.state.rag.news_embedder),
+        ("science", request.app.state.rag.science_embedder),
+    ):
+        batcher = text_embedder.embedder.batcher
+        histograms[name] = batcher.histogram() if batcher is not None else {}
+    return histograms
+
+
+async def science_search(
+    request: Request,
+    search_params: VectorSearch,    # параметры поиска из тела запроса
+    deadline: Deadline,             # срок ответа по бюджету времени запроса
+    progress: Optional[SearchProgress] = None,  # общее выполнение одинаковых запросов
 ):
     """
     Поиск похожих научных статей через RAG с фильтрацией и опцией «raw_return».
@@ -40,20 +319,10 @@ async def vector_search(
         content=search_params.query_text,
     )
 
-    # 3) Собираем базовый SQL-запрос с фильтрами по source_name и sphere
-    stmt = select(table)
-    if search_params.source_name:
-        stmt = stmt.where(table.source_name.ilike(search_params.source_name))
-    if search_params.sphere:
-        stmt = stmt.where(table.sphere.ilike(search_params.sphere))
-    if search_params.start_date:
-        stmt = stmt.where(table.published_date >= search_params.start_date)
-    if search_params.end_date:
-        stmt = stmt.where(table.published_date <= search_params.end_date)
-
-    # 4) Выполняем запрос и извлекаем все id статей, соответствующих фильтрам
-    result_filter_ids = await db.execute(stmt)
-    article_ids = [row.id for row in result_filter_ids.scalars().all()]
+    # 3-4) Извлекаем id статей, соответствующих фильтрам по source_name, sphere и датам
+    with stage("science", "filter"):
+        async with read_session() as db:
+            article_ids = await filter_ids(db, science_filter_statement(search_params))
 
     # 5) Если по фильтрам ничего не найдено — 404
     if not article_ids:
@@ -68,69 +337,76 @@ async def vector_search(
         request.app.state.rag.science_embedder.max_top_k,
     )
 
-    # 7) Первый проход поиска похожих embedding-точек
+    # 7) Первый проход поиска похожих embedding-точек (эмбеддинг и поиск — в пределах бюджета)
     top_similar_points: list[dict] = []
-    similar_points = await request.app.state.rag.science_embedder.search_similar(
-        text=search_params.query_text,
-        top_k=top_k,
-        filter_ids=article_ids,
-    )
+    try:
+        similar_points = await asyncio.wait_for(
+            request.app.state.rag.science_embedder.search_similar(
+                text=search_params.query_text,
+                top_k=top_k,
+                filter_ids=article_ids,
+                with_payload=display_fields(search_params),
+                score_threshold=search_params.relevance,
+            ),
+            deadline.timeout(),
+        )
+    except asyncio.TimeoutError:
+        raise budget_exceeded()
     top_similar_points.extend(similar_points)
 
-    # 8) Повторяем поиск с перефразированием для повышения охвата
+    # 8) Повторяем поиск с перефразированием для повышения охвата, пока позволяет бюджет времени
     for _ in range(1, search_params.queries_count):
-        # 8.1) Генерируем текст-подсказку для перефразирования
-        rephrase_text = request.app.state.rag.generate_rephrase_promt()
-        rephrase_text = trim_prompt_to_tokens(
-            rephrase_text,
-            max_tokens=8191,
-            model="text-embedding-3-large",
-        )
-        # 8.2) Упаковываем исходный и перефразированный тексты для LLM
-        rephrase_messages = [
-            OpenAIMessage(role="user", content=rephrase_text),
-            query_text_openai_message,
-        ]
-        # 8.3) Получаем перефразированный запрос
-        rephrase_result = await request.app.state.rag.llm.create_completion(
-            chat=rephrase_messages
-        )
-        # 8.4) Ищем похожие документы по новому тексту
-        similar_points = await request.app.state.rag.science_embedder.search_similar(
-            text=rephrase_result,
-            top_k=top_k,
-            filter_ids=article_ids,
-        )
+        if not request.app.state.latency_budget.allows_rephrase(deadline):
+            break
+        try:
+            # 8.1-8.3) Получаем перефразированный запрос
+            with stage("science", "rephrase"):
+                rephrase_result = await asyncio.wait_for(
+                    rephrase_query(request, query_text_openai_message), deadline.timeout()
+                )
+            # 8.4) Ищем похожие документы по новому тексту
+            similar_points = await asyncio.wait_for(
+                request.app.state.rag.science_embedder.search_similar(
+                    text=rephrase_result,
+                    top_k=top_k,
+                    filter_ids=article_ids,
+                    with_payload=display_fields(search_params),
+                    score_threshold=search_params.relevance,
+                ),
+                deadline.timeout(),
+            )
+        except asyncio.TimeoutError:
+            logger.info("Latency budget: science paraphrase pass did not finish in time")
+            break
         top_similar_points.extend(similar_points)
 
-    # 9) Убираем дубли, оставляя запись с максимальным score для каждого id
-    best_unique_points: dict[int, dict] = {}
-    for point in top_similar_points:
-        doc_id = point["id"]
-        score = point["score"]
-        if doc_id not in best_unique_points or score > best_unique_points[doc_id]["score"]:
-            best_unique_points[doc_id] = point
-
-    # 10) Сортируем по убыванию score и берём top_k
-    final_top_similar = sorted(
-        best_unique_points.values(),
-        key=lambda x: x["score"],
-        reverse=True,
-    )[:top_k]
-
-    # 11) Если raw_return=True — возвращаем только id и score, без LLM
+    # 9-10) Убираем дубли (с максимальным score для каждого id), сортируем, берём top_k
+    # и отбрасываем хвост после разрыва score
+    final_top_similar = cut_at_score_gap(
+        best_unique_points(top_similar_points, top_k), search_params.score_gap
+    )
+    if not final_top_similar:
+        raise HTTPException(
+            status_code=404,
+            detail="По вашему запросу не найдено релевантных статей",
+        )
+
+    # 11) Если raw_return=True — возвращаем только id и score (и title, url, date при raw_payload), без LLM
+    await fill_display_payload("science", search_params, final_top_similar)
+    raw_points = [raw_point(point, search_params) for point in final_top_similar]
+    if progress is not None:
+        progress.sources = raw_points
     if search_params.raw_return:
-        return [
-            {"id": point["id"], "score": point["score"]}
-            for point in final_top_similar
-        ]
+        return raw_points
 
     # 12) Иначе — собираем полные объекты по id из БД
     final_ids = [item["id"] for item in final_top_similar]
-    result_objects = await db.execute(
-        select(table).where(table.id.in_(final_ids))
-    )
-    result_rows = result_objects.scalars().all()
+    with stage("science", "fetch"):
+        async with read_session() as db:
+            result_objects = await db.execute(
+                select(table).where(table.id.in_(final_ids))
+            )
+            result_rows = result_objects.scalars().all()
 
     # 13) Готовим тексты для промпта суммаризации
     text_result_rows = [
@@ -158,10 +434,13 @@ async def vector_search(
         OpenAIMessage(role="user", content=full_texts),
     ]
 
-    # 16) Получаем финальный ответ от LLM
-    sum_up_llm_answer = await request.app.state.rag.llm.create_completion(
-        chat=sum_up_messages
+    # 16) Получаем финальный ответ от LLM в пределах бюджета времени,
+    # иначе — источники и укороченный ответ
+    sum_up_llm_answer, complete = await answer_within_budget(
+        request, "science", sum_up_messages, deadline
     )
+    if not complete:
+        return degraded_response(sum_up_llm_answer, raw_points)
 
     # 17) Добавляем блок «Источники» к ответу и возвращаем
     final_answer = (
@@ -172,11 +451,25 @@ async def vector_search(
     return final_answer
 
 
-@router.post("/news")
+@router.post("/science")
 async def vector_search(
-    search_params: VectorSearch,              # параметры поиска: текст, фильтры по дате и источнику, топ-K и число итераций
-    request: Request,                         # объект запроса FastAPI, из него берём доступ к RAG-энкодеру и LLM
-    db: AsyncSession = Depends(get_db),       # асинхронная сессия SQLAlchemy для доступа к базе
+    request: Request,
+    search_params: VectorSearch = Body(),        # получаем параметры поиска из тела запроса
+    latency_budget_ms: Optional[int] = Header(None, alias=LATENCY_BUDGET_HEADER, gt=0),
+):
+    """
+    Поиск похожих научных статей, см. science_search.
+    """
+    return await run_single_flight(
+        request, "science", search_params, science_search, latency_budget_ms
+    )
+
+
+async def news_search(
+    request: Request,               # объект запроса FastAPI, из него берём доступ к RAG-энкодеру и LLM
+    search_params: VectorSearch,    # параметры поиска: текст, фильтры по дате и источнику, топ-K и число итераций
+    deadline: Deadline,             # срок ответа по бюджету времени запроса
+    progress: Optional[SearchProgress] = None,  # общее выполнение одинаковых запросов
 ):
     """
     Поиск похожих новостных статей через RAG с возможностью фильтрации по дате и источнику.
@@ -199,21 +492,10 @@ async def vector_search(
         content=search_params.query_text,
     )
 
-    # 3. Строим SQL-запрос с базовой выборкой всех записей
-    stmt = select(table)
-    # 3.1. Фильтр по источнику, если задан
-    if search_params.source_name:
-        stmt = stmt.where(table.source_name == search_params.source_name)
-    # 3.2. Фильтр по дате начала, если задан
-    if search_params.start_date:
-        stmt = stmt.where(table.publication_datetime >= search_params.start_date)
-    # 3.3. Фильтр по дате конца, если задан
-    if search_params.end_date:
-        stmt = stmt.where(table.publication_datetime <= search_params.end_date)
-
-    # 4. Выполняем фильтрованный запрос и собираем все id статей
-    result_filter_ids = await db.execute(stmt)
-    article_ids = [cur.id for cur in result_filter_ids.scalars().all()]
+    # 3-4. Собираем id статей, соответствующих фильтрам по источнику и датам
+    with stage("news", "filter"):
+        async with read_session() as db:
+            article_ids = await filter_ids(db, news_filter_statement(search_params))
 
     # 5. Если ничего не найдено — возвращаем 404
     if not article_ids:
@@ -228,67 +510,80 @@ async def vector_search(
         request.app.state.rag.news_embedder.max_top_k,
     )
 
-    # 7. Первый проход поиска похожих точек (embedding search)
+    # 7. Первый проход поиска похожих точек (embedding search, в пределах бюджета)
     top_similar_points: list[dict] = []
-    similar_points = await request.app.state.rag.news_embedder.search_similar(
-        text=search_params.query_text,
-        top_k=top_k,
-        filter_ids=article_ids,
-    )
+    try:
+        similar_points = await asyncio.wait_for(
+            request.app.state.rag.news_embedder.search_similar(
+                text=search_params.query_text,
+                top_k=top_k,
+                filter_ids=article_ids,
+                start_date=search_params.start_date,
+                end_date=search_params.end_date,
+                with_payload=display_fields(search_params),
+                score_threshold=search_params.relevance,
+            ),
+            deadline.timeout(),
+        )
+    except asyncio.TimeoutError:
+        raise budget_exceeded()
     top_similar_points.extend(similar_points)
 
-    # 8. Дополнительные перефразирования и повторный поиск (для повышения recall)
+    # 8. Дополнительные перефразирования и повторный поиск (для повышения recall), пока позволяет бюджет
     for _ in range(1, search_params.queries_count):
-        # 8.1. Генерируем новый запрос для перефразирования
-        rephrase_text = request.app.state.rag.generate_rephrase_promt()
-        rephrase_text = trim_prompt_to_tokens(
-            rephrase_text, 8191, "text-embedding-3-large"
-        )
-        # 8.2. Упаковываем оба сообщения для LLM
-        rephrase_messages = [
-            OpenAIMessage(role="user", content=rephrase_text),
-            query_text_openai_message,
-        ]
-        # 8.3. Получаем перефразированный текст от LLM
-        rephrase_result = await request.app.state.rag.llm.create_completion(
-            chat=rephrase_messages
-        )
-        # 8.4. Ищем похожие документы по новому тексту
-        similar_points = await request.app.state.rag.news_embedder.search_similar(
-            text=rephrase_result,
-            top_k=top_k,
-            filter_ids=article_ids,
-        )
+        if not request.app.state.latency_budget.allows_rephrase(deadline):
+            break
+        try:
+            # 8.1-8.3. Получаем перефразированный текст от LLM
+            with stage("news", "rephrase"):
+                rephrase_result = await asyncio.wait_for(
+                    rephrase_query(request, query_text_openai_message), deadline.timeout()
+                )
+            # 8.4. Ищем похожие документы по новому тексту
+            similar_points = await asyncio.wait_for(
+                request.app.state.rag.news_embedder.search_similar(
+                    text=rephrase_result,
+                    top_k=top_k,
+                    filter_ids=article_ids,
+                    start_date=search_params.start_date,
+                    end_date=search_params.end_date,
+                    with_payload=display_fields(search_params),
+                    score_threshold=search_params.relevance,
+                ),
+                deadline.timeout(),
+            )
+        except asyncio.TimeoutError:
+            logger.info("Latency budget: news paraphrase pass did not finish in time")
+            break
         top_similar_points.extend(similar_points)
 
-    # 9. Убираем дубли, оставляя для каждого id запись с максимальным скором
-    best_unique_points: dict[int, dict] = {}
-    for point in top_similar_points:
-        doc_id = point["id"]
-        score = point["score"]
-        if doc_id not in best_unique_points or score > best_unique_points[doc_id]["score"]:
-            best_unique_points[doc_id] = point
-
-    # 10. Сортируем по скору и берём топ-K
-    final_top_similar = sorted(
-        best_unique_points.values(),
-        key=lambda x: x["score"],
-        reverse=True,
-    )[:top_k]
-
-    # 11) Если raw_return=True — возвращаем только id и score, без LLM
+    # 9-10. Убираем дубли (с максимальным скором для каждого id), сортируем, берём топ-K
+    # и отбрасываем хвост после разрыва score
+    final_top_similar = cut_at_score_gap(
+        best_unique_points(top_similar_points, top_k), search_params.score_gap
+    )
+    if not final_top_similar:
+        raise HTTPException(
+            status_code=404,
+            detail="По вашему запросу не найдено релевантных статей",
+        )
+
+    # 11) Если raw_return=True — возвращаем только id и score (и title, url, date при raw_payload), без LLM
+    await fill_display_payload("news", search_params, final_top_similar)
+    raw_points = [raw_point(point, search_params) for point in final_top_similar]
+    if progress is not None:
+        progress.sources = raw_points
     if search_params.raw_return:
-        return [
-            {"id": point["id"], "score": point["score"]}
-            for point in final_top_similar
-        ]
+        return raw_points
 
     # 12. Извлекаем только id для финального выборочного SQL-запроса
     final_ids = [item["id"] for item in final_top_similar]
-    result_objects = await db.execute(
-        select(table).where(table.id.in_(final_ids))
-    )
-    result_rows = result_objects.scalars().all()
+    with stage("news", "fetch"):
+        async with read_session() as db:
+            result_objects = await db.execute(
+                select(table).where(table.id.in_(final_ids))
+            )
+            result_rows = result_objects.scalars().all()
 
     # 13. Формируем тексты статей для итогового промпта LLM
     text_result_rows = [
@@ -315,10 +610,12 @@ async def vector_search(
         OpenAIMessage(role="user", content=full_texts),
     ]
 
-    # 17. Получаем от LLM итоговый ответ
-    sum_up_llm_answer = await request.app.state.rag.llm.create_completion(
-        chat=sum_up_messages
+    # 17. Получаем от LLM итоговый ответ в пределах бюджета времени, иначе — источники и укороченный ответ
+    sum_up_llm_answer, complete = await answer_within_budget(
+        request, "news", sum_up_messages, deadline
     )
+    if not complete:
+        return degraded_response(sum_up_llm_answer, raw_points)
 
     # 18. Добавляем в конец списка «Источники»
     final_answer = (
@@ -328,4 +625,217 @@ async def vector_search(
     )
 
     # 19. Возвращаем финальный текст клиенту
-    return final_answer
\ No newline at end of file
+    return final_answer
+
+
+@router.post("/news")
+async def vector_search(
+    search_params: VectorSearch,
+    request: Request,
+    latency_budget_ms: Optional[int] = Header(None, alias=LATENCY_BUDGET_HEADER, gt=0),
+):
+    """
+    Поиск похожих новостных статей, см. news_search.
+    """
+    return await run_single_flight(request, "news", search_params, news_search, latency_budget_ms)
+
+
+async def all_collections_search(
+    request: Request,
+    search_params: VectorSearch,
+    deadline: Deadline,
+    progress: Optional[SearchProgress] = None,
+):
+    """
+    Поиск сразу по новостям и научным статьям с одним итоговым ответом LLM.
+    - Запрос эмбеддится один раз (коллекции используют одну модель), обе коллекции
+      ищутся параллельно.
+    - score калибруются по порогу несвязанных документов своей коллекции
+      и сливаются в общий топ-K.
+    - Если raw_return=True, возвращаем список {"collection", "id", "score", "raw_score"}.
+    """
+    rag = request.app.state.rag
+
+    # 1. Обрезаем запрос под лимит токенов модели энкодера
+    search_params.query_text = trim_prompt_to_tokens(
+        search_params.query_text,
+        max_tokens=8191,
+        model="text-embedding-3-large",
+    )
+    query_text_openai_message = OpenAIMessage(
+        role="user",
+        content=search_params.query_text,
+    )
+
+    # 2. id статей, подходящих под фильтры, для каждой коллекции
+    with stage("all", "filter"):
+        async with read_session() as db:
+            news_ids = await filter_ids(db, news_filter_statement(search_params))
+            science_ids = await filter_ids(db, science_filter_statement(search_params))
+    if not news_ids and not science_ids:
+        raise HTTPException(
+            status_code=404,
+            detail="По вашему запросу не найдено релевантных статей",
+        )
+
+    top_k = min(search_params.top_k, rag.news_embedder.max_top_k, rag.science_embedder.max_top_k)
+
+    # 3. Исходный запрос и перефразировки (перефразировки запрашиваются параллельно,
+    # пропускаются, если бюджет времени мал)
+    rephrases_count = search_params.queries_count - 1
+    if not request.app.state.latency_budget.allows_rephrase(deadline):
+        rephrases_count = 0
+    rephrased = []
+    if rephrases_count:
+        try:
+            with stage("all", "rephrase"):
+                rephrased = await asyncio.wait_for(
+                    asyncio.gather(*(
+                        rephrase_query(request, query_text_openai_message)
+                        for _ in range(rephrases_count)
+                    )),
+                    deadline.timeout(),
+                )
+        except asyncio.TimeoutError:
+            logger.info("Latency budget: paraphrases of /all did not finish in time")
+    query_texts = [search_params.query_text, *rephrased]
+
+    # 4. Один эмбеддинг на текст запроса, поиск по обеим коллекциям параллельно
+    async def search_collection(embedder, collection: str, ids: list[int], vector):
+        if not ids:
+            return []
+        points = await embedder.search_by_vector(
+            vector,
+            top_k=top_k,
+            filter_ids=ids,
+            start_date=search_params.start_date,
+            end_date=search_params.end_date,
+            with_payload=display_fields(search_params),
+            score_threshold=search_params.relevance,
+        )
+        return [{**point, "collection": collection} for point in points]
+
+    news_points, science_points = [], []
+    for number, query_text in enumerate(query_texts):
+        try:
+            with stage("all", "embedding"):
+                vector = await asyncio.wait_for(
+                    rag.news_embedder.get_embedding(query_text), deadline.timeout()
+                )
+            found_news, found_science = await asyncio.wait_for(
+                asyncio.gather(
+                    search_collection(rag.news_embedder, "news", news_ids, vector),
+                    search_collection(rag.science_embedder, "science", science_ids, vector),
+                ),
+                deadline.timeout(),
+            )
+        except asyncio.TimeoutError:
+            if number == 0:
+                raise budget_exceeded()
+            logger.info("Latency budget: searches of paraphrases of /all did not finish in time")
+            break
+        news_points.extend(found_news)
+        science_points.extend(found_science)
+
+    # 5. Отбрасываем хвосты после разрыва score, калибруем score коллекций и берём общий топ-K
+    news_points = cut_at_score_gap(best_unique_points(news_points, top_k), search_params.score_gap)
+    science_points = cut_at_score_gap(
+        best_unique_points(science_points, top_k), search_params.score_gap
+    )
+    score_floors = request.app.state.federated_score_floors
+    final_top_similar = best_unique_points(
+        normalize_scores(news_points, score_floors["news"])
+        + normalize_scores(science_points, score_floors["science"]),
+        top_k,
+    )
+    if not final_top_similar:
+        raise HTTPException(
+            status_code=404,
+            detail="По вашему запросу не найдено релевантных статей",
+        )
+
+    for collection in ("news", "science"):
+        await fill_display_payload(
+            collection,
+            search_params,
+            [point for point in final_top_similar if point["collection"] == collection],
+        )
+    raw_points = [
+        {
+            "collection": point["collection"],
+            **raw_point(point, search_params),
+            "raw_score": point["raw_score"],
+        }
+        for point in final_top_similar
+    ]
+    if progress is not None:
+        progress.sources = raw_points
+    if search_params.raw_return:
+        return raw_points
+
+    # 6. Полные объекты из обеих таблиц в порядке общего рейтинга
+    final_news_ids = [p["id"] for p in final_top_similar if p["collection"] == "news"]
+    final_science_ids = [p["id"] for p in final_top_similar if p["collection"] == "science"]
+    with stage("all", "fetch"):
+        rows = {}
+        async with read_session() as db:
+            if final_news_ids:
+                result = await db.execute(
+                    select(ModelsNewsArticle).where(ModelsNewsArticle.id.in_(final_news_ids))
+                )
+                rows.update({("news", row.id): row for row in result.scalars().all()})
+            if final_science_ids:
+                result = await db.execute(
+                    select(ModelsScienceArticle)
+                    .where(ModelsScienceArticle.id.in_(final_science_ids))
+                )
+                rows.update({("science", row.id): row for row in result.scalars().all()})
+
+    text_result_rows, sources = [], []
+    for point in final_top_similar:
+        row = rows.get((point["collection"], point["id"]))
+        if row is None:
+            continue
+        if point["collection"] == "news":
+            text_result_rows.append(f"Новость: Название - {row.title}, Текст - {row.text}")
+            published = row.publication_datetime
+        else:
+            text_result_rows.append(
+                f"Научная статья: Название – {row.title}, Текст – {row.full_summary}"
+            )
+            published = row.published_date
+        sources.append(
+            f"{row.title} [{row.url}]{f' [{published.date()}]' if published else ''}"
+        )
+
+    full_texts = trim_prompt_to_tokens("\n".join(text_result_rows), 100000, "gpt-4o")
+
+    # 7. Один итоговый ответ LLM по источникам из обеих коллекций
+    sum_up_messages = [
+        OpenAIMessage(role="user", content=rag.generate_prompt()),
+        query_text_openai_message,
+        OpenAIMessage(role="user", content=full_texts),
+    ]
+    sum_up_llm_answer, complete = await answer_within_budget(request, "all", sum_up_messages, deadline)
+    if not complete:
+        return degraded_response(sum_up_llm_answer, raw_points)
+
+    return (
+        sum_up_llm_answer
+        + "\n\n\n\nИсточники:\n\n"
+        + "\n\n".join(sources)
+    )
+
+
+@router.post("/all")
+async def federated_search(
+    search_params: VectorSearch,
+    request: Request,
+    latency_budget_ms: Optional[int] = Header(None, alias=LATENCY_BUDGET_HEADER, gt=0),
+):
+    """
+    Поиск сразу по новостям и научным статьям, см. all_collections_search.
+    """
+    return await run_single_flight(
+        request, "all", search_params, all_collections_search, latency_budget_ms
+    )
@@ -0,0 +1,159 @@
+import heapq
+import logging
+import math
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from acontroller.app.models.science_article import ScienceArticle
+from common.common.routes_actual import ActualItem, ActualList
+
+logger = logging.getLogger(__name__)
+
+
+class ActualFeed:
+    """
+    Precomputed "what's relevant now" ranking of science articles for /science/actual.
+
+    score = relevance_weight * relevance_score
+          + recency_weight * 0.5 ** (age_days / half_life_days)
+          + popularity_weight * p / (1 + p), p = ln(1 + views + 2 * downloads)
+
+    The top `size` articles are kept in memory: ingest and updates offer single
+    articles, a scheduled refresh recomputes the ranking from the table (recency
+    decays, so scores of kept articles go stale). Requests only slice the sorted
+    snapshot.
+    """
+
+    def __init__(
+        self,
+        size: int = 100,
+        half_life_days: float = 30,
+        relevance_weight: float = 1.0,
+        recency_weight: float = 1.0,
+        popularity_weight: float = 0.5,
+        refresh_interval_minutes: float = 15,
+    ):
+        """
+        :param size: Number of articles in the feed
+        :param half_life_days: Age at which the recency term halves
+        :param relevance_weight: Weight of ScienceArticle.relevance_score
+        :param recency_weight: Weight of the recency term
+        :param popularity_weight: Weight of the views / downloads term
+        :param refresh_interval_minutes: Period of the full refresh
+        """
+        self.size = size
+        self.half_life_days = half_life_days
+        self.relevance_weight = relevance_weight
+        self.recency_weight = recency_weight
+        self.popularity_weight = popularity_weight
+        self.refresh_interval_minutes = refresh_interval_minutes
+
+        self._items: Dict[int, Tuple[float, ActualItem]] = {}
+        self._snapshot: List[ActualItem] = []
+        self.refreshed_at: Optional[datetime] = None
+
+    def score(
+        self,
+        relevance_score: float,
+        published: Optional[datetime],
+        views: Optional[int],
+        downloads: Optional[int],
+        now: Optional[datetime] = None,
+    ) -> float:
+        now = now or datetime.now(timezone.utc)
+        recency = 0.0
+        if published is not None:
+            if published.tzinfo is None:
+                published = published.replace(tzinfo=timezone.utc)
+            age_days = max((now - published).total_seconds() / 86400, 0.0)
+            recency = 0.5 ** (age_days / self.half_life_days)
+        popularity = math.log1p((views or 0) + 2 * (downloads or 0))
+        return (
+            self.relevance_weight * (relevance_score or 0.0)
+            + self.recency_weight * recency
+            + self.popularity_weight * popularity / (1 + popularity)
+        )
+
+    def _article_score(self, article, now: Optional[datetime] = None) -> float:
+        return self.score(
+            article.relevance_score,
+            article.published_date or article.parsed_at,
+            article.views_count,
+            article.downloads_count,
+            now,
+        )
+
+    @staticmethod
+    def _item(article) -> ActualItem:
+        return ActualItem(id=article.id, title=article.title, body=article.annotation)
+
+    def _publish(self):
+        ranked = sorted(self._items.values(), key=lambda entry: entry[0], reverse=True)
+        self._snapshot = [item for _, item in ranked]
+
+    def offer(self, article):
+        """
+        Add a new or updated article if it ranks within the top.
+
+        :param article: ScienceArticle row
+        """
+        score = self._article_score(article)
+        if article.id not in self._items and len(self._items) >= self.size:
+            lowest_id = min(self._items, key=lambda item_id: self._items[item_id][0])
+            if self._items[lowest_id][0] >= score:
+                return
+            del self._items[lowest_id]
+        self._items[article.id] = (score, self._item(article))
+        self._publish()
+
+    def remove(self, article_id: int):
+        """
+        Drop a deleted article, the free place is filled by the next refresh.
+        """
+        if self._items.pop(article_id, None) is not None:
+            self._publish()
+
+    def _order_expression(self):
+        """
+        SQL version of the score to preselect candidates of the refresh.
+        """
+        table = ScienceArticle
+        published = func.coalesce(table.published_date, table.parsed_at)
+        age_days = func.greatest(
+            func.extract("epoch", func.now() - published) / 86400, literal(0.0)
+        )
+        popularity = func.ln(
+            1 + func.coalesce(table.views_count, 0) + 2 * func.coalesce(table.downloads_count, 0)
+        )
+        return (
+            self.relevance_weight * func.coalesce(table.relevance_score, 0.0)
+            + self.recency_weight * func.power(0.5, age_days / self.half_life_days)
+            + self.popularity_weight * popularity / (1 + popularity)
+        )
+
+    async def refresh(self, db: AsyncSession):
+        """
+        Recompute the ranking from science_articles.
+        """
+        result = await db.execute(
+            select(ScienceArticle).order_by(self._order_expression().desc()).limit(self.size)
+        )
+        now = datetime.now(timezone.utc)
+        ranked = heapq.nlargest(
+            self.size,
+            ((self._article_score(article, now), article) for article in result.scalars().all()),
+            key=lambda entry: entry[0],
+        )
+        self._items = {article.id: (score, self._item(article)) for score, article in ranked}
+        self._publish()
+        self.refreshed_at = now
+        logger.info(f"Actual feed refreshed, {len(self._items)} articles")
+
+    def page(self, skip: int = 0, limit: int = 20) -> ActualList:
+        snapshot = self._snapshot
+        return ActualList(
+            items=snapshot[skip:skip + limit], total=len(snapshot), skip=skip, limit=limit
+        )
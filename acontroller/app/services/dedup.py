@@ -0,0 +1,173 @@
+import logging
+import re
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from acontroller.app.models.news_article import NewsArticle
+from acontroller.app.models.news_signature import NewsSignature
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WORD_RE = re.compile(r"\w+")
+_URL_RE = re.compile(r"https?://\S+")
+
+
+class NearDuplicateIndex:
+    """
+    MinHash signatures of news texts with an in-memory LSH index for finding
+    near-duplicates (the same story reposted with small edits).
+
+    Texts are split into word shingles, a signature of num_perm minhashes estimates
+    the Jaccard similarity of two texts. Signatures are split into bands, texts sharing
+    a band are candidates, candidates with estimated similarity >= threshold are duplicates.
+    Only canonical articles published within window_days are indexed.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 128,
+        bands: int = 32,
+        shingle_size: int = 2,
+        threshold: float = 0.7,
+        window_days: int = 7,
+        seed: int = 1,
+    ):
+        """
+        :param num_perm: Number of minhash permutations (signature length)
+        :param bands: Number of LSH bands, num_perm must be divisible by it
+        :param shingle_size: Number of words in a shingle
+        :param threshold: Minimal estimated Jaccard similarity of duplicates
+        :param window_days: How long published articles stay in the index
+        :param seed: Seed of the permutations, must not change once signatures are stored
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+        self.window = timedelta(days=window_days)
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+
+        self.signatures: Dict[int, np.ndarray] = {}
+        self.published: Dict[int, datetime] = {}
+        self._buckets: Dict[Tuple[int, bytes], Set[int]] = defaultdict(set)
+        self._added = 0
+
+    def _shingles(self, text: str) -> List[str]:
+        words = _WORD_RE.findall(_URL_RE.sub(" ", text.lower()))
+        if len(words) <= self.shingle_size:
+            return [" ".join(words)]
+        return [
+            " ".join(words[i:i + self.shingle_size])
+            for i in range(len(words) - self.shingle_size + 1)
+        ]
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        MinHash signature of the text.
+
+        :param text: News text
+        :return: Array of num_perm uint32 minhashes
+        """
+        hashes = np.array(
+            [zlib.crc32(shingle.encode()) for shingle in set(self._shingles(text))],
+            dtype=np.uint64,
+        )
+        # Universal hashing (a * x + b) mod p as the permutations, uint64 overflow wraps
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [
+            (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def find_duplicate(
+        self, signature: np.ndarray, exclude: Optional[int] = None
+    ) -> Optional[Tuple[int, float]]:
+        """
+        Most similar indexed article if it is a near-duplicate.
+
+        :param signature: Signature of the new text
+        :param exclude: Id of the article itself, when checking an updated text
+        :return: (article id, estimated similarity) or None
+        """
+        candidates: Set[int] = set()
+        for key in self._band_keys(signature):
+            candidates |= self._buckets.get(key, set())
+        candidates.discard(exclude)
+
+        best = None
+        for article_id in candidates:
+            similarity = float(np.mean(self.signatures[article_id] == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (article_id, similarity)
+        return best
+
+    def add(self, article_id: int, signature: np.ndarray, published: datetime):
+        """
+        Index a canonical article.
+        """
+        if article_id in self.signatures:
+            self.remove(article_id)
+        if published.tzinfo is None:
+            published = published.replace(tzinfo=timezone.utc)
+        self.signatures[article_id] = signature
+        self.published[article_id] = published
+        for key in self._band_keys(signature):
+            self._buckets[key].add(article_id)
+
+        self._added += 1
+        if self._added % 1000 == 0:
+            self.prune()
+
+    def remove(self, article_id: int):
+        signature = self.signatures.pop(article_id, None)
+        self.published.pop(article_id, None)
+        if signature is None:
+            return
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(article_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def prune(self, now: Optional[datetime] = None):
+        """
+        Remove articles published before the window.
+        """
+        now = now or datetime.now(timezone.utc)
+        if now.tzinfo is None:
+            now = now.replace(tzinfo=timezone.utc)
+        cutoff = now - self.window
+        for article_id in [i for i, p in self.published.items() if p < cutoff]:
+            self.remove(article_id)
+
+    async def load(self, db: AsyncSession):
+        """
+        Fill the index from the stored signatures of articles within the window.
+        """
+        cutoff = datetime.now(timezone.utc) - self.window
+        result = await db.execute(
+            select(NewsSignature.article_id, NewsSignature.signature, NewsArticle.publication_datetime)
+            .join(NewsArticle, NewsArticle.id == NewsSignature.article_id)
+            .where(NewsArticle.publication_datetime >= cutoff)
+        )
+        for article_id, signature, published in result.all():
+            self.add(article_id, np.frombuffer(signature, dtype=np.uint32), published)
+        logger.info(f"Loaded {len(self.signatures)} news signatures into the LSH index")
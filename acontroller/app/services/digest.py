@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from acontroller.app.models.digest import Digest
+from acontroller.app.models.news_article import NewsArticle
+from acontroller.app.models.news_summary import NewsSummary
+from acontroller.app.utils.metrics import stage
+from acontroller.app.utils.utils import trim_prompt_to_tokens
+from .rag import OpenAILLM, OpenAIMessage
+
+logger = logging.getLogger(__name__)
+
+PROMPTS_DIR = Path(__file__).parent
+_SUMMARY_LINE_RE = re.compile(r"^\s*\[(\d+)\]\s*(.+?)\s*$")
+
+
+def chunks(items: Sequence, size: int) -> List[Sequence]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def naive_utc(value: datetime) -> datetime:
+    """
+    digests stores timestamps without time zone, in UTC.
+    """
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class DigestBuilder:
+    """
+    Map-reduce digest of the news published within a time window.
+
+    Map: groups of articles are summarised concurrently, one short summary per
+    article. Summaries are cached in news_summaries by article and content hash,
+    so digests of overlapping windows only summarise new or changed articles.
+    Reduce: summaries are merged into partial digests group by group, concurrently,
+    until they fit into one final call. The number of concurrent LLM calls is bounded.
+    """
+
+    def __init__(
+        self,
+        llm: OpenAILLM,
+        session_factory,
+        map_group_size: int = 20,
+        reduce_group_size: int = 30,
+        max_concurrency: int = 8,
+        article_max_tokens: int = 1500,
+    ):
+        """
+        :param llm: LLM used for both stages
+        :param session_factory: Factory of database sessions, sessions are not held during LLM calls
+        :param map_group_size: Number of articles summarised in one call
+        :param reduce_group_size: Number of summaries merged in one call
+        :param max_concurrency: Maximum number of concurrent LLM calls
+        :param article_max_tokens: Article texts are trimmed to this many tokens for the map stage
+        """
+        self.llm = llm
+        self.session_factory = session_factory
+        self.map_group_size = map_group_size
+        self.reduce_group_size = reduce_group_size
+        self.article_max_tokens = article_max_tokens
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.map_prompt = (PROMPTS_DIR / "prompt_digest_map.txt").read_text()
+        self.reduce_prompt = (PROMPTS_DIR / "prompt_digest_reduce.txt").read_text()
+
+    async def _complete(self, instruction: str, content: str) -> str:
+        async with self._semaphore:
+            return await self.llm.create_completion([
+                OpenAIMessage(role="system", content=instruction),
+                OpenAIMessage(role="user", content=content),
+            ])
+
+    async def _summarise_group(self, articles: Sequence) -> Dict[int, str]:
+        """
+        Summaries of a group of articles in one call, {article id: summary}.
+        Articles the model skipped are left out.
+        """
+        content = "\n\n".join(
+            f"[{number}] {article.title or ''}\n"
+            f"{trim_prompt_to_tokens(article.text, self.article_max_tokens, self.llm.model_name)}"
+            for number, article in enumerate(articles, start=1)
+        )
+        answer = await self._complete(self.map_prompt, content)
+
+        summaries = {}
+        for line in answer.splitlines():
+            match = _SUMMARY_LINE_RE.match(line)
+            if match and 1 <= int(match.group(1)) <= len(articles):
+                summaries[articles[int(match.group(1)) - 1].id] = match.group(2)
+        if len(summaries) < len(articles):
+            logger.warning(f"Digest map: {len(articles) - len(summaries)} articles without summary")
+        return summaries
+
+    async def _store_summaries(self, summaries: Dict[int, str], hashes: Dict[int, Optional[str]]):
+        """
+        Cache summaries in news_summaries under the content hash they were made from.
+        """
+        if not summaries:
+            return
+        insert_stmt = pg_insert(NewsSummary).values([
+            {
+                "article_id": article_id,
+                "content_hash": hashes[article_id],
+                "summary": text,
+                "model": self.llm.model_name,
+            }
+            for article_id, text in summaries.items()
+        ])
+        async with self.session_factory() as db:
+            await db.execute(insert_stmt.on_conflict_do_update(
+                index_elements=["article_id"],
+                set_={
+                    "content_hash": insert_stmt.excluded.content_hash,
+                    "summary": insert_stmt.excluded.summary,
+                    "model": insert_stmt.excluded.model,
+                    "created_at": insert_stmt.excluded.created_at,
+                },
+            ))
+            await db.commit()
+
+    async def _map_group(self, articles: Sequence, hashes: Dict[int, Optional[str]]) -> Dict[int, str]:
+        summaries = await self._summarise_group(articles)
+        await self._store_summaries(summaries, hashes)
+        return summaries
+
+    async def _reduce(self, texts: List[str]) -> str:
+        while len(texts) > self.reduce_group_size:
+            texts = list(await asyncio.gather(*(
+                self._complete(self.reduce_prompt, "\n\n".join(group))
+                for group in chunks(texts, self.reduce_group_size)
+            )))
+        return await self._complete(self.reduce_prompt, "\n\n".join(texts))
+
+    async def build(self, start: datetime, end: datetime, title: Optional[str] = None) -> Digest:
+        """
+        Build and store the digest of canonical news published in [start, end).
+
+        :param start: Start of the window
+        :param end: End of the window
+        :param title: Optional digest title
+        :return: Stored digest
+        :raises ValueError: If no news were published within the window
+        """
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(
+                    NewsArticle.id, NewsArticle.title, NewsArticle.text, NewsArticle.content_hash
+                )
+                .where(NewsArticle.canonical_id.is_(None))
+                .where(NewsArticle.publication_datetime >= start)
+                .where(NewsArticle.publication_datetime < end)
+                .order_by(NewsArticle.publication_datetime)
+            )
+            articles = result.all()
+            if not articles:
+                raise ValueError("No news within the window")
+            result = await db.execute(
+                select(NewsSummary).where(NewsSummary.article_id.in_([a.id for a in articles]))
+            )
+            cached = {summary.article_id: summary for summary in result.scalars().all()}
+
+        summaries = {
+            article.id: cached[article.id].summary
+            for article in articles
+            if article.id in cached and cached[article.id].content_hash == article.content_hash
+        }
+        missing = [article for article in articles if article.id not in summaries]
+        logger.info(
+            f"Digest {start} - {end}: {len(articles)} articles, "
+            f"{len(articles) - len(missing)} cached summaries"
+        )
+
+        # Map: every group is stored as soon as it is summarised, so a failed group
+        # (rate limit, OpenAI error) or a failed reduce does not lose the finished ones
+        hashes = {article.id: article.content_hash for article in articles}
+        with stage("digest", "map"):
+            groups = await asyncio.gather(*(
+                self._map_group(group, hashes) for group in chunks(missing, self.map_group_size)
+            ), return_exceptions=True)
+        failures = [group for group in groups if isinstance(group, BaseException)]
+        for group in groups:
+            if not isinstance(group, BaseException):
+                summaries.update(group)
+        if failures:
+            logger.error(
+                f"Digest {start} - {end}: {len(failures)} of {len(groups)} map groups failed, "
+                f"summaries of the others are stored"
+            )
+            raise failures[0]
+
+        # Reduce
+        with stage("digest", "reduce"):
+            body = await self._reduce([
+                f"{article.title or ''}: {summaries.get(article.id, article.title or '')}"
+                for article in articles
+                if article.id in summaries or article.title
+            ])
+
+        async with self.session_factory() as db:
+            digest = Digest(
+                start_datetime=naive_utc(start),
+                end_datetime=naive_utc(end),
+                article_ids=[str(article.id) for article in articles],
+                title=title,
+                body=body,
+            )
+            db.add(digest)
+            await db.commit()
+            await db.refresh(digest)
+        return digest
@@ -0,0 +1,137 @@
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .base import BaseEmbedder
+from .openai_embedder import binary_quantize
+
+logger = logging.getLogger(__name__)
+
+# Multipliers of the polynomial n-gram hashes, one for the bucket and one for the sign
+_BUCKET_BASE = np.uint64(1000003)
+_SIGN_BASE = np.uint64(999983)
+
+
+def _ngram_hashes(codepoints: np.ndarray, n: int, base: np.uint64) -> np.ndarray:
+    """
+    Polynomial hashes (mod 2^64) of all character n-grams of the text.
+    """
+    count = len(codepoints) - n + 1
+    hashes = np.zeros(count, dtype=np.uint64)
+    for offset in range(n):
+        hashes = hashes * base + codepoints[offset:offset + count]
+    return hashes
+
+
+class LocalEmbedder(BaseEmbedder):
+    """
+    Deterministic local embedder without network calls: signed feature hashing of
+    character n-grams into a normalized vector of the configured dimension.
+
+    Vectors are stable across processes and platforms, similar texts get similar
+    vectors, which is enough for development, tests and load tests. Texts without
+    features (empty, or shorter than every n-gram) get a constant unit vector instead
+    of the zero vector, which has no cosine similarity.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        dimensions: int,
+        quantization: str,
+        ngram_sizes: Sequence[int] = (3, 4, 5),
+        **_: Any,
+    ):
+        """
+        Initialize LocalEmbedder.
+
+        :param model_name: Name reported as the model, not used for embedding
+        :param dimensions: Number of dimensions for the embeddings
+        :param quantization: Type of quantization to use ("binary" or "none")
+        :param ngram_sizes: Sizes of the hashed character n-grams
+        Options of other backends (batching, rate limiting) are ignored.
+        """
+        self.model = model_name
+        self.dimensions = dimensions
+        self.quantization = quantization
+        self.ngram_sizes = tuple(ngram_sizes)
+        self.batcher = None
+
+    def _features(self, text: str):
+        padded = f" {text.lower()} "
+        codepoints = np.frombuffer(padded.encode("utf-32-le"), dtype=np.uint32).astype(
+            np.uint64
+        )
+        buckets, signs = [], []
+        for n in self.ngram_sizes:
+            if len(codepoints) < n:
+                continue
+            buckets.append(_ngram_hashes(codepoints, n, _BUCKET_BASE) % np.uint64(self.dimensions))
+            signs.append(_ngram_hashes(codepoints, n, _SIGN_BASE) >> np.uint64(63))
+        if not buckets:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        signs = np.concatenate(signs).astype(np.float64) * 2 - 1
+        return np.concatenate(buckets).astype(np.int64), signs
+
+    async def get_embeddings(self, texts: List[str], priority: Any = None) -> List[np.ndarray]:
+        """
+        Embed several texts at once.
+
+        :param texts: Input texts to embed
+        :param priority: Ignored, kept for compatibility with OpenAIEmbedder
+        :return: Embeddings as numpy arrays, in the order of texts
+        """
+        if not texts:
+            return []
+
+        indices, weights = [], []
+        for row, text in enumerate(texts):
+            buckets, signs = self._features(text)
+            indices.append(buckets + row * self.dimensions)
+            weights.append(signs)
+
+        matrix = np.bincount(
+            np.concatenate(indices),
+            weights=np.concatenate(weights),
+            minlength=len(texts) * self.dimensions,
+        ).reshape(len(texts), self.dimensions)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1, norms)
+        matrix[norms[:, 0] == 0] = 1 / np.sqrt(self.dimensions)
+
+        if self.quantization == "binary":
+            return [binary_quantize(embedding) for embedding in matrix]
+        return list(matrix)
+
+    async def get_embedding(self, text: str) -> np.ndarray:
+        """
+        Embed a text.
+
+        :param text: Input text to embed
+        :return: Embedding as numpy array
+        """
+        return (await self.get_embeddings([text]))[0]
+
+    async def store_embedding(
+        self, text: str, point_id: int, metadata: Optional[Dict[str, Any]] = None
+    ):
+        raise NotImplementedError(
+            "LocalEmbedder should be used with QdrantManager for storage"
+        )
+
+    async def search_similar(
+        self,
+        text: str,
+        top_k: int = 5,
+        filter_ids: Optional[List[int]] = None,
+    ) -> List[dict]:
+        raise NotImplementedError(
+            "LocalEmbedder should be used with QdrantManager for search"
+        )
+
+    async def init_collection(self):
+        """
+        Initialize collection - not needed, LocalEmbedder relies on QdrantManager.
+        """
+        pass
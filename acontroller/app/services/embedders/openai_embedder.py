@@ -1,12 +1,17 @@
 import os
+import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 import backoff
 import numpy as np
 from openai import AsyncOpenAI, RateLimitError, APIError
 
 logger = logging.getLogger(__name__)
 from .base import BaseEmbedder
+from ..rate_limiter import OpenAIRateLimiter, Priority, current_priority
+from acontroller.app.utils.metrics import EMBEDDING_BATCH_SIZE, OPENAI_TOKENS, count_openai_retry
+from acontroller.app.utils.utils import count_tokens
 
 
 def binary_quantize(embeddings: np.ndarray) -> np.ndarray:
@@ -20,6 +25,99 @@ def binary_quantize(embeddings: np.ndarray) -> np.ndarray:
     return (embeddings >= np.mean(embeddings)).astype(np.float32)
 
 
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent single-text embedding requests into multi-input calls.
+
+    Texts submitted within ``window_ms`` of the first queued one (or until
+    ``max_batch_size`` texts are queued) are embedded with one request,
+    and every caller receives its own vector.
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[[List[str], Priority], Awaitable[List[np.ndarray]]],
+        window_ms: float,
+        max_batch_size: int,
+        model: str = "",
+    ):
+        """
+        Initialize EmbeddingBatcher.
+
+        :param embed_batch: Coroutine function embedding a list of texts in one call
+            with the given rate limit priority
+        :param window_ms: How long to wait for more texts before sending a batch
+        :param max_batch_size: Maximum number of texts in one batch
+        :param model: Embedding model name used as the metrics label
+        """
+        self.embed_batch = embed_batch
+        self.model = model
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.batch_sizes: Counter = Counter()
+        self._pending: List[Tuple[str, Priority, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+
+    async def submit(self, text: str) -> np.ndarray:
+        """
+        Queue text for the next batch and wait for its embedding.
+
+        :param text: Input text to embed
+        :return: Embedding as numpy array
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, current_priority.get(), future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, []
+        # Callers that were cancelled while waiting don't need an embedding
+        batch = [item for item in batch if not item[2].done()]
+        if not batch:
+            return
+
+        self.batch_sizes[len(batch)] += 1
+        EMBEDDING_BATCH_SIZE.labels(self.model).observe(len(batch))
+        task = asyncio.create_task(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, Priority, asyncio.Future]]):
+        # The batch is scheduled with the priority of its most urgent caller
+        priority = min(priority for _, priority, _ in batch)
+        try:
+            embeddings = await self.embed_batch([text for text, _, _ in batch], priority)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, _, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
+    def histogram(self) -> Dict[int, int]:
+        """
+        Number of sent batches by batch size.
+
+        :return: Mapping of batch size to the number of batches of that size
+        """
+        return dict(sorted(self.batch_sizes.items()))
+
+
 class OpenAIEmbedder(BaseEmbedder):
     """
     OpenAI-based text embedder that implements BaseEmbedder interface.
@@ -31,6 +129,9 @@ class OpenAIEmbedder(BaseEmbedder):
         dimensions: int,
         quantization: str,
         api_base: Optional[str] = None,
+        batch_window_ms: float = 0,
+        batch_max_size: int = 1,
+        rate_limiter: Optional[OpenAIRateLimiter] = None,
     ):
         """
         Initialize OpenAIEmbedder.
@@ -39,35 +140,85 @@ class OpenAIEmbedder(BaseEmbedder):
         :param dimensions: Number of dimensions for the embeddings
         :param quantization: Type of quantization to use ("binary" or "none")
         :param api_base: Optional custom API base URL
+        :param batch_window_ms: How long concurrent get_embedding calls are collected
+            into one request (0 disables batching)
+        :param batch_max_size: Maximum number of texts sent in one request
+        :param rate_limiter: Optional shared client-side rate limit scheduler
         """
         self.model = model_name
         self.dimensions = dimensions
         self.quantization = quantization
+        self.rate_limiter = rate_limiter
         self.openai_client = AsyncOpenAI(
             base_url=os.environ.get("OPENAI_API_BASE", "https://api.openai.com/v1/")
         )
 
-    @backoff.on_exception(backoff.expo, (RateLimitError, APIError), max_tries=3)
+        self.batcher: Optional[EmbeddingBatcher] = None
+        if batch_window_ms > 0 and batch_max_size > 1:
+            self.batcher = EmbeddingBatcher(
+                self.get_embeddings, batch_window_ms, batch_max_size, model=model_name
+            )
+
     async def get_embedding(self, text: str) -> np.ndarray:
         """
-        Get OpenAI embedding and apply binary quantization if configured.
+        Get OpenAI embedding, coalescing concurrent calls into batches if configured.
 
         :param text: Input text to embed
         :return: Embedding as numpy array
         :raises Exception: If embedding generation fails after retries
         """
+        if self.batcher is not None:
+            return await self.batcher.submit(text)
+        return (await self.get_embeddings([text]))[0]
+
+    @backoff.on_exception(
+        backoff.expo,
+        (RateLimitError, APIError),
+        max_tries=3,
+        on_backoff=count_openai_retry,
+    )
+    async def get_embeddings(
+        self, texts: List[str], priority: Optional[Priority] = None
+    ) -> List[np.ndarray]:
+        """
+        Get OpenAI embeddings for several texts in one request and apply binary
+        quantization if configured.
+
+        :param texts: Input texts to embed
+        :param priority: Rate limit priority, by default the priority of the current request
+        :return: Embeddings as numpy arrays, in the order of texts
+        :raises Exception: If embedding generation fails after retries
+        """
         try:
-            response = await self.openai_client.with_options(
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(
+                    self.model,
+                    sum(count_tokens(text, self.model) for text in texts),
+                    priority,
+                )
+
+            raw_response = await self.openai_client.with_options(
                 timeout=30.0
-            ).embeddings.create(model=self.model, input=text, encoding_format="float")
+            ).embeddings.with_raw_response.create(
+                model=self.model, input=texts, encoding_format="float"
+            )
+            if self.rate_limiter is not None:
+                self.rate_limiter.update_from_headers(self.model, raw_response.headers)
+            response = raw_response.parse()
+            OPENAI_TOKENS.labels(self.model, "prompt").inc(response.usage.prompt_tokens)
 
-            embedding = np.array(response.data[0].embedding)
+            embeddings = [
+                np.array(item.embedding)
+                for item in sorted(response.data, key=lambda item: item.index)
+            ]
             if self.quantization == "binary":
-                return binary_quantize(embedding)
-            logger.debug(f"Successfully generated embedding for text: {text[:50]}...")
-            return embedding
-        except RateLimitError:
+                return [binary_quantize(embedding) for embedding in embeddings]
+            logger.debug(f"Successfully generated {len(embeddings)} embeddings")
+            return embeddings
+        except RateLimitError as e:
             logger.warning("Rate limit exceeded for OpenAI API")
+            if self.rate_limiter is not None:
+                self.rate_limiter.update_from_headers(self.model, e.response.headers)
             raise
         except APIError as e:
             logger.error(f"OpenAI API error: {str(e)}")
@@ -0,0 +1,40 @@
+from typing import Any, Dict, Type
+
+from .base import BaseEmbedder
+from .local_embedder import LocalEmbedder
+from .openai_embedder import OpenAIEmbedder
+
+# Embedder backends selectable with embedding_model.backend in public_config.yaml
+EMBEDDER_BACKENDS: Dict[str, Type[BaseEmbedder]] = {
+    "openai": OpenAIEmbedder,
+    "local": LocalEmbedder,
+}
+
+
+def register_embedder(name: str, embedder_class: Type[BaseEmbedder]):
+    """
+    Register an embedder backend under the name.
+
+    :param name: Backend name used in the config
+    :param embedder_class: BaseEmbedder subclass
+    """
+    EMBEDDER_BACKENDS[name] = embedder_class
+
+
+def create_embedder(backend: str, **kwargs: Any) -> BaseEmbedder:
+    """
+    Create an embedder of the configured backend.
+
+    :param backend: Backend name
+    :param kwargs: Constructor arguments of the backend
+    :return: Embedder instance
+    :raises ValueError: If the backend is unknown
+    """
+    try:
+        embedder_class = EMBEDDER_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(
+            f"Unknown embedder backend '{backend}', "
+            f"expected one of: {', '.join(EMBEDDER_BACKENDS)}"
+        )
+    return embedder_class(**kwargs)
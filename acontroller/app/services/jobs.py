@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import uuid
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import delete, func, or_, select, update
+
+from acontroller.app.models.search_job import SearchJob
+
+logger = logging.getLogger(__name__)
+
+FINISHED = ("done", "failed")
+
+
+class SearchJobQueue:
+    """
+    Background execution of long vector searches and digest builds.
+
+    Jobs are stored in search_jobs: a submit returns the job id at once, a bounded pool
+    of workers claims queued jobs with SELECT ... FOR UPDATE SKIP LOCKED and stores the
+    result. Running jobs renew a heartbeat; jobs whose heartbeat went stale (the process
+    was restarted or killed) are claimed again, up to max_attempts. Jobs and results are
+    deleted after result_ttl_hours.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        handler: Callable[[str, dict], Awaitable[Any]],
+        workers: int = 4,
+        result_ttl_hours: float = 24,
+        lease_seconds: float = 60,
+        max_attempts: int = 3,
+        poll_interval_s: float = 1.0,
+        cleanup_interval_minutes: float = 30,
+    ):
+        """
+        :param session_factory: Factory of sessions of the primary database
+        :param handler: Runs a job: (route, params) -> JSON-serialisable result, route is
+            science / news / all with VectorSearch params or digest with DigestCreate params
+        :param workers: Number of jobs run at once
+        :param result_ttl_hours: Lifetime of jobs and results
+        :param lease_seconds: Running jobs without a heartbeat for this long are reclaimed
+        :param max_attempts: Jobs reclaimed more often than this are failed
+        :param poll_interval_s: Poll interval of idle workers and of long-polling clients
+        :param cleanup_interval_minutes: Period of deleting expired jobs
+        """
+        self.session_factory = session_factory
+        self.handler = handler
+        self.workers = workers
+        self.ttl = timedelta(hours=result_ttl_hours)
+        self.lease = timedelta(seconds=lease_seconds)
+        self.max_attempts = max_attempts
+        self.poll_interval_s = poll_interval_s
+        self.cleanup_interval_minutes = cleanup_interval_minutes
+        self._submitted = asyncio.Event()
+        self._finished: Dict[str, asyncio.Event] = {}
+        self._waiters: Dict[str, int] = {}
+
+    async def submit(self, route: str, params: dict) -> SearchJob:
+        job = SearchJob(
+            id=uuid.uuid4().hex,
+            route=route,
+            params=params,
+            status="queued",
+            attempts=0,
+            expires_at=func.now() + self.ttl,
+        )
+        async with self.session_factory() as db:
+            db.add(job)
+            await db.commit()
+            await db.refresh(job)
+        self._submitted.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[SearchJob]:
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(SearchJob)
+                .where(SearchJob.id == job_id)
+                .where(SearchJob.expires_at > func.now())
+            )
+            return result.scalar_one_or_none()
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[SearchJob]:
+        """
+        Long poll: the job as soon as it is finished, or as it is after timeout seconds.
+        Jobs finished in this process wake the waiter at once, others are polled.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        self._waiters[job_id] = self._waiters.get(job_id, 0) + 1
+        try:
+            while True:
+                job = await self.get(job_id)
+                remaining = deadline - loop.time()
+                if job is None or job.status in FINISHED or remaining <= 0:
+                    return job
+                event = self._finished.setdefault(job_id, asyncio.Event())
+                try:
+                    await asyncio.wait_for(event.wait(), min(remaining, self.poll_interval_s))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            # The last waiter of a job drops its event, jobs finished elsewhere never pop it
+            self._waiters[job_id] -= 1
+            if not self._waiters[job_id]:
+                del self._waiters[job_id]
+                self._finished.pop(job_id, None)
+
+    async def _claim(self) -> Optional[SearchJob]:
+        """
+        Take the oldest queued job, or a running one with a stale heartbeat.
+        """
+        candidate = (
+            select(SearchJob.id)
+            .where(or_(
+                SearchJob.status == "queued",
+                (SearchJob.status == "running") & (SearchJob.heartbeat_at < func.now() - self.lease),
+            ))
+            .order_by(SearchJob.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        async with self.session_factory() as db:
+            result = await db.execute(
+                update(SearchJob)
+                .where(SearchJob.id == candidate)
+                .values(
+                    status="running",
+                    attempts=SearchJob.attempts + 1,
+                    started_at=func.now(),
+                    heartbeat_at=func.now(),
+                )
+                .returning(SearchJob)
+            )
+            job = result.scalar_one_or_none()
+            await db.commit()
+            return job
+
+    async def _update(self, job_id: str, **values):
+        async with self.session_factory() as db:
+            await db.execute(update(SearchJob).where(SearchJob.id == job_id).values(**values))
+            await db.commit()
+
+    async def _finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None):
+        await self._update(
+            job_id,
+            status=status,
+            result=result,
+            error=error,
+            finished_at=func.now(),
+            expires_at=func.now() + self.ttl,
+        )
+        event = self._finished.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.lease.total_seconds() / 3)
+            try:
+                await self._update(job_id, heartbeat_at=func.now())
+            except Exception:
+                logger.exception(f"Search job {job_id}: heartbeat failed")
+
+    async def _run(self, job: SearchJob):
+        if job.attempts > self.max_attempts:
+            await self._finish(job.id, "failed", error="Job was interrupted too many times")
+            return
+
+        heartbeat = asyncio.create_task(self._heartbeat(job.id))
+        try:
+            result = await self.handler(job.route, job.params)
+        except asyncio.CancelledError:
+            # Shutdown: hand the job back right away instead of waiting for the lease to expire
+            await asyncio.shield(self._update(job.id, status="queued"))
+            raise
+        except HTTPException as e:
+            await self._finish(job.id, "failed", error=str(e.detail))
+        except Exception as e:
+            logger.exception(f"Search job {job.id} failed")
+            await self._finish(job.id, "failed", error=str(e) or type(e).__name__)
+        else:
+            await self._finish(job.id, "done", result=result)
+        finally:
+            heartbeat.cancel()
+
+    async def _worker(self, number: int):
+        while True:
+            try:
+                job = await self._claim()
+            except Exception:
+                logger.exception(f"Search job worker {number}: claim failed")
+                job = None
+            if job is None:
+                self._submitted.clear()
+                try:
+                    await asyncio.wait_for(self._submitted.wait(), self.poll_interval_s)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            logger.info(f"Search job worker {number}: running {job.id} (attempt {job.attempts})")
+            try:
+                await self._run(job)
+            except Exception:
+                # E.g. storing the result failed: the job is reclaimed once its lease expires,
+                # the worker keeps serving the queue
+                logger.exception(f"Search job worker {number}: job {job.id} was not finished")
+
+    def start(self) -> List[asyncio.Task]:
+        return [
+            asyncio.create_task(self._worker(number)) for number in range(self.workers)
+        ]
+
+    async def cleanup(self):
+        """
+        Delete expired jobs.
+        """
+        async with self.session_factory() as db:
+            result = await db.execute(delete(SearchJob).where(SearchJob.expires_at <= func.now()))
+            await db.commit()
+        if result.rowcount:
+            logger.info(f"Deleted {result.rowcount} expired search jobs")
@@ -0,0 +1,200 @@
+import logging
+import re
+from datetime import date, datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+_MONTH_RE = re.compile(r"^(\d{4})-(\d{2})$")
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def parse_month(value: str) -> date:
+    """
+    Month from a "YYYY-MM" string.
+
+    :raises ValueError: If the value is not a month
+    """
+    match = _MONTH_RE.match(value)
+    if match is None:
+        raise ValueError(f"Expected a month as YYYY-MM, got '{value}'")
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+class MonthlyPartitions:
+    """
+    Monthly range partitions of a table partitioned by a timestamp column
+    (news by publication_datetime).
+
+    Partitions are named {table}_yYYYYmMM and cover [first day of month, first day
+    of next month). Rows outside of all monthly partitions go to {table}_default.
+    Future partitions are created ahead of time, so inserts never land in the
+    default partition during normal operation. Rows that do (backfills of old
+    months, tables created by create_all) are moved to partitions of their months.
+    Old months can be detached: the rows leave the table (and date-filtered
+    searches) but stay in a standalone table.
+    """
+
+    def __init__(self, table: str, months_ahead: int = 3, column: str = "publication_datetime"):
+        """
+        :param table: Name of the partitioned table
+        :param months_ahead: Number of future months to keep partitions for
+        :param column: Partition key, a timestamp column
+        """
+        self.table = table
+        self.months_ahead = months_ahead
+        self.column = column
+
+    @property
+    def default_partition(self) -> str:
+        return f"{self.table}_default"
+
+    def partition_name(self, month: date) -> str:
+        return f"{self.table}_y{month.year:04d}m{month.month:02d}"
+
+    async def is_partitioned(self, db: AsyncSession) -> bool:
+        result = await db.execute(
+            text("SELECT relkind FROM pg_class WHERE relname = :table AND relkind = 'p'"),
+            {"table": self.table},
+        )
+        return result.first() is not None
+
+    def _create_statement(self, month: date):
+        return text(
+            f'CREATE TABLE IF NOT EXISTS "{self.partition_name(month)}" PARTITION OF "{self.table}" '
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        )
+
+    async def create_partition(self, db: AsyncSession, month: date) -> bool:
+        """
+        Create the partition of the month if it does not exist.
+
+        :return: False if creation failed, e.g. the default partition holds rows of the month
+        """
+        name = self.partition_name(month)
+        try:
+            await db.execute(self._create_statement(month))
+            await db.commit()
+            return True
+        except DBAPIError as e:
+            await db.rollback()
+            logger.error(f"Failed to create partition {name}: {e}")
+            return False
+
+    async def move_default_rows(self, db: AsyncSession) -> List[date]:
+        """
+        Move rows of the default partition to partitions of their months. The default
+        partition is detached while the partitions are created (otherwise creating
+        one fails on rows of its month in the default partition), the table is
+        locked until the commit.
+
+        :param db: Database session, committed after the move
+        :return: Months the rows were moved to
+        """
+        result = await db.execute(text(
+            f'SELECT DISTINCT date_trunc(\'month\', "{self.column}")::date '
+            f'FROM "{self.default_partition}"'
+        ))
+        months = sorted(result.scalars().all())
+        if not months:
+            return []
+
+        try:
+            await db.execute(text(
+                f'ALTER TABLE "{self.table}" DETACH PARTITION "{self.default_partition}"'
+            ))
+            for month in months:
+                await db.execute(self._create_statement(month))
+            await db.execute(text(
+                f'INSERT INTO "{self.table}" SELECT * FROM "{self.default_partition}"'
+            ))
+            await db.execute(text(f'TRUNCATE "{self.default_partition}"'))
+            await db.execute(text(
+                f'ALTER TABLE "{self.table}" ATTACH PARTITION "{self.default_partition}" DEFAULT'
+            ))
+            await db.commit()
+        except DBAPIError:
+            await db.rollback()
+            raise
+        logger.info(
+            f"Moved rows of {len(months)} months from {self.default_partition} to their partitions"
+        )
+        return months
+
+    async def ensure(self, db: AsyncSession, now: Optional[datetime] = None):
+        """
+        Create the default partition and partitions of the current and next months_ahead
+        months, and move rows of the default partition to partitions of their months.
+
+        :param db: Database session, committed after every created partition
+        :param now: Current time, defaults to now in UTC
+        """
+        if not await self.is_partitioned(db):
+            logger.warning(f"Table {self.table} is not partitioned, run the migrations")
+            return
+
+        await db.execute(text(
+            f'CREATE TABLE IF NOT EXISTS "{self.default_partition}" '
+            f'PARTITION OF "{self.table}" DEFAULT'
+        ))
+        await db.commit()
+        try:
+            await self.move_default_rows(db)
+        except DBAPIError as e:
+            logger.error(f"Failed to move rows of {self.default_partition}: {e}")
+
+        now = now or datetime.now(timezone.utc)
+        current = date(now.year, now.month, 1)
+        for offset in range(self.months_ahead + 1):
+            await self.create_partition(db, add_months(current, offset))
+
+    async def list(self, db: AsyncSession) -> List[dict]:
+        """
+        Attached partitions with their bounds and estimated row counts.
+        """
+        result = await db.execute(
+            text(
+                "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid), "
+                "child.reltuples::bigint "
+                "FROM pg_inherits "
+                "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE parent.relname = :table ORDER BY child.relname"
+            ),
+            {"table": self.table},
+        )
+        return [
+            {"name": name, "bounds": bounds, "estimated_rows": max(rows, 0)}
+            for name, bounds, rows in result.all()
+        ]
+
+    async def detach(self, db: AsyncSession, month: date) -> str:
+        """
+        Detach the partition of the month, it stays as a standalone table.
+
+        :return: Name of the detached table
+        :raises ValueError: If the month is not in the past or has no partition
+        """
+        now = datetime.now(timezone.utc)
+        if month >= date(now.year, now.month, 1):
+            raise ValueError("Only partitions of past months can be detached")
+
+        name = self.partition_name(month)
+        # Rows of the month may still be in the default partition
+        await self.move_default_rows(db)
+        partitions = {partition["name"] for partition in await self.list(db)}
+        if name not in partitions:
+            raise ValueError(f"Partition {name} does not exist")
+
+        await db.execute(text(f'ALTER TABLE "{self.table}" DETACH PARTITION "{name}"'))
+        await db.commit()
+        logger.info(f"Detached partition {name}")
+        return name
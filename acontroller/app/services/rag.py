@@ -2,12 +2,16 @@ from datetime import datetime
 from typing import Any, Dict, List, Optional
 import os
 
+import backoff
 import numpy as np
 from qdrant_client import models
 
 from .embedders.base import BaseEmbedder, BaseRAG, BaseLLM, BaseMessage
-from .embedders.openai_embedder import OpenAIEmbedder
+from .embedders.registry import create_embedder
+from .rate_limiter import OpenAIRateLimiter
 from .vector_store import QdrantManager
+from acontroller.app.utils.metrics import OPENAI_TOKENS, count_openai_retry, stage
+from acontroller.app.utils.utils import count_tokens
 from openai import AsyncOpenAI, RateLimitError, APIError
 
 import logging
@@ -23,7 +27,8 @@ logger = logging.getLogger(__name__)
 
 class TextEmbedder(BaseEmbedder):
     """
-    OpenAI-based text embedder and accesser that uses QdrantManager for vector storage and search.
+    Text embedder and accesser that uses the configured embedder backend and
+    QdrantManager for vector storage and search.
     """
 
     def __init__(
@@ -37,9 +42,15 @@ class TextEmbedder(BaseEmbedder):
         default_top_k: int,
         max_top_k: int,
         qdrant_port: int = 6333,
+        batch_window_ms: float = 0,
+        batch_max_size: int = 1,
+        rate_limiter: Optional[OpenAIRateLimiter] = None,
+        embedder_backend: str = "openai",
+        tiering: Optional[dict] = None,
+        matryoshka: Optional[dict] = None,
     ):
         """
-        Initialize TextEmbedder combining OpenAIEmbedder and QdrantManager.
+        Initialize TextEmbedder combining an embedder backend and QdrantManager.
 
         :param qdrant_url: Qdrant server URL
         :param embedding_model_name: Name of the embedding model
@@ -48,6 +59,12 @@ class TextEmbedder(BaseEmbedder):
         :param collection_name: Name of the Qdrant collection
         :param distance_metric: Distance metric for vector search
         :param qdrant_port: Qdrant server port
+        :param batch_window_ms: Window for coalescing concurrent embedding calls (0 disables)
+        :param batch_max_size: Maximum number of texts in one embedding request
+        :param rate_limiter: Optional shared client-side rate limit scheduler
+        :param embedder_backend: Embedder backend name ("openai" or "local")
+        :param tiering: Optional hot/cold tiering config of the collection, see QdrantManager
+        :param matryoshka: Optional two-stage short/full vector config, see QdrantManager
         """
         # Initialize Qdrant manager with full config
         self.qdrant_manager = QdrantManager(
@@ -59,14 +76,23 @@ class TextEmbedder(BaseEmbedder):
                     "collection_name": collection_name,
                     "distance_metric": distance_metric,
                 },
+                "tiering": tiering,
+                "matryoshka": matryoshka,
             }
         )
 
-        # Initialize OpenAI embedder
-        self.embedder = OpenAIEmbedder(
-            model_name=embedding_model_name, dimensions=dimensions, quantization=quantization
+        # Initialize embedder of the configured backend
+        self.embedder = create_embedder(
+            embedder_backend,
+            model_name=embedding_model_name,
+            dimensions=dimensions,
+            quantization=quantization,
+            batch_window_ms=batch_window_ms,
+            batch_max_size=batch_max_size,
+            rate_limiter=rate_limiter,
         )
 
+        self.collection_name = collection_name
         self.default_top_k = default_top_k
         self.max_top_k = max_top_k
 
@@ -84,7 +110,11 @@ class TextEmbedder(BaseEmbedder):
         await self.qdrant_manager.init_collection()
 
     async def store_embedding(
-        self, text: str, point_id: int, metadata: Optional[Dict[str, Any]] = None
+        self,
+        text: str,
+        point_id: int,
+        metadata: Optional[Dict[str, Any]] = None,
+        published: Optional[datetime] = None,
     ):
         """
         Store embedding in Qdrant using QdrantManager.
@@ -92,21 +122,49 @@ class TextEmbedder(BaseEmbedder):
         :param text: Text to embed and store
         :param point_id: Unique identifier for the embedding
         :param metadata: Additional metadata to store with the embedding
+        :param published: Publication time of the text, used for tiering
         """
-        embedding = await self.get_embedding(text)
+        with stage(self.collection_name, "embedding"):
+            embedding = await self.get_embedding(text)
         payload = {"news_id": point_id}  # Only store the news_id
         if metadata:
             payload.update(metadata)
 
-        await self.qdrant_manager.store_embedding(
-            point_id=point_id, vector=embedding.tolist(), payload=payload
-        )
+        with stage(self.collection_name, "qdrant_upsert"):
+            await self.qdrant_manager.store_embedding(
+                point_id=point_id,
+                vector=embedding.tolist(),
+                payload=payload,
+                published=published,
+            )
+
+    async def update_payload(
+        self,
+        point_id: int,
+        metadata: Dict[str, Any],
+        published: Optional[datetime] = None,
+    ):
+        """
+        Update metadata of a stored embedding without re-embedding its text.
+
+        :param point_id: Identifier of the embedding
+        :param metadata: Metadata fields to set
+        :param published: Publication time of the text, used for tiering
+        """
+        with stage(self.collection_name, "qdrant_set_payload"):
+            await self.qdrant_manager.set_payload(
+                point_id=point_id, payload=metadata, published=published
+            )
 
     async def search_similar(
         self,
         text: str,
         top_k: int = 5,
         filter_ids: Optional[List[int]] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        with_payload: Optional[List[str]] = None,
+        score_threshold: Optional[float] = None,
     ) -> List[dict]:
         """
         Search for similar texts using QdrantManager.
@@ -114,13 +172,52 @@ class TextEmbedder(BaseEmbedder):
         :param text: Query text
         :param top_k: Number of results to return
         :param filter_ids: Optional list of ids to filter by
+        :param start_date: Optional start of the publication date range, selects tiers
+        :param end_date: Optional end of the publication date range, selects tiers
+        :param with_payload: Optional payload fields to return with every result
+        :param score_threshold: Optional minimal similarity score of the results
         :return: List of similar documents with scores
         """
-        query_embedding = await self.get_embedding(text)
-        return await self.qdrant_manager.search_similar(
-            vector=query_embedding.tolist(), top_k=top_k, filter_ids=filter_ids
+        with stage(self.collection_name, "embedding"):
+            query_embedding = await self.get_embedding(text)
+        return await self.search_by_vector(
+            query_embedding, top_k, filter_ids, start_date, end_date, with_payload, score_threshold
         )
 
+    async def search_by_vector(
+        self,
+        vector: np.ndarray,
+        top_k: int = 5,
+        filter_ids: Optional[List[int]] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        with_payload: Optional[List[str]] = None,
+        score_threshold: Optional[float] = None,
+    ) -> List[dict]:
+        """
+        Search with an already computed query embedding, e.g. one shared by
+        several collections embedded with the same model.
+
+        :param vector: Query embedding
+        :param top_k: Number of results to return
+        :param filter_ids: Optional list of ids to filter by
+        :param start_date: Optional start of the publication date range, selects tiers
+        :param end_date: Optional end of the publication date range, selects tiers
+        :param with_payload: Optional payload fields to return with every result
+        :param score_threshold: Optional minimal similarity score of the results
+        :return: List of similar documents with scores
+        """
+        with stage(self.collection_name, "qdrant_search"):
+            return await self.qdrant_manager.search_similar(
+                vector=vector.tolist(),
+                top_k=top_k,
+                filter_ids=filter_ids,
+                start_date=start_date,
+                end_date=end_date,
+                with_payload=with_payload,
+                score_threshold=score_threshold,
+            )
+
 
 class OpenAIMessage(BaseMessage):
     def __init__(self, role: str, content: str):
@@ -139,20 +236,61 @@ class OpenAIMessage(BaseMessage):
 
 
 class OpenAILLM(BaseLLM):
-    def __init__(self, model_name: str):
+    def __init__(self, model_name: str, rate_limiter: Optional[OpenAIRateLimiter] = None):
         self.model_name = model_name
+        self.rate_limiter = rate_limiter
         self.client = AsyncOpenAI(base_url=os.environ.get("OPENAI_BASE_URL"))
 
-    async def create_completion(self, chat: List[OpenAIMessage]):
+    def estimate_tokens(self, chat: List[OpenAIMessage]) -> int:
+        """
+        Estimate tokens counted against the rate limit: prompt plus reserved completion.
+        """
+        # Every message costs a few tokens of chat formatting on top of its content
+        prompt_tokens = sum(
+            count_tokens(message.content, self.model_name) + 4 for message in chat
+        )
+        return prompt_tokens + self.rate_limiter.completion_tokens(self.model_name)
+
+    @backoff.on_exception(
+        backoff.expo,
+        (RateLimitError, APIError),
+        max_tries=3,
+        on_backoff=count_openai_retry,
+    )
+    async def create_completion(self, chat: List[OpenAIMessage], max_tokens: Optional[int] = None):
+        """
+        :param chat: Messages of the chat
+        :param max_tokens: Cap of the answer length, e.g. under a tight latency budget
+        """
         try:
-            completion = await self.client.chat.completions.create(
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(
+                    self.model_name, self.estimate_tokens(chat)
+                )
+
+            raw_completion = await self.client.chat.completions.with_raw_response.create(
                 model=self.model_name,
-                messages=[message.to_dict() for message in chat]
+                messages=[message.to_dict() for message in chat],
+                **({"max_tokens": max_tokens} if max_tokens is not None else {}),
             )
+            if self.rate_limiter is not None:
+                self.rate_limiter.update_from_headers(
+                    self.model_name, raw_completion.headers
+                )
+            completion = raw_completion.parse()
+            if completion.usage is not None:
+                OPENAI_TOKENS.labels(self.model_name, "prompt").inc(
+                    completion.usage.prompt_tokens
+                )
+                OPENAI_TOKENS.labels(self.model_name, "completion").inc(
+                    completion.usage.completion_tokens
+                )
             return completion.choices[0].message.content
 
-        except RateLimitError:
+        except RateLimitError as e:
             logger.warning("Rate limit exceeded for OpenAI API")
+            if self.rate_limiter is not None:
+                self.rate_limiter.update_from_headers(self.model_name, e.response.headers)
             raise
         except APIError as e:
             logger.error(f"OpenAI API error: {str(e)}")
@@ -0,0 +1,232 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """
+    Priority classes of OpenAI calls, lower value is served first.
+    """
+
+    INTERACTIVE = 0
+    INGEST = 1
+    REINDEX = 2
+
+
+# Priority of OpenAI calls made from the current request / task
+current_priority: ContextVar[Priority] = ContextVar(
+    "openai_priority", default=Priority.INTERACTIVE
+)
+
+
+def openai_priority(priority: Priority):
+    """
+    FastAPI dependency factory marking all OpenAI calls of a route with the priority.
+
+    :param priority: Priority class of the route
+    :return: Dependency callable
+    """
+
+    async def set_priority():
+        current_priority.set(priority)
+
+    return set_priority
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously up to its capacity over one minute.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.level = min(
+            self.capacity, self.level + (now - self.updated) * self.capacity / 60
+        )
+        self.updated = now
+
+    def wait_time(self, amount: float, reserve: float = 0) -> float:
+        """
+        Seconds until the bucket holds amount on top of the reserve.
+        """
+        missing = amount + reserve - self.level
+        if missing <= 0:
+            return 0.0
+        return missing * 60 / self.capacity
+
+    def set_limit(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = min(self.level, self.capacity)
+
+
+class ModelRateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute budget of one model with a
+    priority queue of waiting calls.
+    """
+
+    def __init__(self, rpm: int, tpm: int, reserve_ratio: float = 0.0):
+        """
+        :param rpm: Requests per minute limit
+        :param tpm: Tokens per minute limit
+        :param reserve_ratio: Share of both budgets that only interactive calls may use
+        """
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.reserve_ratio = reserve_ratio
+        self._waiters: List[Tuple[int, int, float, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    def _reserve(self, bucket: TokenBucket, priority: Priority) -> float:
+        if priority == Priority.INTERACTIVE:
+            return 0.0
+        return bucket.capacity * self.reserve_ratio
+
+    def _wait_time(self, tokens: float, priority: Priority) -> float:
+        self.requests.refill()
+        self.tokens.refill()
+        return max(
+            self.requests.wait_time(1, self._reserve(self.requests, priority)),
+            self.tokens.wait_time(tokens, self._reserve(self.tokens, priority)),
+        )
+
+    def _consume(self, tokens: float):
+        self.requests.level -= 1
+        self.tokens.level -= tokens
+
+    async def acquire(self, tokens: float, priority: Priority):
+        """
+        Wait until the call fits into the budget, calls of higher priority go first.
+
+        :param tokens: Estimated number of tokens of the call
+        :param priority: Priority class of the call
+        """
+        # A call larger than the whole budget would never fit otherwise
+        tokens = min(tokens, self.tokens.capacity * (1 - self.reserve_ratio))
+
+        if not self._waiters and self._wait_time(tokens, priority) == 0:
+            self._consume(tokens)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._waiters, (int(priority), next(self._counter), tokens, future)
+        )
+        self._wakeup.set()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    async def _dispatch(self):
+        while self._waiters:
+            priority, _, tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+
+            delay = self._wait_time(tokens, Priority(priority))
+            if delay > 0:
+                # A call of higher priority may arrive while waiting for the budget
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._waiters)
+            self._consume(tokens)
+            future.set_result(None)
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """
+        Adjust the budget to the x-ratelimit-* headers of an OpenAI response.
+
+        :param headers: Response headers
+        """
+        for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+            limit = headers.get(f"x-ratelimit-limit-{kind}")
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            try:
+                if limit is not None and float(limit) != bucket.capacity:
+                    logger.info(f"OpenAI {kind} limit changed to {limit} per minute")
+                    bucket.set_limit(float(limit))
+                if remaining is not None:
+                    bucket.refill()
+                    bucket.level = min(bucket.level, float(remaining))
+            except ValueError:
+                logger.warning(f"Malformed OpenAI rate limit headers: {dict(headers)}")
+
+    def stats(self) -> Dict[str, Any]:
+        self.requests.refill()
+        self.tokens.refill()
+        return {
+            "requests_available": self.requests.level,
+            "tokens_available": self.tokens.level,
+            "queued": sum(1 for *_, future in self._waiters if not future.done()),
+        }
+
+
+class OpenAIRateLimiter:
+    """
+    Client-side rate limit scheduler shared by all OpenAI embedders and LLMs.
+    Models without configured limits are not throttled.
+    """
+
+    def __init__(self, rate_limits_config: dict):
+        """
+        Initialize OpenAIRateLimiter from the rate_limits section of the public config.
+
+        :param rate_limits_config: Dictionary with reserve_ratio and per-model rpm / tpm
+        """
+        reserve_ratio = rate_limits_config.get("reserve_ratio", 0.0)
+        self.models_config: Dict[str, dict] = rate_limits_config.get("models", {})
+        self.limiters: Dict[str, ModelRateLimiter] = {
+            model: ModelRateLimiter(limits["rpm"], limits["tpm"], reserve_ratio)
+            for model, limits in self.models_config.items()
+        }
+
+    def completion_tokens(self, model: str) -> int:
+        """
+        Number of completion tokens reserved for a chat completion of the model.
+        """
+        return self.models_config.get(model, {}).get("completion_tokens", 0)
+
+    async def acquire(
+        self, model: str, tokens: float, priority: Optional[Priority] = None
+    ):
+        """
+        Wait for a slot of the model's budget.
+
+        :param model: OpenAI model name
+        :param tokens: Estimated number of tokens of the call
+        :param priority: Priority class, by default taken from current_priority
+        """
+        limiter = self.limiters.get(model)
+        if limiter is None:
+            return
+        await limiter.acquire(
+            tokens, priority if priority is not None else current_priority.get()
+        )
+
+    def update_from_headers(self, model: str, headers: Mapping[str, str]):
+        limiter = self.limiters.get(model)
+        if limiter is not None:
+            limiter.update_from_headers(headers)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {model: limiter.stats() for model, limiter in self.limiters.items()}
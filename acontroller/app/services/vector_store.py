@@ -1,4 +1,6 @@
-from typing import Any, Dict, List, Optional
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 import numpy as np
 import backoff
 import logging
@@ -7,6 +9,20 @@ from qdrant_client.async_qdrant_client import AsyncQdrantClient
 
 logger = logging.getLogger(__name__)
 
+# Payload field with the publication time (unix seconds) used for tiering
+PUBLISHED_FIELD = "published_ts"
+# Payload fields needed to show a search result without a database query
+DISPLAY_FIELDS = ["title", "url", "date"]
+# Named vectors of two-stage (Matryoshka) collections
+SHORT_VECTOR = "short"
+FULL_VECTOR = "full"
+
+
+def to_timestamp(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
 
 class QdrantManager:
     """
@@ -18,18 +34,150 @@ class QdrantManager:
         """
         Initialize QdrantManager from RAG config.
 
-        :param rag_config: Dictionary containing RAG configuration
+        :param rag_config: Dictionary containing RAG configuration,
+            qdrant_url ":memory:" runs Qdrant in local in-memory mode.
+            Optional "tiering" section ({"enabled", "hot_days", "move_interval_minutes"})
+            splits the collection by publication age: points published within hot_days
+            stay in the RAM-resident collection, older ones in the on-disk "{name}_cold"
+            collection, move_to_cold() moves points as they age.
+            Optional "matryoshka" section ({"enabled", "short_dimensions", "prefetch_multiplier"})
+            stores two named vectors per point, the short_dimensions prefix of the embedding
+            (HNSW-indexed, kept in RAM) and the full embedding (on disk, not indexed): search
+            takes top_k * prefetch_multiplier candidates by the short vector and rescores them
+            by the full one. The layout of an existing collection takes precedence, it is
+            kept per collection (the hot and cold tiers may differ)
         """
         search_config = rag_config["search"]
-        self.qdrant_client = AsyncQdrantClient(
-            url=rag_config["qdrant_url"],
-            port=rag_config["qdrant_port"]
-        )
+        if rag_config["qdrant_url"] == ":memory:":
+            # Local in-process mode for offline development and benchmarks
+            self.qdrant_client = AsyncQdrantClient(location=":memory:")
+        else:
+            self.qdrant_client = AsyncQdrantClient(
+                url=rag_config["qdrant_url"],
+                port=rag_config["qdrant_port"]
+            )
         self.news_collection_name = search_config["collection_name"]
         self.dimensions = rag_config["model"]["dimensions"]
         self.distance_metric = getattr(
             models.Distance, search_config["distance_metric"])
 
+        tiering = rag_config.get("tiering") or {}
+        self.tiering_enabled = tiering.get("enabled", False)
+        self.cold_collection_name = f"{self.news_collection_name}_cold"
+        self.hot_period = timedelta(days=tiering.get("hot_days", 30))
+        self.move_interval = timedelta(minutes=tiering.get("move_interval_minutes", 60))
+        # Hot points are published after this time: the cutoff of the last move, and
+        # until the first move - assume another process moved one interval ago
+        self.hot_floor = datetime.now(timezone.utc) - self.hot_period - self.move_interval
+        # Points stored before tiering have no publication time and stay in the hot
+        # collection whatever their age, until backfill_published() stamps them
+        self.untimed_points = self.tiering_enabled
+
+        matryoshka = rag_config.get("matryoshka") or {}
+        self.short_dimensions: Optional[int] = (
+            matryoshka.get("short_dimensions", 256) if matryoshka.get("enabled", False) else None
+        )
+        self.prefetch_multiplier = matryoshka.get("prefetch_multiplier", 4)
+        # Short vector dimensions of every initialized collection, None for single-vector ones
+        self._layouts: Dict[str, Optional[int]] = {}
+
+    def hot_cutoff(self) -> datetime:
+        """
+        Points published before the cutoff belong to the cold tier.
+        """
+        return datetime.now(timezone.utc) - self.hot_period
+
+    def _tier_collection(self, published_ts: float) -> str:
+        """
+        Collection of the tier a point published at published_ts (unix seconds) belongs to.
+        """
+        if published_ts < self.hot_cutoff().timestamp():
+            return self.cold_collection_name
+        return self.news_collection_name
+
+    def collections_for_range(
+        self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None
+    ) -> List[str]:
+        """
+        Collections that may hold points published within the date range.
+
+        :param start_date: Start of the range, None for unbounded
+        :param end_date: End of the range, None for unbounded
+        :return: Names of the collections to search
+        """
+        if not self.tiering_enabled:
+            return [self.news_collection_name]
+
+        collections = []
+        if (
+            end_date is None
+            or to_timestamp(end_date) >= self.hot_floor.timestamp()
+            or self.untimed_points
+        ):
+            collections.append(self.news_collection_name)
+        if start_date is None or to_timestamp(start_date) < self.hot_cutoff().timestamp():
+            collections.append(self.cold_collection_name)
+        return collections
+
+    def _vectors_config(self, on_disk: bool):
+        if self.short_dimensions is None:
+            return models.VectorParams(
+                size=self.dimensions, distance=self.distance_metric, on_disk=on_disk
+            )
+        return {
+            SHORT_VECTOR: models.VectorParams(
+                size=self.short_dimensions, distance=self.distance_metric, on_disk=on_disk
+            ),
+            # Only read to rescore prefetched candidates: mmap-backed, no HNSW graph
+            FULL_VECTOR: models.VectorParams(
+                size=self.dimensions,
+                distance=self.distance_metric,
+                on_disk=True,
+                hnsw_config=models.HnswConfigDiff(m=0),
+            ),
+        }
+
+    def short_dimensions_of(self, collection_name: str) -> Optional[int]:
+        """
+        Short vector dimensions of the collection, None if it stores a single vector.
+        """
+        return self._layouts.get(collection_name, self.short_dimensions)
+
+    async def _detect_layout(self, collection_name: str):
+        """
+        Follow the vector layout of an existing collection: switching between single and
+        two-stage vectors needs a new collection and re-indexing.
+        """
+        info = await self.qdrant_client.get_collection(collection_name=collection_name)
+        vectors = info.config.params.vectors
+        short_dimensions = vectors[SHORT_VECTOR].size if isinstance(vectors, dict) else None
+        if short_dimensions != self.short_dimensions:
+            logger.warning(
+                f"Collection {collection_name} has short vectors of {short_dimensions} dimensions, "
+                f"configured {self.short_dimensions}; using the collection layout"
+            )
+        self._layouts[collection_name] = short_dimensions
+
+    async def _create_collection(self, collection_name: str, on_disk: bool = False):
+        if await self.qdrant_client.collection_exists(collection_name=collection_name):
+            await self._detect_layout(collection_name)
+            return
+        self._layouts[collection_name] = self.short_dimensions
+        await self.qdrant_client.create_collection(
+            collection_name=collection_name,
+            vectors_config=self._vectors_config(on_disk),
+            # mmap-backed vectors, HNSW graph and payload for the cold tier
+            hnsw_config=models.HnswConfigDiff(on_disk=True) if on_disk else None,
+            on_disk_payload=on_disk,
+        )
+        if self.tiering_enabled:
+            await self.qdrant_client.create_payload_index(
+                collection_name=collection_name,
+                field_name=PUBLISHED_FIELD,
+                field_schema=models.PayloadSchemaType.FLOAT,
+            )
+        logger.info(f"Created new collection: {collection_name}")
+
     @backoff.on_exception(backoff.expo, Exception, max_tries=3)
     async def init_collection(self):
         """
@@ -38,17 +186,9 @@ class QdrantManager:
         :raises Exception: If collection initialization fails after retries
         """
         try:
-            if not await self.qdrant_client.collection_exists(
-                collection_name=self.news_collection_name
-            ):
-                await self.qdrant_client.create_collection(
-                    collection_name=self.news_collection_name,
-                    vectors_config=models.VectorParams(
-                        size=self.dimensions, distance=self.distance_metric
-                    ),
-                )
-                logger.info(
-                    f"Created new collection: {self.news_collection_name}")
+            await self._create_collection(self.news_collection_name)
+            if self.tiering_enabled:
+                await self._create_collection(self.cold_collection_name, on_disk=True)
         except Exception as e:
             logger.error(f"Failed to initialize collection: {str(e)}")
             raise
@@ -58,6 +198,7 @@ class QdrantManager:
         point_id: int,
         vector: List[float],
         payload: Dict[str, Any],
+        published: Optional[datetime] = None,
     ):
         """
         Store an embedding in Qdrant.
@@ -65,17 +206,219 @@ class QdrantManager:
         :param point_id: Unique identifier for the embedding
         :param vector: Embedding vector as list of floats
         :param payload: Metadata payload to store with the embedding
+        :param published: Publication time, selects the tier when tiering is enabled
         """
-        await self.qdrant_client.upsert(
-            collection_name=self.news_collection_name,
-            points=[
+        await self.store_embeddings([(point_id, vector, payload, published)])
+
+    async def store_embeddings(
+        self,
+        points: List[Tuple[int, List[float], Dict[str, Any], Optional[datetime]]],
+    ):
+        """
+        Store a batch of embeddings in Qdrant, one upsert per tier.
+
+        :param points: (point_id, vector, payload, published) of every embedding,
+            see store_embedding
+        """
+        by_collection: Dict[str, List[models.PointStruct]] = {}
+        for point_id, vector, payload, published in points:
+            collection_name = self.news_collection_name
+            if self.tiering_enabled and published is not None:
+                payload = {**payload, PUBLISHED_FIELD: to_timestamp(published)}
+                collection_name = self._tier_collection(payload[PUBLISHED_FIELD])
+            by_collection.setdefault(collection_name, []).append(
                 models.PointStruct(
                     id=point_id,
-                    vector=vector,
+                    vector=self._point_vector(vector, collection_name),
                     payload=payload
                 )
-            ],
-        )
+            )
+
+        for collection_name, structs in by_collection.items():
+            await self.qdrant_client.upsert(collection_name=collection_name, points=structs)
+            if self.tiering_enabled:
+                # The publication time of an updated article may have moved it to the other tier
+                other_collection = (
+                    self.cold_collection_name
+                    if collection_name == self.news_collection_name
+                    else self.news_collection_name
+                )
+                await self.qdrant_client.delete(
+                    collection_name=other_collection,
+                    points_selector=models.FilterSelector(
+                        filter=models.Filter(must=[
+                            models.HasIdCondition(has_id=[struct.id for struct in structs])
+                        ])
+                    ),
+                )
+
+    def _point_vector(self, vector, collection_name: str):
+        """
+        Vector of a point in the layout of the collection, from a full embedding or from
+        a stored vector of any layout (points moved between tiers).
+        """
+        if isinstance(vector, dict):
+            vector = vector[FULL_VECTOR]
+        short_dimensions = self.short_dimensions_of(collection_name)
+        if short_dimensions is None:
+            return vector
+        # text-embedding-3 embeddings are Matryoshka-trained: a prefix is a usable embedding,
+        # cosine distance normalises it
+        return {SHORT_VECTOR: vector[:short_dimensions], FULL_VECTOR: vector}
+
+    async def set_payload(
+        self,
+        point_id: int,
+        payload: Dict[str, Any],
+        published: Optional[datetime] = None,
+    ):
+        """
+        Update payload fields of a stored point without touching its vector.
+
+        :param point_id: Identifier of the point
+        :param payload: Payload fields to set, other fields are kept
+        :param published: Publication time, with tiering it is stored in the payload and
+            a point whose publication time moved across the hot cutoff changes its tier
+        """
+        # A filter selector matches nothing in the tier without the point
+        selector = models.Filter(must=[models.HasIdCondition(has_id=[point_id])])
+        collections = self.collections_for_range()
+        if self.tiering_enabled and published is not None:
+            payload = {**payload, PUBLISHED_FIELD: to_timestamp(published)}
+            target = self._tier_collection(payload[PUBLISHED_FIELD])
+            other = next(name for name in collections if name != target)
+            points = await self.qdrant_client.retrieve(
+                collection_name=other, ids=[point_id], with_payload=True, with_vectors=True
+            )
+            if points:
+                await self.qdrant_client.upsert(
+                    collection_name=target,
+                    points=[models.PointStruct(
+                        id=point_id,
+                        vector=self._point_vector(points[0].vector, target),
+                        payload={**points[0].payload, **payload},
+                    )],
+                )
+                await self.qdrant_client.delete(collection_name=other, points_selector=selector)
+                return
+            collections = [target]
+
+        await asyncio.gather(*(
+            self.qdrant_client.set_payload(
+                collection_name=collection_name, payload=payload, points=selector
+            )
+            for collection_name in collections
+        ))
+
+    async def backfill_published(
+        self,
+        published_of: Callable[[List[int]], Awaitable[Dict[int, datetime]]],
+        batch_size: int = 256,
+    ) -> int:
+        """
+        Stamp points stored before tiering was enabled with their publication time,
+        so move_to_cold() can move them and old date ranges can skip the hot collection.
+        Points of articles that no longer exist are deleted.
+
+        :param published_of: Publication times of articles by id, missing ids are deleted articles
+        :param batch_size: Number of points stamped per request
+        :return: Number of stamped points
+        """
+        if not self.untimed_points:
+            return 0
+
+        untimed = models.Filter(must=[
+            models.IsEmptyCondition(is_empty=models.PayloadField(key=PUBLISHED_FIELD))
+        ])
+        stamped = 0
+        while True:
+            points, _ = await self.qdrant_client.scroll(
+                collection_name=self.news_collection_name,
+                scroll_filter=untimed,
+                limit=batch_size,
+                with_payload=["id"],
+            )
+            if not points:
+                break
+            published = await published_of([point.id for point in points])
+            operations = [
+                models.SetPayloadOperation(set_payload=models.SetPayload(
+                    payload={PUBLISHED_FIELD: to_timestamp(published[point.id])},
+                    points=[point.id],
+                ))
+                for point in points
+                if point.id in published
+            ]
+            orphans = [point.id for point in points if point.id not in published]
+            if orphans:
+                operations.append(models.DeleteOperation(
+                    delete=models.PointIdsList(points=orphans)
+                ))
+            await self.qdrant_client.batch_update_points(
+                collection_name=self.news_collection_name, update_operations=operations
+            )
+            stamped += len(points) - len(orphans)
+
+        self.untimed_points = False
+        if stamped:
+            logger.info(f"Stamped {stamped} points of {self.news_collection_name} with {PUBLISHED_FIELD}")
+        return stamped
+
+    async def move_to_cold(self, batch_size: int = 256) -> int:
+        """
+        Move points published before the hot cutoff from the hot to the cold collection.
+        Points stored without a publication time stay in the hot collection.
+
+        Safe to re-run after a partial failure: a batch is upserted into the cold
+        collection before it is deleted from the hot one, so a point is never lost,
+        an interrupted batch is found and moved again by the next run (upserts by id
+        are idempotent), and search_similar() drops the copy found in both tiers meanwhile.
+
+        :param batch_size: Number of points moved per request
+        :return: Number of moved points
+        """
+        if not self.tiering_enabled:
+            return 0
+
+        cutoff = self.hot_cutoff()
+        aged = models.Filter(must=[
+            models.FieldCondition(
+                key=PUBLISHED_FIELD, range=models.Range(lt=cutoff.timestamp())
+            )
+        ])
+        moved = 0
+        while True:
+            points, _ = await self.qdrant_client.scroll(
+                collection_name=self.news_collection_name,
+                scroll_filter=aged,
+                limit=batch_size,
+                with_payload=True,
+                with_vectors=True,
+            )
+            if not points:
+                break
+            await self.qdrant_client.upsert(
+                collection_name=self.cold_collection_name,
+                points=[
+                    models.PointStruct(
+                        id=point.id,
+                        vector=self._point_vector(point.vector, self.cold_collection_name),
+                        payload=point.payload,
+                    )
+                    for point in points
+                ],
+                wait=True,
+            )
+            await self.qdrant_client.delete(
+                collection_name=self.news_collection_name,
+                points_selector=models.PointIdsList(points=[point.id for point in points]),
+            )
+            moved += len(points)
+
+        self.hot_floor = cutoff
+        if moved:
+            logger.info(f"Moved {moved} points to {self.cold_collection_name}")
+        return moved
 
     async def health_check(self) -> bool:
         """
@@ -90,29 +433,72 @@ class QdrantManager:
             logger.error(f"Qdrant health check failed: {str(e)}")
             return False
 
+    async def _search_collection(
+        self,
+        collection_name: str,
+        vector: List[float],
+        top_k: int,
+        query_filter: Optional[models.Filter],
+        with_payload: List[str],
+        score_threshold: Optional[float],
+    ) -> List[models.ScoredPoint]:
+        short_dimensions = self.short_dimensions_of(collection_name)
+        if short_dimensions is None:
+            return await self.qdrant_client.search(
+                collection_name=collection_name,
+                query_vector=vector,
+                limit=top_k,
+                query_filter=query_filter,
+                with_payload=with_payload,
+                score_threshold=score_threshold,
+            )
+
+        # Two-stage: candidates by the short vector, final ranking and threshold by the full one
+        response = await self.qdrant_client.query_points(
+            collection_name=collection_name,
+            prefetch=models.Prefetch(
+                query=vector[:short_dimensions],
+                using=SHORT_VECTOR,
+                filter=query_filter,
+                limit=top_k * self.prefetch_multiplier,
+            ),
+            query=vector,
+            using=FULL_VECTOR,
+            limit=top_k,
+            with_payload=with_payload,
+            score_threshold=score_threshold,
+        )
+        return response.points
+
     @backoff.on_exception(backoff.expo, Exception, max_tries=3)
     async def search_similar(
         self,
         vector: List[float],
         top_k: int = 5,
         filter_ids: Optional[List[int]] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        with_payload: Optional[List[str]] = None,
+        score_threshold: Optional[float] = None,
     ) -> List[dict]:
         """
         Search for similar vectors in Qdrant.
+        With tiering only the tiers overlapping the date range are searched,
+        results of both tiers are merged by score.
 
         :param vector: Query vector
         :param top_k: Number of results to return
         :param filter_ids: Optional list of ids to filter by
+        :param start_date: Optional start of the publication date range of the request
+        :param end_date: Optional end of the publication date range of the request
+        :param with_payload: Optional payload fields to return in "payload" of every result,
+            only the id is read otherwise
+        :param score_threshold: Optional minimal similarity score of the results
         :return: List of similar documents with scores
         """
-        search_params = {
-            "collection_name": self.news_collection_name,
-            "query_vector": vector,
-            "limit": top_k,
-        }
-
+        query_filter = None
         if filter_ids:
-            search_params["query_filter"] = models.Filter(
+            query_filter = models.Filter(
                 must=[
                     models.FieldCondition(
                         key="id", match=models.MatchAny(any=filter_ids)
@@ -120,7 +506,25 @@ class QdrantManager:
                 ]
             )
 
-        results = await self.qdrant_client.search(**search_params)
+        collections = self.collections_for_range(start_date, end_date)
+        tier_results = await asyncio.gather(*(
+            self._search_collection(
+                collection_name,
+                vector,
+                top_k,
+                query_filter,
+                ["id", *(with_payload or [])],
+                score_threshold,
+            )
+            for collection_name in collections
+        ))
+        results = [point for points in tier_results for point in points]
+        if len(collections) > 1:
+            # A point being moved to the cold tier may be found in both tiers
+            unique = {}
+            for point in sorted(results, key=lambda point: point.score, reverse=True):
+                unique.setdefault(point.id, point)
+            results = list(unique.values())[:top_k]
 
         result_dict = [
             {
@@ -129,4 +533,10 @@ class QdrantManager:
             }
             for point in results
         ]
+        if with_payload:
+            # Points stored before a field was added to the payload lack it
+            for point, result in zip(results, result_dict):
+                result["payload"] = {
+                    key: point.payload[key] for key in with_payload if key in point.payload
+                }
         return result_dict
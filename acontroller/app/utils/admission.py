@@ -0,0 +1,111 @@
+import asyncio
+import math
+from contextlib import asynccontextmanager
+from time import perf_counter
+from typing import AsyncIterator
+
+from fastapi import HTTPException
+
+from acontroller.app.utils.metrics import (
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_QUEUE_DEPTH,
+    ADMISSION_REJECTED,
+    record_request_stage,
+)
+
+
+class AdmissionLimiter:
+    """
+    Concurrency limit of an expensive endpoint with a bounded wait queue.
+
+    Requests beyond max_concurrency wait in a queue of at most max_queue requests,
+    for at most queue_timeout seconds. A full queue is answered with 429 at once,
+    a timed out wait with 503, both with Retry-After estimated from recent durations.
+    Shedding early keeps latency of admitted requests and of cheap endpoints stable.
+    """
+
+    # Weight of the newest duration in the moving average
+    DURATION_SMOOTHING = 0.2
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout: float):
+        """
+        :param name: Endpoint name for metrics and stats
+        :param max_concurrency: Requests processed at once
+        :param max_queue: Requests waiting for a slot, beyond that requests are rejected
+        :param queue_timeout: Maximum wait for a slot, seconds
+        """
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = {"queue_full": 0, "queue_timeout": 0}
+        self.avg_duration = 1.0
+        ADMISSION_QUEUE_DEPTH.labels(name).set_function(lambda: self.queued)
+        ADMISSION_IN_FLIGHT.labels(name).set_function(lambda: self.in_flight)
+
+    def retry_after(self) -> int:
+        """
+        Seconds until the queue ahead is likely drained.
+        """
+        return max(1, math.ceil(self.avg_duration * (self.queued + 1) / self.max_concurrency))
+
+    def _reject(self, status_code: int, reason: str):
+        self.rejected[reason] += 1
+        ADMISSION_REJECTED.labels(self.name, reason).inc()
+        raise HTTPException(
+            status_code=status_code,
+            detail=f"Server is busy ({reason.replace('_', ' ')}), retry later",
+            headers={"Retry-After": str(self.retry_after())},
+        )
+
+    async def _acquire(self):
+        # A free slot is taken directly only if nobody is queued: a released slot goes
+        # to the longest waiting request, not to a newcomer
+        if self.queued == 0 and not self._semaphore.locked():
+            await self._semaphore.acquire()
+            return
+        if self.queued >= self.max_queue:
+            self._reject(429, "queue_full")
+
+        self.queued += 1
+        start = perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._reject(503, "queue_timeout")
+        finally:
+            self.queued -= 1
+            record_request_stage("admission_wait", perf_counter() - start)
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """
+        Hold a slot of the endpoint for the duration of the block.
+
+        :raises HTTPException: 429 if the queue is full, 503 if no slot was free in time
+        """
+        await self._acquire()
+        self.in_flight += 1
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+            self.avg_duration += self.DURATION_SMOOTHING * (
+                perf_counter() - start - self.avg_duration
+            )
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "rejected": dict(self.rejected),
+            "avg_duration": round(self.avg_duration, 3),
+        }
@@ -0,0 +1,84 @@
+import math
+from time import monotonic
+from typing import Optional
+
+
+class Deadline:
+    """
+    Point in time a request must be answered by, no deadline if the budget is None.
+    """
+
+    def __init__(self, budget_s: Optional[float] = None):
+        self.budget_s = budget_s
+        self.expires_at = monotonic() + budget_s if budget_s is not None else None
+
+    def remaining(self) -> float:
+        if self.expires_at is None:
+            return math.inf
+        return max(self.expires_at - monotonic(), 0.0)
+
+    def timeout(self) -> Optional[float]:
+        """
+        Remaining time as a timeout for asyncio.wait_for, None without a deadline.
+        """
+        return None if self.expires_at is None else self.remaining()
+
+    def extend(self, other: "Deadline"):
+        """
+        Move the deadline to the later of both, e.g. for a computation shared with another request.
+        """
+        if self.expires_at is None or other.expires_at is None:
+            self.budget_s = self.expires_at = None
+        elif other.expires_at > self.expires_at:
+            self.budget_s, self.expires_at = other.budget_s, other.expires_at
+
+
+class LatencyBudget:
+    """
+    Decisions of the RAG pipeline under a per-request latency budget: paraphrase passes
+    are skipped when the budget is tight, the final completion is shortened or skipped
+    so that the ranked sources are always returned in time.
+    """
+
+    def __init__(
+        self,
+        rephrase_s: float = 3.0,
+        completion_full_s: float = 8.0,
+        completion_min_s: float = 2.0,
+        completion_overhead_s: float = 1.0,
+        completion_tokens_per_s: float = 40.0,
+    ):
+        """
+        :param rephrase_s: Expected duration of a paraphrase pass (completion, embedding, search)
+        :param completion_full_s: Remaining time needed for an unrestricted final completion
+        :param completion_min_s: Below this remaining time the final completion is skipped
+        :param completion_overhead_s: Expected time to the first completion token
+        :param completion_tokens_per_s: Expected generation speed, caps a shortened completion
+        """
+        self.rephrase_s = rephrase_s
+        self.completion_full_s = completion_full_s
+        self.completion_min_s = completion_min_s
+        self.completion_overhead_s = completion_overhead_s
+        self.completion_tokens_per_s = completion_tokens_per_s
+
+    @staticmethod
+    def start(budget_ms: Optional[int]) -> Deadline:
+        return Deadline(budget_ms / 1000 if budget_ms is not None else None)
+
+    def allows_rephrase(self, deadline: Deadline) -> bool:
+        """
+        A paraphrase pass fits and still leaves time for the full completion.
+        """
+        return deadline.remaining() >= self.rephrase_s + self.completion_full_s
+
+    def allows_completion(self, deadline: Deadline) -> bool:
+        return deadline.remaining() >= self.completion_min_s
+
+    def completion_max_tokens(self, deadline: Deadline) -> Optional[int]:
+        """
+        max_tokens of the final completion, None if the budget allows a full answer.
+        """
+        remaining = deadline.remaining()
+        if remaining >= self.completion_full_s:
+            return None
+        return max(int((remaining - self.completion_overhead_s) * self.completion_tokens_per_s), 1)
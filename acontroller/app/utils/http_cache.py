@@ -0,0 +1,144 @@
+import hashlib
+import secrets
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+
+class ListingCache:
+    """
+    Conditional GET support for article listings.
+
+    Every table has a change version bumped by ingest, update and delete. The ETag of
+    a listing is derived from the table version and the filter set, so a poll with an
+    unchanged If-None-Match is answered with 304 before any database access. Rendered
+    bodies are optionally kept in an LRU cache until the next change of the table.
+
+    Versions live in the process: the service runs as a single process, with several
+    workers every worker would need to see every write.
+
+    Listings may be rendered from a lagging read replica. A body is cached and tagged
+    with the current version only if the replica is known to contain the last write
+    of the table, otherwise it is sent without validators.
+    """
+
+    def __init__(self, max_entries: int = 256, cache_bodies: bool = True):
+        """
+        :param max_entries: Maximum number of cached rendered bodies
+        :param cache_bodies: Keep rendered bodies, otherwise only 304s are served from memory
+        """
+        self.max_entries = max_entries
+        self.cache_bodies = cache_bodies
+        # Distinguishes ETags of different process lifetimes, versions restart from 0
+        self._instance = secrets.token_hex(4)
+        self._versions: Dict[str, int] = {}
+        self._modified: Dict[str, float] = {}
+        self._started = time.time()
+        self._bodies: "OrderedDict[Tuple[str, str], Tuple[int, bytes]]" = OrderedDict()
+        self.hits = 0
+        self.not_modified = 0
+        self.misses = 0
+
+    def bump(self, table: str):
+        """
+        Mark the table as changed, invalidating ETags and cached bodies of its listings.
+        """
+        self._versions[table] = self._versions.get(table, 0) + 1
+        self._modified[table] = time.time()
+
+    def version(self, table: str) -> int:
+        return self._versions.get(table, 0)
+
+    def etag(self, table: str, key: str) -> str:
+        digest = hashlib.sha1(
+            f"{self._instance}:{table}:{self.version(table)}:{key}".encode()
+        ).hexdigest()
+        return f'"{digest[:32]}"'
+
+    def last_modified(self, table: str) -> str:
+        return formatdate(self._modified.get(table, self._started), usegmt=True)
+
+    def is_not_modified(self, request: Request, etag: str, table: str) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            # HTTP dates have a resolution of one second
+            return int(self._modified.get(table, self._started)) <= since
+        return False
+
+    def is_fresh(self, table: str, lag: Optional[float]) -> bool:
+        """
+        Whether data read with the given replication lag bound contains the last write
+        of the table. Versions are bumped after the commit, so the write is visible once
+        more than the lag has passed since the bump.
+        """
+        if lag is None:
+            return False
+        return time.time() - self._modified.get(table, self._started) > lag
+
+    async def respond(
+        self,
+        request: Request,
+        table: str,
+        key: str,
+        render: Callable[[], Awaitable[Tuple[bytes, Optional[float]]]],
+    ) -> Response:
+        """
+        Response to a listing request: 304, a cached body or a freshly rendered one.
+
+        :param request: Incoming request with the conditional headers
+        :param table: Table the listing reads
+        :param key: Canonical representation of the filter set
+        :param render: Runs the query and returns the JSON body and the replication lag
+            bound of the session it read (database.replication_lag_bound)
+        """
+        version = self.version(table)
+        etag = self.etag(table, key)
+        headers = {
+            "ETag": etag,
+            "Last-Modified": self.last_modified(table),
+            "Cache-Control": "no-cache",
+        }
+        if self.is_not_modified(request, etag, table):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        cached = self._bodies.get((table, key))
+        if cached is not None and cached[0] == version:
+            self.hits += 1
+            self._bodies.move_to_end((table, key))
+            return Response(cached[1], media_type="application/json", headers=headers)
+
+        self.misses += 1
+        body, lag = await render()
+        # A change during the query would make the body older than the new version
+        if self.version(table) != version or not self.is_fresh(table, lag):
+            return Response(body, media_type="application/json",
+                            headers={"Cache-Control": "no-cache"})
+
+        if self.cache_bodies:
+            self._bodies[(table, key)] = (version, body)
+            self._bodies.move_to_end((table, key))
+            while len(self._bodies) > self.max_entries:
+                self._bodies.popitem(last=False)
+        return Response(body, media_type="application/json", headers=headers)
+
+    def stats(self) -> dict:
+        return {
+            "versions": dict(self._versions),
+            "cached_bodies": len(self._bodies),
+            "hits": self.hits,
+            "not_modified": self.not_modified,
+            "misses": self.misses,
+        }
@@ -0,0 +1,157 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+STAGE_LATENCY = Histogram(
+    "acontroller_stage_duration_seconds",
+    "Duration of RAG pipeline and ingest stages",
+    ["collection", "stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 60),
+)
+OPENAI_TOKENS = Counter(
+    "acontroller_openai_tokens_total",
+    "Tokens used by OpenAI calls",
+    ["model", "kind"],
+)
+OPENAI_RETRIES = Counter(
+    "acontroller_openai_retries_total",
+    "Retried OpenAI calls",
+    ["model"],
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "acontroller_embedding_batch_size",
+    "Number of texts per coalesced embeddings request",
+    ["model"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048),
+)
+NEWS_DUPLICATES = Counter(
+    "acontroller_news_duplicates_total",
+    "Ingested news detected as near-duplicates and not embedded",
+)
+DB_POOL_WAIT = Histogram(
+    "acontroller_db_pool_wait_seconds",
+    "Time spent waiting for a database connection from the pool",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_REPLICA_HEALTHY = Gauge(
+    "acontroller_db_replica_healthy",
+    "Whether read-only queries are routed to the read replica",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "acontroller_db_pool_checked_out",
+    "Database connections currently checked out of the pool",
+    ["engine"],
+)
+SINGLE_FLIGHT_REQUESTS = Counter(
+    "acontroller_single_flight_requests_total",
+    "Requests starting a shared computation (leader) or joining one in flight (shared)",
+    ["route", "role"],
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "acontroller_admission_queue_depth",
+    "Requests waiting for a slot of an expensive endpoint",
+    ["endpoint"],
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "acontroller_admission_in_flight",
+    "Requests holding a slot of an expensive endpoint",
+    ["endpoint"],
+)
+ADMISSION_REJECTED = Counter(
+    "acontroller_admission_rejected_total",
+    "Requests shed by admission control",
+    ["endpoint", "reason"],
+)
+
+# Stages timed during the current request, reported in the Server-Timing header
+_request_stages: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar(
+    "request_stages", default=None
+)
+
+
+@contextmanager
+def stage(collection: str, name: str):
+    """
+    Time a pipeline stage: observe it in STAGE_LATENCY and add it to the
+    Server-Timing header of the current request.
+
+    :param collection: Collection (news / science) the stage works on
+    :param name: Stage name
+    """
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = perf_counter() - start
+        STAGE_LATENCY.labels(collection, name).observe(elapsed)
+        record_request_stage(name, elapsed)
+
+
+def record_request_stage(name: str, elapsed: float):
+    """
+    Add a stage duration to the Server-Timing header of the current request.
+    """
+    request_stages = _request_stages.get()
+    if request_stages is not None:
+        request_stages.append((name, elapsed))
+
+
+def count_openai_retry(details: dict):
+    """
+    backoff on_backoff handler counting retries of OpenAI client methods.
+    Embedders keep the model name in model, LLMs in model_name.
+    """
+    client = details["args"][0]
+    model = getattr(client, "model", None) or getattr(client, "model_name", None)
+    OPENAI_RETRIES.labels(model or "unknown").inc()
+
+
+def format_server_timing(request_stages: List[Tuple[str, float]], total: float) -> str:
+    """
+    Server-Timing header value, durations of repeated stages are summed.
+    """
+    durations: Dict[str, float] = {}
+    for name, elapsed in request_stages:
+        durations[name] = durations.get(name, 0.0) + elapsed
+    durations["total"] = total
+    return ", ".join(
+        f"{name};dur={elapsed * 1000:.1f}" for name, elapsed in durations.items()
+    )
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware collecting stage timings of a request into the Server-Timing header.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_stages: List[Tuple[str, float]] = []
+        token = _request_stages.set(request_stages)
+        start = perf_counter()
+
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start" and request_stages:
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    format_server_timing(request_stages, perf_counter() - start),
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stages.reset(token)
@@ -0,0 +1,27 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+async def run_periodically(
+    interval_s: float, func: Callable[[], Awaitable], name: str, run_at_start: bool = False
+):
+    """
+    Run func every interval_s seconds until cancelled.
+    Failures are logged and do not stop the loop.
+
+    :param interval_s: Pause between runs, seconds
+    :param func: Coroutine function to run
+    :param name: Task name for logs
+    :param run_at_start: Run once immediately instead of after the first pause
+    """
+    if not run_at_start:
+        await asyncio.sleep(interval_s)
+    while True:
+        try:
+            await func()
+        except Exception:
+            logger.exception(f"Periodic task '{name}' failed")
+        await asyncio.sleep(interval_s)
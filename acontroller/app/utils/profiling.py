@@ -0,0 +1,289 @@
+import cProfile
+import itertools
+import logging
+import marshal
+import pstats
+import secrets
+import sys
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+
+
+@dataclass
+class CapturedProfile:
+    id: int
+    method: str
+    path: str
+    started_at: datetime
+    duration_ms: float
+    format: str  # "pstats" or "collapsed"
+    data: bytes
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 1),
+            "format": self.format,
+            "size": len(self.data),
+        }
+
+
+def collapse_stack(frame) -> str:
+    """
+    Stack of the frame in the collapsed format of flamegraph tools: root;...;leaf
+    """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        module = frame.f_globals.get("__name__", "?")
+        names.append(f"{module}:{getattr(code, 'co_qualname', code.co_name)}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """
+    Background thread periodically sampling the stack of the event loop thread.
+    Samples are kept for a bounded time so slow requests can be profiled after
+    they finished.
+    """
+
+    def __init__(self, interval_ms: float, history_seconds: float = 120):
+        self.interval = interval_ms / 1000
+        self.samples: Deque[Tuple[float, str]] = deque(
+            maxlen=int(history_seconds / self.interval)
+        )
+        self.thread_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """
+        Start sampling the calling thread, must be called from the event loop thread.
+        """
+        if self.running:
+            return
+        self.thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples.append((time.monotonic(), collapse_stack(frame)))
+
+    def collapsed(self, start: float, end: float) -> bytes:
+        """
+        Samples taken between start and end (time.monotonic) in collapsed stack format.
+        """
+        stacks = Counter(stack for ts, stack in list(self.samples) if start <= ts <= end)
+        return "".join(
+            f"{stack} {count}\n" for stack, count in stacks.most_common()
+        ).encode()
+
+
+class RequestProfiler:
+    """
+    Keeps a bounded ring buffer of request profiles.
+
+    - A request with the X-Profile header and a valid admin token is profiled
+      with cProfile, its profile is downloadable in pstats format.
+    - When slow request capture is enabled, the stack sampler runs all the time and
+      every request slower than the threshold keeps its samples in collapsed stack format.
+
+    Both profilers observe the whole event loop thread, so overlapping requests
+    show up in each other's profiles.
+    """
+
+    def __init__(
+        self,
+        admin_token: Optional[str],
+        enabled: bool,
+        slow_request_ms: float,
+        buffer_size: int,
+        sample_interval_ms: float,
+    ):
+        """
+        :param admin_token: Token required for X-Profile requests, None disables them
+        :param enabled: Whether slow request capture is enabled
+        :param slow_request_ms: Latency threshold of slow request capture
+        :param buffer_size: Number of kept profiles
+        :param sample_interval_ms: Stack sampling interval
+        """
+        self.admin_token = admin_token
+        self.enabled = enabled
+        self.slow_request_ms = slow_request_ms
+        self.profiles: Deque[CapturedProfile] = deque(maxlen=buffer_size)
+        self.sampler = StackSampler(sample_interval_ms)
+        self._ids = itertools.count(1)
+        self._cprofile_active = False
+
+    def start(self):
+        if self.enabled:
+            self.sampler.start()
+
+    def stop(self):
+        self.sampler.stop()
+
+    def configure(self, enabled: bool, slow_request_ms: Optional[float] = None):
+        """
+        Toggle slow request capture at runtime.
+        """
+        if slow_request_ms is not None:
+            self.slow_request_ms = slow_request_ms
+        self.enabled = enabled
+        if enabled:
+            self.sampler.start()
+        else:
+            self.sampler.stop()
+
+    def is_admin(self, token: Optional[str]) -> bool:
+        return (
+            self.admin_token is not None
+            and token is not None
+            and secrets.compare_digest(token, self.admin_token)
+        )
+
+    def acquire_cprofile(self) -> bool:
+        """
+        Reserve cProfile for one request; only one profile can be enabled at a time.
+
+        :return: False if another request is being profiled
+        """
+        if self._cprofile_active:
+            return False
+        self._cprofile_active = True
+        return True
+
+    def release_cprofile(self):
+        self._cprofile_active = False
+
+    def get(self, profile_id: int) -> Optional[CapturedProfile]:
+        for profile in self.profiles:
+            if profile.id == profile_id:
+                return profile
+        return None
+
+    def list(self) -> List[dict]:
+        return [profile.summary() for profile in reversed(self.profiles)]
+
+    def status(self) -> Dict[str, object]:
+        return {
+            "enabled": self.enabled,
+            "slow_request_ms": self.slow_request_ms,
+            "sampler_running": self.sampler.running,
+            "stored_profiles": len(self.profiles),
+            "buffer_size": self.profiles.maxlen,
+        }
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def add(
+        self, scope: Scope, started_at: datetime, duration_ms: float,
+        format: str, data: bytes, profile_id: Optional[int] = None,
+    ):
+        self.profiles.append(
+            CapturedProfile(
+                id=profile_id if profile_id is not None else self.next_id(),
+                method=scope["method"],
+                path=scope["path"],
+                started_at=started_at,
+                duration_ms=duration_ms,
+                format=format,
+                data=data,
+            )
+        )
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling requests on demand and capturing slow requests.
+    """
+
+    def __init__(self, app: ASGIApp, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        on_demand = (
+            PROFILE_HEADER in headers
+            and self.profiler.is_admin(headers.get(ADMIN_TOKEN_HEADER))
+            and self.profiler.acquire_cprofile()
+        )
+        if not on_demand and not self.profiler.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        started_at = datetime.now(timezone.utc)
+        start = time.monotonic()
+
+        if not on_demand:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                duration_ms = (time.monotonic() - start) * 1000
+                if duration_ms >= self.profiler.slow_request_ms:
+                    data = self.profiler.sampler.collapsed(start, time.monotonic())
+                    self.profiler.add(scope, started_at, duration_ms, "collapsed", data)
+                    logger.info(
+                        f"Captured profile of slow request {scope['method']} "
+                        f"{scope['path']} ({duration_ms:.0f} ms)"
+                    )
+            return
+
+        profile_id = self.profiler.next_id()
+
+        async def send_with_profile_id(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(PROFILE_ID_HEADER, str(profile_id))
+            await send(message)
+
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profile.disable()
+            self.profiler.release_cprofile()
+            duration_ms = (time.monotonic() - start) * 1000
+            stats = pstats.Stats(profile)
+            self.profiler.add(
+                scope, started_at, duration_ms, "pstats",
+                marshal.dumps(stats.stats), profile_id=profile_id,
+            )
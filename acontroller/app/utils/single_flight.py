@@ -0,0 +1,76 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from acontroller.app.utils.metrics import SINGLE_FLIGHT_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    De-duplication of identical in-flight computations.
+
+    The first caller of a key starts the computation as a task, concurrent callers of
+    the same key await that task instead of starting their own. Waiters are shielded:
+    a cancelled waiter does not cancel the computation for the others, the task is only
+    cancelled once every waiter is gone. Results are not kept after the task finishes,
+    this is not a cache. The first caller may attach a state to the flight, e.g. to let
+    later callers adjust the running computation.
+    """
+
+    def __init__(self, name: str):
+        """
+        :param name: Label of the metrics
+        """
+        self.name = name
+        self._flights: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        self._states: Dict[Hashable, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._flights.get(key) is task:
+            del self._flights[key]
+            del self._waiters[key]
+            del self._states[key]
+
+    def state(self, key: Hashable) -> Any:
+        """
+        State attached to the in-flight computation of the key, None if there is none.
+        """
+        return self._states.get(key)
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[Any]], state: Any = None) -> Any:
+        """
+        Result of func, shared with concurrent callers of the same key.
+
+        :param key: Normalised identity of the computation
+        :param func: Coroutine function computing the result, called at most once per flight
+        :param state: Attached to a new flight, ignored when joining one
+        """
+        task = self._flights.get(key)
+        if task is None:
+            SINGLE_FLIGHT_REQUESTS.labels(self.name, "leader").inc()
+            # The task copies the context of the first caller (priority, stage timings)
+            task = asyncio.create_task(func())
+            self._flights[key] = task
+            self._waiters[key] = 0
+            self._states[key] = state
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            SINGLE_FLIGHT_REQUESTS.labels(self.name, "shared").inc()
+
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and self._flights.get(key) is task and self._waiters[key] == 1:
+                logger.debug(f"Single-flight '{self.name}': last waiter gone, cancelling")
+                task.cancel()
+            raise
+        finally:
+            if self._flights.get(key) is task:
+                self._waiters[key] -= 1
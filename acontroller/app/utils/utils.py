@@ -1,6 +1,25 @@
+import hashlib
+
 import tiktoken
 
 
+def get_encoding(model: str) -> tiktoken.Encoding:
+    """
+    Возвращает tokenizer модели, для неизвестных моделей - cl100k_base
+    """
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    """
+    Считает число токенов текста для модели OpenAI
+    """
+    return len(get_encoding(model).encode(text))
+
+
 def trim_prompt_to_tokens(prompt: str, max_tokens: int = 8192, model: str = "gpt-4") -> str:
     """
     Урезает текст до определенного числа токенов для запроса к OpenAI
@@ -21,3 +40,10 @@ def trim_prompt_to_tokens(prompt: str, max_tokens: int = 8192, model: str = "gpt
     trimmed_prompt = encoding.decode(trimmed_tokens)
 
     return trimmed_prompt
+
+
+def content_hash(text: str) -> str:
+    """
+    Хэш текста статьи для проверки, изменился ли эмбеддируемый текст
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
@@ -0,0 +1,252 @@
+"""
+Open-loop load generator replaying a JSONL mix of requests against the service.
+
+    python -m benchmarks.loadgen --mix benchmarks/mixes/sample.jsonl --rate 20 --duration 60
+        (--target http://localhost:8000 | --postgres-url URL) [--output load.json]
+
+Every line of the mix is a request: {"path": "/api/v1/vectors/news", "body": {...}},
+optionally with "method" (POST by default) and "params". Lines are replayed in order,
+cyclically, with Poisson arrivals at the target rate. Requests are sent at their
+arrival time whether or not earlier ones completed, and latency is measured from the
+arrival time, so queueing in the service is not hidden by a slow client.
+
+With --postgres-url the app is started with uvicorn in a subprocess, wired to the
+local stand-ins (fake OpenAI, in-memory Qdrant, temporary Postgres database), with
+the pool settings given by --db-pool-size / --db-max-overflow.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from benchmarks.run import percentiles
+from benchmarks.standins import FakeOpenAIServer, configure_environment, disposable_postgres
+
+
+def load_mix(path: str) -> List[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def unique_body(body: Optional[dict], replay: int) -> Optional[dict]:
+    """
+    Make article creates of repeated replays unique, so they insert new articles instead of upserting.
+    """
+    if replay == 0 or body is None or "news_id" not in body and "url" not in body:
+        return body
+    body = dict(body)
+    for key in ("news_id", "url"):
+        if key in body:
+            body[key] = f"{body[key]}~{replay}"
+    return body
+
+
+def server_timing(header: Optional[str]) -> Dict[str, float]:
+    """
+    Parse a Server-Timing header into {stage: duration in ms}.
+    """
+    timings = {}
+    for entry in (header or "").split(","):
+        name, _, params = entry.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip() == "dur":
+                timings[name] = float(value)
+    return timings
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.pool_waits: List[float] = []
+        self.statuses: Dict[str, int] = defaultdict(int)
+
+    def report(self, duration: float) -> dict:
+        sent = sum(self.statuses.values())
+        errors = sum(
+            count for status, count in self.statuses.items() if not status.startswith("2")
+        )
+        report = {
+            "sent": sent,
+            "throughput_per_s": sent / duration,
+            "error_rate": errors / sent if sent else 0.0,
+            "statuses": dict(self.statuses),
+        }
+        if self.latencies:
+            report["latency_ms"] = {
+                **{k: v * 1000 for k, v in percentiles(self.latencies).items()},
+                "max": max(self.latencies) * 1000,
+            }
+        if self.pool_waits:
+            report["db_pool_wait_ms"] = {
+                **percentiles(self.pool_waits),
+                "max": max(self.pool_waits),
+            }
+        return report
+
+
+async def replay(
+    client: httpx.AsyncClient, mix: List[dict], rate: float, duration: float, seed: int
+) -> Dict[str, dict]:
+    rng = random.Random(seed)
+    stats: Dict[str, EndpointStats] = defaultdict(EndpointStats)
+    tasks = []
+
+    async def send(item: dict, replay_number: int, arrival: float):
+        endpoint = f"{item.get('method', 'POST')} {item['path']}"
+        try:
+            response = await client.request(
+                item.get("method", "POST"),
+                item["path"],
+                json=unique_body(item.get("body"), replay_number),
+                params=item.get("params"),
+            )
+            status = str(response.status_code)
+            timings = server_timing(response.headers.get("server-timing"))
+            if "db_pool_wait" in timings:
+                stats[endpoint].pool_waits.append(timings["db_pool_wait"])
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        stats[endpoint].latencies.append(time.monotonic() - arrival)
+        stats[endpoint].statuses[status] += 1
+
+    start = time.monotonic()
+    arrival = start
+    sent = 0
+    while True:
+        arrival += rng.expovariate(rate)
+        if arrival - start > duration:
+            break
+        await asyncio.sleep(max(0.0, arrival - time.monotonic()))
+        item = mix[sent % len(mix)]
+        tasks.append(asyncio.create_task(send(item, sent // len(mix), arrival)))
+        sent += 1
+
+    await asyncio.gather(*tasks)
+    elapsed = time.monotonic() - start
+    return {endpoint: endpoint_stats.report(elapsed) for endpoint, endpoint_stats in stats.items()}
+
+
+async def wait_until_healthy(client: httpx.AsyncClient, process: subprocess.Popen):
+    while True:
+        if process.poll() is not None:
+            raise RuntimeError("Application exited during startup")
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+
+
+@asynccontextmanager
+async def local_service(args) -> AsyncIterator[str]:
+    """
+    Run the app with uvicorn in a subprocess, wired to the local stand-ins.
+    """
+    with FakeOpenAIServer(
+        embedding_latency_ms=args.embedding_latency_ms,
+        chat_latency_ms=args.chat_latency_ms,
+    ) as openai_server:
+        async with disposable_postgres(args.postgres_url) as database_url:
+            configure_environment(openai_server.url, database_url)
+            env = dict(
+                os.environ,
+                DB_POOL_SIZE=str(args.db_pool_size),
+                DB_MAX_OVERFLOW=str(args.db_max_overflow),
+            )
+            if args.embedder_backend:
+                env["EMBEDDER_BACKEND"] = args.embedder_backend
+            process = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "acontroller.app.main:app",
+                 "--port", str(args.port), "--log-level", "warning"],
+                env=env,
+            )
+            url = f"http://127.0.0.1:{args.port}"
+            try:
+                async with httpx.AsyncClient(base_url=url) as client:
+                    await wait_until_healthy(client, process)
+                yield url
+            finally:
+                process.terminate()
+                process.wait()
+
+
+async def run(args) -> dict:
+    mix = load_mix(args.mix)
+    async with (
+        local_service(args) if args.postgres_url else _target(args.target)
+    ) as url:
+        limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=None)
+        async with httpx.AsyncClient(
+            base_url=url, limits=limits, timeout=args.timeout
+        ) as client:
+            endpoints = await replay(client, mix, args.rate, args.duration, args.seed)
+    return {
+        "parameters": {
+            key: value for key, value in vars(args).items() if key != "postgres_url"
+        },
+        "endpoints": endpoints,
+    }
+
+
+@asynccontextmanager
+async def _target(url: str) -> AsyncIterator[str]:
+    yield url
+
+
+def print_report(report: dict):
+    print(f"{'endpoint':<36} {'sent':>6} {'rps':>7} {'err%':>6} "
+          f"{'p50':>8} {'p95':>8} {'p99':>8} {'pool p95':>9}")
+    for endpoint, stats in sorted(report["endpoints"].items()):
+        latency = stats.get("latency_ms", {})
+        pool_wait = stats.get("db_pool_wait_ms", {})
+        print(
+            f"{endpoint:<36} {stats['sent']:>6} {stats['throughput_per_s']:>7.1f} "
+            f"{stats['error_rate'] * 100:>5.1f}% {latency.get('p50', 0):>8.0f} "
+            f"{latency.get('p95', 0):>8.0f} {latency.get('p99', 0):>8.0f} "
+            f"{pool_wait.get('p95', 0):>9.1f}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mix", required=True, help="JSONL file of requests to replay")
+    parser.add_argument("--rate", type=float, default=10, help="Arrivals per second")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds of arrivals")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--target", help="Base URL of a running service")
+    target.add_argument("--postgres-url",
+                        help="Start the app locally with a temporary database on this server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db-pool-size", type=int, default=10)
+    parser.add_argument("--db-max-overflow", type=int, default=20)
+    parser.add_argument("--embedding-latency-ms", type=float, default=50)
+    parser.add_argument("--embedder-backend", default=None,
+                        help="Override the embedder backend, e.g. 'local' to skip the fake OpenAI embeddings")
+    parser.add_argument("--chat-latency-ms", type=float, default=2000)
+    parser.add_argument("--max-connections", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Save the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,397 @@
+"""
+Offline benchmark suite of the Article Controller.
+
+    python -m benchmarks.run --output bench.json [--postgres-url URL]
+        [--baseline benchmarks/baseline.json] [--save-baseline]
+
+Benchmarks needing Postgres (ingest, end-to-end vector_search) run only with
+--postgres-url, they create and drop a temporary database on that server.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+import yaml
+
+from benchmarks.standins import (
+    FakeOpenAIServer,
+    configure_environment,
+    disposable_postgres,
+    fake_embedding,
+    running_app,
+)
+
+PUBLIC_CONFIG_PATH = (
+    Path(__file__).parent.parent / "acontroller" / "app" / "config" / "public_config.yaml"
+)
+
+WORDS = (
+    "инфляция ставка банк кредит рынок нефть рубль экспорт бюджет доходы спрос "
+    "предложение занятость зарплата ипотека депозит платежи валюта цены риск"
+).split()
+
+
+def random_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    quantiles = statistics.quantiles(samples, n=100) if len(samples) > 1 else samples * 99
+    return {
+        "p50": quantiles[49],
+        "p95": quantiles[94],
+        "p99": quantiles[98],
+        "mean": statistics.fmean(samples),
+    }
+
+
+def latency_metrics(prefix: str, samples: List[float]) -> Dict[str, dict]:
+    return {
+        f"{prefix}.{name}_ms": {"value": value * 1000, "unit": "ms", "better": "lower"}
+        for name, value in percentiles(samples).items()
+    }
+
+
+async def timed(repeats: int, call: Callable[[], Awaitable]) -> List[float]:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_tokenizer(rng: random.Random) -> Dict[str, dict]:
+    """
+    Cost of trim_prompt_to_tokens for prompt sizes seen in vector_search.
+    """
+    from acontroller.app.utils.utils import trim_prompt_to_tokens
+
+    metrics = {}
+    for words in (50, 2000, 50000):
+        prompt = random_text(rng, words)
+        trim_prompt_to_tokens(prompt, 100000, "gpt-4o")  # load the encoding
+        repeats = max(3, 20000 // words)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            trim_prompt_to_tokens(prompt, 8191, "text-embedding-3-large")
+        elapsed = (time.perf_counter() - start) / repeats
+        metrics[f"tokenizer.trim_{words}_words_ms"] = {
+            "value": elapsed * 1000, "unit": "ms", "better": "lower",
+        }
+    return metrics
+
+
+async def bench_filtered_search(
+    rng: random.Random, public_config: dict, corpus_sizes: List[int], repeats: int
+) -> Dict[str, dict]:
+    """
+    Latency of QdrantManager.search_similar with an id filter as the corpus grows.
+    """
+    from acontroller.app.services.vector_store import QdrantManager
+
+    dimensions = public_config["embedding_model"]["dimensions"]
+    metrics = {}
+    for corpus_size in corpus_sizes:
+        manager = QdrantManager(
+            {
+                "qdrant_url": ":memory:",
+                "qdrant_port": None,
+                "model": {"dimensions": dimensions},
+                "search": {
+                    "collection_name": f"bench_{corpus_size}",
+                    "distance_metric": public_config["rag_search"]["distance_metric"],
+                },
+            }
+        )
+        await manager.init_collection()
+        vectors = np.random.default_rng(corpus_size).standard_normal(
+            (corpus_size, dimensions)
+        )
+        for start in range(0, corpus_size, 1000):
+            await manager.store_embeddings([
+                (i, vectors[i].tolist(), {"id": i}, None)
+                for i in range(start, min(start + 1000, corpus_size))
+            ])
+
+        # Date filters of vector_search usually leave about a tenth of the corpus
+        filter_ids = rng.sample(range(corpus_size), max(1, corpus_size // 10))
+        query = fake_embedding(random_text(rng, 10), dimensions).tolist()
+        samples = await timed(
+            repeats,
+            lambda: manager.search_similar(vector=query, top_k=5, filter_ids=filter_ids),
+        )
+        metrics.update(latency_metrics(f"filtered_search.corpus_{corpus_size}", samples))
+    return metrics
+
+
+def matryoshka_like_vectors(rng: np.random.Generator, count: int, dimensions: int) -> np.ndarray:
+    """
+    Synthetic stand-in for Matryoshka embeddings: clustered vectors whose variance
+    decays along the dimensions, so leading dimensions carry most of the similarity.
+    """
+    scale = 1 / np.sqrt(np.arange(1, dimensions + 1))
+    centers = rng.standard_normal((max(1, count // 50), dimensions))
+    vectors = centers[rng.integers(0, len(centers), count)] + 0.5 * rng.standard_normal(
+        (count, dimensions)
+    )
+    return vectors * scale
+
+
+async def bench_matryoshka(
+    public_config: dict,
+    corpus_sizes: List[int],
+    repeats: int,
+    top_k: int = 10,
+    vectors_path: Optional[str] = None,
+) -> Dict[str, dict]:
+    """
+    Recall and latency of two-stage (short prefix + full rescoring) search against
+    single-vector search on the full embedding. Recall@top_k is measured against the
+    exact full-vector ranking. With vectors_path (.npy of real embeddings) the first
+    corpus_size rows are indexed and queried, otherwise synthetic vectors are used.
+    """
+    from acontroller.app.services.vector_store import QdrantManager
+
+    config = public_config["rag_search"]["matryoshka"]
+    dimensions = public_config["embedding_model"]["dimensions"]
+    rng = np.random.default_rng(0)
+    real_vectors = np.load(vectors_path) if vectors_path else None
+    metrics = {}
+    for corpus_size in corpus_sizes:
+        if real_vectors is not None:
+            vectors = real_vectors[:corpus_size]
+            dimensions = vectors.shape[1]
+        else:
+            vectors = matryoshka_like_vectors(rng, corpus_size, dimensions)
+        queries = vectors[rng.choice(len(vectors), min(repeats, len(vectors)), replace=False)]
+        queries = queries + 0.1 * rng.standard_normal(queries.shape) * queries.std(axis=0)
+
+        managers = {}
+        for name, matryoshka in (
+            ("full", None),
+            ("two_stage", {**config, "enabled": True}),
+        ):
+            manager = QdrantManager(
+                {
+                    "qdrant_url": ":memory:",
+                    "qdrant_port": None,
+                    "model": {"dimensions": dimensions},
+                    "search": {
+                        "collection_name": f"bench_matryoshka_{name}_{corpus_size}",
+                        "distance_metric": public_config["rag_search"]["distance_metric"],
+                    },
+                    "matryoshka": matryoshka,
+                }
+            )
+            await manager.init_collection()
+            for start in range(0, corpus_size, 1000):
+                await manager.store_embeddings([
+                    (i, vectors[i].tolist(), {"id": i}, None)
+                    for i in range(start, min(start + 1000, len(vectors)))
+                ])
+            managers[name] = manager
+
+        # Exact ranking by the full vector
+        normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        recalls = []
+        for query in queries:
+            exact = set(np.argsort(-(normalized @ query))[:top_k].tolist())
+            found = await managers["two_stage"].search_similar(vector=query.tolist(), top_k=top_k)
+            recalls.append(len(exact & {point["id"] for point in found}) / top_k)
+        # Recall on synthetic vectors only checks the search path, it says nothing about
+        # how much of the ranking the short prefix of real embeddings preserves
+        recall_name = f"recall_at_{top_k}" if real_vectors is not None else f"synthetic_recall_at_{top_k}"
+        metrics[f"matryoshka.corpus_{corpus_size}.{recall_name}"] = {
+            "value": statistics.fmean(recalls), "unit": "ratio", "better": "higher",
+        }
+
+        for name, manager in managers.items():
+            samples = []
+            for query in queries:
+                start = time.perf_counter()
+                await manager.search_similar(vector=query.tolist(), top_k=top_k)
+                samples.append(time.perf_counter() - start)
+            metrics.update(latency_metrics(f"matryoshka.corpus_{corpus_size}.{name}", samples))
+    return metrics
+
+
+def news_article(rng: random.Random, index: int) -> dict:
+    published = datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=index)
+    return {
+        "publication_datetime": published.isoformat(),
+        "url": f"https://t.me/bench/{index}",
+        "text": random_text(rng, 120),
+        "source_name": rng.choice(["РИА Новости", "Интерфакс", "ТАСС"]),
+        "news_id": f"bench_{index}",
+        "title": random_text(rng, 6),
+    }
+
+
+async def bench_service(
+    rng: random.Random, client, articles: int, concurrency: int, repeats: int
+) -> Dict[str, dict]:
+    """
+    Ingest throughput and end-to-end vector_search latency through the HTTP API.
+    """
+    metrics = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def create(index: int):
+        async with semaphore:
+            response = await client.post(
+                "/api/v1/news/articles", json=news_article(rng, index)
+            )
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(create(index) for index in range(articles)))
+    metrics["ingest.news_articles_per_s"] = {
+        "value": articles / (time.perf_counter() - start),
+        "unit": "1/s",
+        "better": "higher",
+    }
+
+    for queries_count, raw_return in ((1, True), (1, False), (3, False)):
+        body = {
+            "query_text": random_text(rng, 12),
+            "queries_count": queries_count,
+            "top_k": 5,
+            "raw_return": raw_return,
+        }
+
+        async def search():
+            response = await client.post("/api/v1/vectors/news", json=body)
+            response.raise_for_status()
+
+        samples = await timed(repeats, search)
+        name = f"vector_search.news_q{queries_count}_{'raw' if raw_return else 'llm'}"
+        metrics.update(latency_metrics(name, samples))
+    return metrics
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Metrics worse than the baseline by more than the tolerance.
+    """
+    regressions = []
+    for name, metric in results["metrics"].items():
+        reference = baseline["metrics"].get(name)
+        if reference is None or reference["value"] == 0:
+            continue
+        change = (metric["value"] - reference["value"]) / reference["value"]
+        if metric["better"] == "higher":
+            change = -change
+        status = "REGRESSION" if change > tolerance else "ok"
+        print(
+            f"{status:>10}  {name:<48} {reference['value']:>12.3f} -> "
+            f"{metric['value']:>12.3f} {metric['unit']} ({change:+.1%} worse)"
+        )
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    with open(PUBLIC_CONFIG_PATH) as f:
+        public_config = yaml.safe_load(f)
+
+    metrics: Dict[str, dict] = {}
+    metrics.update(bench_tokenizer(rng))
+    metrics.update(
+        await bench_filtered_search(rng, public_config, args.corpus_sizes, args.repeats)
+    )
+    metrics.update(
+        await bench_matryoshka(
+            public_config, args.corpus_sizes, args.repeats, vectors_path=args.matryoshka_vectors
+        )
+    )
+
+    if args.postgres_url:
+        with FakeOpenAIServer(
+            embedding_latency_ms=args.embedding_latency_ms,
+            chat_latency_ms=args.chat_latency_ms,
+            dimensions=public_config["embedding_model"]["dimensions"],
+        ) as openai_server:
+            async with disposable_postgres(args.postgres_url) as database_url:
+                configure_environment(openai_server.url, database_url)
+                async with running_app() as (_, client):
+                    metrics.update(
+                        await bench_service(
+                            rng, client, args.articles, args.concurrency, args.repeats
+                        )
+                    )
+    else:
+        print("--postgres-url not given, skipping ingest and vector_search benchmarks")
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "parameters": {
+            key: value for key, value in vars(args).items()
+            if key not in ("postgres_url", "output", "baseline", "save_baseline", "matryoshka_vectors")
+        },
+        "metrics": metrics,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--baseline", default=str(Path(__file__).parent / "baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Allowed relative slowdown against the baseline")
+    parser.add_argument("--postgres-url", default=None,
+                        help="postgresql+asyncpg:// URL of a server for temporary databases")
+    parser.add_argument("--corpus-sizes", type=lambda v: [int(x) for x in v.split(",")],
+                        default=[1000, 5000, 20000])
+    parser.add_argument("--matryoshka-vectors", default=None,
+                        help=".npy file of real embeddings for the two-stage search benchmark")
+    parser.add_argument("--articles", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=30)
+    parser.add_argument("--embedding-latency-ms", type=float, default=50)
+    parser.add_argument("--chat-latency-ms", type=float, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    results = asyncio.run(run(args))
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"Results saved to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not Path(args.baseline).exists():
+        print(f"No baseline at {args.baseline}, run with --save-baseline to store one")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
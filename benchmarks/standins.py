@@ -0,0 +1,167 @@
+"""
+Local stand-ins for the external services of the Article Controller:
+a fake OpenAI-compatible server, in-memory Qdrant and a disposable Postgres database.
+"""
+import asyncio
+import hashlib
+import os
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, Tuple
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+
+def fake_embedding(text: str, dimensions: int) -> np.ndarray:
+    """
+    Deterministic unit vector of the text.
+    """
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimensions)
+    return vector / np.linalg.norm(vector)
+
+
+def create_fake_openai_app(
+    embedding_latency_ms: float, chat_latency_ms: float, dimensions: int
+) -> FastAPI:
+    """
+    Minimal OpenAI-compatible API: /v1/embeddings and /v1/chat/completions
+    with configurable latency.
+    """
+    app = FastAPI()
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        await asyncio.sleep(embedding_latency_ms / 1000)
+        size = body.get("dimensions") or dimensions
+        tokens = sum(len(item) // 4 + 1 for item in inputs)
+        return {
+            "object": "list",
+            "model": body["model"],
+            "data": [
+                {
+                    "object": "embedding",
+                    "index": index,
+                    "embedding": fake_embedding(item, size).tolist(),
+                }
+                for index, item in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        await asyncio.sleep(chat_latency_ms / 1000)
+        prompt_tokens = sum(len(m["content"]) // 4 + 1 for m in body["messages"])
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "Тестовый ответ."},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": 4,
+                "total_tokens": prompt_tokens + 4,
+            },
+        }
+
+    return app
+
+
+class FakeOpenAIServer:
+    """
+    Runs the fake OpenAI API with uvicorn in a background thread.
+    """
+
+    def __init__(
+        self,
+        embedding_latency_ms: float = 50,
+        chat_latency_ms: float = 500,
+        dimensions: int = 3072,
+    ):
+        app = create_fake_openai_app(embedding_latency_ms, chat_latency_ms, dimensions)
+        self.server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning")
+        )
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        port = self.server.servers[0].sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/v1/"
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+@asynccontextmanager
+async def disposable_postgres(admin_url: str) -> AsyncIterator[str]:
+    """
+    Create a temporary database on the Postgres server and drop it afterwards.
+
+    :param admin_url: SQLAlchemy asyncpg URL of a database with CREATE DATABASE rights
+    :return: URL of the temporary database
+    """
+    name = f"acontroller_bench_{uuid.uuid4().hex[:8]}"
+    admin_engine = create_async_engine(admin_url, isolation_level="AUTOCOMMIT")
+    async with admin_engine.connect() as conn:
+        await conn.execute(text(f'CREATE DATABASE "{name}"'))
+    try:
+        yield make_url(admin_url).set(database=name).render_as_string(hide_password=False)
+    finally:
+        async with admin_engine.connect() as conn:
+            await conn.execute(text(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)'))
+        await admin_engine.dispose()
+
+
+def configure_environment(openai_url: str, database_url: Optional[str]):
+    """
+    Point the application settings at the stand-ins, must run before the app is imported.
+    """
+    os.environ["OPENAI_API_KEY"] = "sk-benchmark"
+    os.environ["OPENAI_API_BASE"] = openai_url
+    os.environ["OPENAI_BASE_URL"] = openai_url
+    os.environ["QDRANT_URL"] = ":memory:"
+    if database_url is not None:
+        os.environ["DATABASE_URL"] = database_url
+
+
+@asynccontextmanager
+async def running_app() -> AsyncIterator[Tuple[FastAPI, "httpx.AsyncClient"]]:
+    """
+    Start the application with its lifespan and an in-process HTTP client.
+    """
+    import httpx
+
+    from acontroller.app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://acontroller", timeout=120
+        ) as client:
+            yield app, client
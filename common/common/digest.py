@@ -0,0 +1,38 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+
+
+class DigestCreate(BaseModel):
+    start_datetime: datetime = Field(..., description="Начало периода дайджеста")
+    end_datetime: datetime = Field(..., description="Конец периода дайджеста (не включительно)")
+    title: Optional[str] = Field(None, description="Заголовок дайджеста")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "start_datetime": "2025-04-11T00:00:00Z",
+                "end_datetime": "2025-04-12T00:00:00Z",
+                "title": "Дайджест новостей за 11 апреля 2025",
+            }
+        }
+
+
+class Digest(BaseModel):
+    id: int = Field(..., description="Id дайджеста в базе данных")
+    start_datetime: datetime = Field(..., description="Начало периода дайджеста (UTC)")
+    end_datetime: datetime = Field(..., description="Конец периода дайджеста (UTC)")
+    s3_url: Optional[str] = Field(None, description="Ссылка на выгруженный дайджест")
+    article_ids: Optional[List[str]] = Field(None, description="Id новостей, вошедших в дайджест")
+    title: Optional[str] = Field(None, description="Заголовок дайджеста")
+    body: str = Field(..., description="Текст дайджеста")
+
+    class Config:
+        from_attributes = True
+
+
+class DigestFilter(BaseModel):
+    skip: int = Field(default=0, ge=0, description="Number of records to skip for pagination")
+    limit: int = Field(default=20, gt=0, le=100, description="Maximum number of records to return")
+    start_date: Optional[datetime] = Field(default=None, description="Digests ending after this date")
+    end_date: Optional[datetime] = Field(default=None, description="Digests starting before this date")
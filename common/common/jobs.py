@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+from typing import Any, Optional
+from datetime import datetime
+
+
+class SearchJob(BaseModel):
+    id: str = Field(..., description="Id задачи")
+    route: str = Field(..., description="Коллекция поиска: science, news или all; digest - построение дайджеста")
+    status: str = Field(..., description="queued, running, done или failed")
+    result: Optional[Any] = Field(None, description="Ответ поиска в формате синхронного /vectors или построенный дайджест")
+    error: Optional[str] = Field(None, description="Причина ошибки для status=failed")
+    attempts: int = Field(0, description="Число запусков задачи воркерами")
+    created_at: datetime = Field(..., description="Время постановки в очередь")
+    started_at: Optional[datetime] = Field(None, description="Время последнего запуска")
+    finished_at: Optional[datetime] = Field(None, description="Время завершения")
+    expires_at: datetime = Field(..., description="После этого времени задача и результат удаляются")
+
+    class Config:
+        from_attributes = True
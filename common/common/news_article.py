@@ -1,4 +1,4 @@
-from pydantic import BaseModel, HttpUrl, Field
+from pydantic import BaseModel, HttpUrl, Field, field_validator
 from typing import List, Optional
 from datetime import datetime
 
@@ -18,6 +18,9 @@ class NewsArticle(BaseModel):
     persons: Optional[List[str]] = Field(None, description="Лица, упомянутые в новости")
     title: Optional[str] = Field(None, description="Заголовок новости")
     topic: Optional[str] = Field(None, description="Тема новости")
+    canonical_id: Optional[int] = Field(
+        None, description="Id исходной новости, если эта новость - её почти-дубликат"
+    )
 
     class Config:
         validate_assignment = True
@@ -57,5 +60,29 @@ class NewsArticleCreate(BaseModel):
         from_attributes = True
 
 
-class NewsArticleUpdate(NewsArticle):
-    pass
+class NewsArticleUpdate(BaseModel):
+    """
+    Частичное обновление новости: передаются только изменяемые поля
+    """
+    publication_datetime: Optional[datetime] = Field(None, description="Дата и время публикации")
+    url: Optional[str] = Field(None, description="Ссылка на новость")
+    text: Optional[str] = Field(None, description="Текст новости")
+    source_name: Optional[str] = Field(None, description="Название источника")
+    news_id: Optional[str] = Field(
+        None, description="ID новости (например, ID сообщения в ТГ или ID на сайте)"
+    )
+
+    tags: Optional[List[str]] = Field(
+        None, description="Теги новости (может быть несколько)"
+    )
+    persons: Optional[List[str]] = Field(None, description="Лица, упомянутые в новости")
+    title: Optional[str] = Field(None, description="Заголовок новости")
+    topic: Optional[str] = Field(None, description="Тема новости")
+
+    @field_validator("publication_datetime", "url", "text", "source_name", "news_id")
+    @classmethod
+    def not_null(cls, value):
+        # Поле можно не передавать, но нельзя обнулить: в БД оно NOT NULL
+        if value is None:
+            raise ValueError("поле не может быть null")
+        return value
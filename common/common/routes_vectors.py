@@ -8,12 +8,21 @@ class VectorSearch(BaseModel):
                                                 "или готовый сформулированный ответ от OpenAI")
     query_text: str = Field(..., description="Текст запроса")
     sphere: Optional[str] = Field(None, description="analysis or science")
+    raw_payload: bool = Field(False, description="Для raw_return: добавить title, url и date "
+                                                 "каждой статьи (из payload Qdrant, без запросов к БД)")
     queries_count: int = Field(1, gt=0, description="Количество запросов с учетом перефразировок")
     top_k: int = Field(5, gt=0, description="Количество релевантных points")
     source_name: Optional[str] = Field(None, description="Источник")
     start_date: Optional[datetime] = Field(None, description="Дата начала")
     end_date: Optional[datetime] = Field(None, description="Дата конца")
-    relevance: Optional[float] = Field(None, description="Релевантность научной статьи")
+    relevance: Optional[float] = Field(None, description="Минимальная близость (score) найденных статей")
+    score_gap: Optional[float] = Field(None, gt=0, description="Адаптивный top_k: отбросить статьи после "
+                                                               "падения score больше чем на score_gap")
+    min_relevance_score: Optional[float] = Field(None, description="Минимальный relevance_score "
+                                                                   "научной статьи")
+    latency_budget_ms: Optional[int] = Field(
+        None, gt=0, description="Бюджет времени ответа, мс (или заголовок X-Latency-Budget-Ms)"
+    )
 
     class Config:
         schema_extra = {
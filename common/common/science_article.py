@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl, field_validator
 from typing import List, Optional
 from datetime import datetime
 
@@ -107,4 +107,49 @@ class ScienceArticleCreate(BaseModel):
         }
 
 class ScienceArticleUpdate(BaseModel):
-    pass
\ No newline at end of file
+    """
+    Частичное обновление статьи: передаются только изменяемые поля
+    """
+    title: Optional[str] = Field(None, description="Заголовок статьи")
+    sphere: Optional[str] = Field(None, description="Sphere - analysis or science")
+    url: Optional[str] = Field(None, description="URL статьи")
+    file_path: Optional[str] = Field(None, description="Путь к локальному PDF-файлу статьи")
+    section: Optional[str] = Field(None, description="Раздел или категория статьи")
+    published_date: Optional[datetime] = Field(None, description="Дата публикации")
+    authors: Optional[List[str]] = Field(None, description="Список авторов")
+    affiliation: Optional[str] = Field(None, description="Аффилиация (организация авторов)")
+    source_name: Optional[str] = Field(None, description="Название источника")
+
+    # Summary
+    annotation: Optional[str] = Field(None, description="Аннотация")
+    policy_conclusions: Optional[str] = Field(None, description="Выводы для политики")
+    research_motivation: Optional[str] = Field(None, description="Мотивация исследования")
+    contribution: Optional[str] = Field(None, description="Вклад исследования")
+    research_question: Optional[str] = Field(None, description="Основной исследовательский вопрос")
+    data_description: Optional[str] = Field(None, description="Описание данных")
+    model_description: Optional[str] = Field(None, description="Описание модели")
+    results: Optional[str] = Field(None, description="Основные результаты исследования")
+    critique: Optional[str] = Field(None, description="Критический анализ")
+    relevance_explanation: Optional[str] = Field(None, description="Объяснение релевантности")
+    # Полный текст summary
+    full_summary: Optional[str] = Field(None, description="Полный текст саммари статьи")
+
+    relevance_score: Optional[float] = Field(None, description="Оценка релевантности")
+    downloads_count: Optional[int] = Field(None, description="Количество скачиваний")
+    views_count: Optional[int] = Field(None, description="Количество просмотров")
+    abstract: Optional[str] = Field(None, description="Краткое содержание статьи")
+    categories: Optional[List[str]] = Field(None, description="Категории (теги)")
+
+    @field_validator(
+        "title", "sphere", "url", "file_path", "source_name", "annotation",
+        "policy_conclusions", "research_motivation", "contribution", "research_question",
+        "data_description", "model_description", "results", "critique",
+        "relevance_explanation", "full_summary", "relevance_score",
+    )
+    @classmethod
+    def not_null(cls, value):
+        # Поле можно не передавать, но нельзя обнулить: в БД оно NOT NULL
+        # (full_summary эмбеддится)
+        if value is None:
+            raise ValueError("поле не может быть null")
+        return value
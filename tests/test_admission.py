@@ -0,0 +1,103 @@
+"""
+AdmissionLimiter admits max_concurrency requests, queues up to max_queue more in
+arrival order and sheds the rest: 429 when the queue is full, 503 when the wait times
+out, both with Retry-After. Slots are released when a request fails.
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from acontroller.app.utils.admission import AdmissionLimiter
+
+limiter_number = 0
+
+
+def make_limiter(max_concurrency=1, max_queue=1, queue_timeout=1.0) -> AdmissionLimiter:
+    # Metrics are labelled by name, every limiter gets its own
+    global limiter_number
+    limiter_number += 1
+    return AdmissionLimiter(f"test/{limiter_number}", max_concurrency, max_queue, queue_timeout)
+
+
+async def hold(limiter: AdmissionLimiter, release: asyncio.Event, admitted: list, name: str):
+    async with limiter.admit():
+        admitted.append(name)
+        await release.wait()
+
+
+def test_full_queue_is_rejected_with_429():
+    async def run():
+        limiter = make_limiter(max_concurrency=1, max_queue=1)
+        release = asyncio.Event()
+        admitted = []
+        tasks = [asyncio.create_task(hold(limiter, release, admitted, name)) for name in "ab"]
+        await asyncio.sleep(0.01)
+        queued = limiter.queued
+        with pytest.raises(HTTPException) as rejected:
+            async with limiter.admit():
+                pass
+        release.set()
+        await asyncio.gather(*tasks)
+        return limiter, queued, rejected.value
+
+    limiter, queued, rejected = asyncio.run(run())
+
+    assert queued == 1
+    assert rejected.status_code == 429
+    assert int(rejected.headers["Retry-After"]) >= 1
+    assert limiter.rejected == {"queue_full": 1, "queue_timeout": 0}
+    assert limiter.in_flight == 0 and limiter.queued == 0
+
+
+def test_queue_timeout_is_rejected_with_503():
+    async def run():
+        limiter = make_limiter(max_concurrency=1, max_queue=1, queue_timeout=0.05)
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(limiter, release, [], "a"))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as rejected:
+            async with limiter.admit():
+                pass
+        release.set()
+        await holder
+        return limiter, rejected.value
+
+    limiter, rejected = asyncio.run(run())
+
+    assert rejected.status_code == 503
+    assert int(rejected.headers["Retry-After"]) >= 1
+    assert limiter.rejected == {"queue_full": 0, "queue_timeout": 1}
+    assert limiter.queued == 0
+
+
+def test_slot_is_released_on_exception():
+    async def run():
+        limiter = make_limiter(max_concurrency=1, max_queue=0)
+        with pytest.raises(ValueError):
+            async with limiter.admit():
+                raise ValueError("failed")
+        # The only slot is free again, an empty queue would reject at once otherwise
+        async with limiter.admit():
+            return limiter.in_flight
+
+    assert asyncio.run(run()) == 1
+
+
+def test_released_slot_goes_to_queued_request():
+    async def run():
+        limiter = make_limiter(max_concurrency=1, max_queue=2)
+        admitted = []
+        released = asyncio.Event()
+        released.set()
+        async with limiter.admit():
+            queued = asyncio.create_task(hold(limiter, released, admitted, "queued"))
+            # Queued, its wait for the semaphore starts on the next loop iteration
+            await asyncio.sleep(0)
+        # The slot is free and a newcomer arrives before the queued request waits
+        async with limiter.admit():
+            admitted.append("newcomer")
+        await queued
+        return admitted
+
+    assert asyncio.run(run()) == ["queued", "newcomer"]
@@ -0,0 +1,55 @@
+"""
+NearDuplicateIndex finds reposts of an indexed news text with small edits, ignores
+unrelated texts and the article itself, and forgets articles outside its window.
+"""
+from datetime import datetime, timedelta, timezone
+
+from acontroller.app.services.dedup import NearDuplicateIndex
+
+TEXT = (
+    "The central bank raised its key interest rate by half a percentage point on Friday, "
+    "citing persistent inflation in services and a tight labour market, and signalled "
+    "that further increases remain possible if price growth does not slow this autumn."
+)
+REPOST = TEXT.replace("on Friday", "on Friday afternoon") + " Read more at https://example.com/a"
+OTHER = (
+    "Researchers have described a new species of frog found in the cloud forests of the "
+    "northern Andes, noting its unusually loud call and bright orange markings."
+)
+NOW = datetime(2025, 3, 1, tzinfo=timezone.utc)
+
+
+def test_repost_is_found_and_unrelated_text_is_not():
+    index = NearDuplicateIndex()
+    index.add(1, index.signature(TEXT), NOW)
+
+    duplicate = index.find_duplicate(index.signature(REPOST))
+
+    assert duplicate is not None
+    assert duplicate[0] == 1
+    assert duplicate[1] >= index.threshold
+    assert index.find_duplicate(index.signature(OTHER)) is None
+
+
+def test_article_itself_is_excluded():
+    index = NearDuplicateIndex()
+    signature = index.signature(TEXT)
+    index.add(1, signature, NOW)
+
+    assert index.find_duplicate(signature) == (1, 1.0)
+    assert index.find_duplicate(signature, exclude=1) is None
+
+
+def test_removed_and_expired_articles_are_forgotten():
+    index = NearDuplicateIndex(window_days=7)
+    signature = index.signature(TEXT)
+    index.add(1, signature, NOW - timedelta(days=8))
+    index.add(2, signature, NOW.replace(tzinfo=None))
+    index.prune(NOW)
+
+    assert index.find_duplicate(signature) == (2, 1.0)
+
+    index.remove(2)
+
+    assert index.find_duplicate(signature) is None
+    assert not index._buckets
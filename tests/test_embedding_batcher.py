@@ -0,0 +1,91 @@
+"""
+EmbeddingBatcher embeds concurrent single texts with one call: every caller gets its
+own vector, the batch runs with the most urgent priority, a failure reaches every caller.
+"""
+import asyncio
+
+import numpy as np
+import pytest
+
+from acontroller.app.services.embedders.openai_embedder import EmbeddingBatcher
+from acontroller.app.services.rate_limiter import Priority, current_priority
+
+
+class FakeEmbedBatch:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+
+    async def __call__(self, texts, priority):
+        self.calls.append((texts, priority))
+        if self.error is not None:
+            raise self.error
+        return [np.array([len(text)], dtype=np.float32) for text in texts]
+
+
+async def submit(batcher: EmbeddingBatcher, text: str, priority: Priority):
+    current_priority.set(priority)
+    return await batcher.submit(text)
+
+
+def test_concurrent_texts_share_one_call():
+    async def run():
+        embed_batch = FakeEmbedBatch()
+        batcher = EmbeddingBatcher(embed_batch, window_ms=20, max_batch_size=16)
+        vectors = await asyncio.gather(
+            submit(batcher, "a", Priority.REINDEX),
+            submit(batcher, "bb", Priority.INTERACTIVE),
+            submit(batcher, "ccc", Priority.INGEST),
+        )
+        return embed_batch.calls, vectors, batcher.histogram()
+
+    calls, vectors, histogram = asyncio.run(run())
+
+    assert calls == [(["a", "bb", "ccc"], Priority.INTERACTIVE)]
+    assert [vector[0] for vector in vectors] == [1, 2, 3]
+    assert histogram == {3: 1}
+
+
+def test_full_batch_is_sent_without_waiting():
+    async def run():
+        embed_batch = FakeEmbedBatch()
+        batcher = EmbeddingBatcher(embed_batch, window_ms=10_000, max_batch_size=2)
+        await asyncio.wait_for(asyncio.gather(
+            submit(batcher, "a", Priority.INTERACTIVE),
+            submit(batcher, "b", Priority.INTERACTIVE),
+        ), 1)
+        return embed_batch.calls
+
+    assert asyncio.run(run()) == [(["a", "b"], Priority.INTERACTIVE)]
+
+
+def test_cancelled_caller_is_left_out():
+    async def run():
+        embed_batch = FakeEmbedBatch()
+        batcher = EmbeddingBatcher(embed_batch, window_ms=20, max_batch_size=16)
+        cancelled = asyncio.create_task(submit(batcher, "a", Priority.INTERACTIVE))
+        kept = asyncio.create_task(submit(batcher, "bb", Priority.INTERACTIVE))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        return embed_batch.calls, await kept
+
+    calls, vector = asyncio.run(run())
+
+    assert calls == [(["bb"], Priority.INTERACTIVE)]
+    assert vector[0] == 2
+
+
+def test_failure_reaches_every_caller():
+    async def run():
+        batcher = EmbeddingBatcher(
+            FakeEmbedBatch(error=RuntimeError("failed")), window_ms=20, max_batch_size=16
+        )
+        return await asyncio.gather(
+            submit(batcher, "a", Priority.INTERACTIVE),
+            submit(batcher, "b", Priority.INTERACTIVE),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -0,0 +1,116 @@
+"""
+ListingCache answers unchanged polls with 304 and serves cached bodies until the next
+write of the table. Bodies that may predate the last write (a write during the query,
+a lagging read replica) are sent without validators and are not cached.
+"""
+import asyncio
+import time
+
+from starlette.requests import Request
+
+from acontroller.app.utils.http_cache import ListingCache
+
+
+def make_request(**headers) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/news/articles",
+        "headers": [
+            (name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()
+        ],
+    })
+
+
+class Renderer:
+    def __init__(self, lag=0.0, on_render=None):
+        self.lag = lag
+        self.on_render = on_render
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.on_render is not None:
+            self.on_render()
+        return f'["body {self.calls}"]'.encode(), self.lag
+
+
+def respond(cache: ListingCache, render: Renderer, **headers):
+    return asyncio.run(cache.respond(make_request(**headers), "news", "filters", render))
+
+
+def stale_modification(cache: ListingCache, table: str = "news"):
+    # A write long enough ago to be visible on any replica
+    cache.bump(table)
+    cache._modified[table] = time.time() - 60
+
+
+def test_unchanged_listing_is_not_modified():
+    cache = ListingCache()
+    stale_modification(cache)
+    render = Renderer()
+
+    first = respond(cache, render)
+    second = respond(cache, render, if_none_match=first.headers["etag"])
+    cached = respond(cache, render)
+
+    assert first.status_code == 200
+    assert second.status_code == 304
+    assert cached.body == first.body
+    assert render.calls == 1
+
+
+def test_write_invalidates_etag_and_body():
+    cache = ListingCache()
+    stale_modification(cache)
+    render = Renderer()
+    first = respond(cache, render)
+
+    stale_modification(cache)
+    second = respond(cache, render, if_none_match=first.headers["etag"])
+
+    assert second.status_code == 200
+    assert second.headers["etag"] != first.headers["etag"]
+    assert second.body == b'["body 2"]'
+
+
+def test_write_during_render_is_not_cached():
+    cache = ListingCache()
+    stale_modification(cache)
+    render = Renderer(on_render=lambda: stale_modification(cache))
+
+    first = respond(cache, render)
+    render.on_render = None
+    second = respond(cache, render)
+
+    assert "etag" not in first.headers
+    assert "last-modified" not in first.headers
+    assert render.calls == 2
+    assert "etag" in second.headers
+
+
+def test_body_from_lagging_replica_is_not_cached():
+    cache = ListingCache()
+    cache.bump("news")
+    # The replica may be up to 30 seconds behind the write just made
+    render = Renderer(lag=30.0)
+
+    first = respond(cache, render)
+    second = respond(cache, render)
+    render.lag = None
+    unknown_lag = respond(cache, render)
+
+    assert "etag" not in first.headers
+    assert "etag" not in second.headers
+    assert "etag" not in unknown_lag.headers
+    assert render.calls == 3
+
+
+def test_is_fresh():
+    cache = ListingCache()
+    stale_modification(cache)
+
+    assert cache.is_fresh("news", 0.0)
+    assert cache.is_fresh("news", 30.0)
+    assert not cache.is_fresh("news", 120.0)
+    assert not cache.is_fresh("news", None)
@@ -0,0 +1,76 @@
+"""
+ModelRateLimiter serves waiting calls by priority once the budget refills, and keeps
+the reserved share of the budget for interactive calls.
+"""
+import asyncio
+
+from acontroller.app.services.rate_limiter import ModelRateLimiter, Priority
+
+# 10 requests per second, waits in the tests stay short
+RPM = 600
+
+
+def test_waiting_calls_are_served_by_priority():
+    async def run():
+        limiter = ModelRateLimiter(rpm=RPM, tpm=1_000_000)
+        limiter.requests.level = 0
+        served = []
+
+        async def call(priority):
+            await limiter.acquire(1, priority)
+            served.append(priority)
+
+        # Queued in the reverse order of their priority
+        await asyncio.gather(*(
+            call(priority) for priority in (Priority.REINDEX, Priority.INGEST, Priority.INTERACTIVE)
+        ))
+        return served
+
+    assert asyncio.run(run()) == [Priority.INTERACTIVE, Priority.INGEST, Priority.REINDEX]
+
+
+def test_reserve_is_left_to_interactive_calls():
+    async def run():
+        limiter = ModelRateLimiter(rpm=60, tpm=1_000_000, reserve_ratio=0.5)
+        # Background calls use the budget down to the reserve without waiting
+        for _ in range(30):
+            await asyncio.wait_for(limiter.acquire(1, Priority.REINDEX), 0.1)
+
+        reindex = asyncio.create_task(limiter.acquire(1, Priority.REINDEX))
+        await asyncio.sleep(0.05)
+        reindex_waits = not reindex.done()
+        await asyncio.wait_for(limiter.acquire(1, Priority.INTERACTIVE), 0.1)
+        # One request per second refills, still below the reserve
+        reindex_still_waits = not reindex.done()
+        stats = limiter.stats()
+        reindex.cancel()
+        return reindex_waits, reindex_still_waits, stats
+
+    reindex_waits, reindex_still_waits, stats = asyncio.run(run())
+
+    assert reindex_waits
+    assert reindex_still_waits
+    assert stats["queued"] == 1
+    assert stats["requests_available"] < 30
+
+
+def test_oversized_call_fits_the_unreserved_budget():
+    async def run():
+        limiter = ModelRateLimiter(rpm=RPM, tpm=1000, reserve_ratio=0.2)
+        await asyncio.wait_for(limiter.acquire(5000, Priority.INTERACTIVE), 0.1)
+        return limiter.tokens.level
+
+    assert asyncio.run(run()) == 200
+
+
+def test_budget_follows_response_headers():
+    limiter = ModelRateLimiter(rpm=RPM, tpm=1000)
+    limiter.update_from_headers({
+        "x-ratelimit-limit-requests": "100",
+        "x-ratelimit-remaining-requests": "10",
+        "x-ratelimit-limit-tokens": "oops",
+    })
+
+    assert limiter.requests.capacity == 100
+    assert limiter.requests.level <= 10.1
+    assert limiter.tokens.capacity == 1000
@@ -0,0 +1,125 @@
+"""
+SingleFlight shares one computation between concurrent callers of a key: a cancelled
+waiter does not cancel it for the others, it is cancelled only when the last waiter
+leaves, and its result or exception reaches every waiter.
+"""
+import asyncio
+
+import pytest
+
+from acontroller.app.utils.single_flight import SingleFlight
+
+
+class Computation:
+    def __init__(self, result="result", error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+        self.cancelled = False
+
+    async def __call__(self):
+        self.calls += 1
+        self.started.set()
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def run():
+        flight = SingleFlight("test")
+        computation = Computation()
+        leader = asyncio.create_task(flight.run("key", computation))
+        await computation.started.wait()
+        follower = asyncio.create_task(flight.run("key", computation))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        computation.release.set()
+        result = await follower
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return flight, computation, result
+
+    flight, computation, result = asyncio.run(run())
+
+    assert result == "result"
+    assert computation.calls == 1
+    assert not computation.cancelled
+    assert len(flight) == 0
+
+
+def test_last_waiter_gone_cancels_computation():
+    async def run():
+        flight = SingleFlight("test")
+        computation = Computation()
+        waiters = [asyncio.create_task(flight.run("key", computation)) for _ in range(3)]
+        await computation.started.wait()
+
+        waiters[0].cancel()
+        await asyncio.sleep(0)
+        # Two waiters are left, the computation goes on
+        cancelled_early = computation.cancelled
+        for waiter in waiters[1:]:
+            waiter.cancel()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        # Checked inside the loop, asyncio.run cancels leftover tasks itself
+        return cancelled_early, results, computation.cancelled, len(flight)
+
+    cancelled_early, results, cancelled, flights = asyncio.run(run())
+
+    assert not cancelled_early
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+    assert cancelled
+    assert flights == 0
+
+
+def test_key_is_forgotten_after_cancellation():
+    async def run():
+        flight = SingleFlight("test")
+        first = Computation()
+        waiter = asyncio.create_task(flight.run("key", first))
+        await first.started.wait()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0)
+        first_cancelled = first.cancelled
+
+        # A new caller starts a new computation instead of awaiting the cancelled one
+        second = Computation(result="second")
+        second.release.set()
+        return first_cancelled, second, await flight.run("key", second)
+
+    first_cancelled, second, result = asyncio.run(run())
+
+    assert first_cancelled
+    assert result == "second"
+    assert second.calls == 1
+
+
+def test_exception_is_shared_with_all_waiters():
+    async def run():
+        flight = SingleFlight("test")
+        computation = Computation(error=ValueError("failed"))
+        waiters = [asyncio.create_task(flight.run("key", computation)) for _ in range(3)]
+        await computation.started.wait()
+        computation.release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        return flight, computation, results
+
+    flight, computation, results = asyncio.run(run())
+
+    assert computation.calls == 1
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len({id(result) for result in results}) == 1
+    assert len(flight) == 0
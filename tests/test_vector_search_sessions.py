@@ -0,0 +1,149 @@
+"""
+Vector search pipelines hold a database session only around their SQL stages:
+under concurrent searches with a slow LLM no session is open while the completion
+is awaited, so pool usage does not grow with LLM latency.
+"""
+import asyncio
+import contextvars
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from acontroller.app.routes import vectors
+from acontroller.app.utils.deadline import LatencyBudget
+from common.common.routes_vectors import VectorSearch
+
+CONCURRENT_SEARCHES = 16
+LLM_DELAY_S = 0.2
+
+search_id: contextvars.ContextVar[int] = contextvars.ContextVar("search_id")
+
+
+class SessionCounter:
+    def __init__(self):
+        self.open = 0
+        self.open_by_search = {}
+        self.peak_by_search = {}
+        self.open_during_completion = []
+
+    @asynccontextmanager
+    async def read_session(self):
+        search = search_id.get()
+        self.open += 1
+        self.open_by_search[search] = self.open_by_search.get(search, 0) + 1
+        self.peak_by_search[search] = max(
+            self.peak_by_search.get(search, 0), self.open_by_search[search]
+        )
+        try:
+            yield FakeSession()
+        finally:
+            self.open -= 1
+            self.open_by_search[search] -= 1
+
+
+class FakeResult:
+    def __init__(self, values):
+        self.values = values
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.values
+
+
+class FakeSession:
+    async def execute(self, stmt):
+        await asyncio.sleep(0.001)
+        if len(stmt.selected_columns) == 1:
+            # Filter stage: ids of matching articles
+            return FakeResult(list(range(1, 6)))
+        # Fetch stage: full rows
+        return FakeResult([
+            SimpleNamespace(
+                id=i, title=f"title {i}", text="text", full_summary="summary",
+                url=f"https://example.com/{i}", published_date=None, publication_datetime=None,
+            )
+            for i in range(1, 6)
+        ])
+
+
+class FakeEmbedder:
+    max_top_k = 100
+
+    async def get_embedding(self, text):
+        return np.ones(4)
+
+    async def search_similar(self, text, top_k, filter_ids, **kwargs):
+        return await self.search_by_vector(None, top_k, filter_ids)
+
+    async def search_by_vector(self, vector, top_k, filter_ids, **kwargs):
+        return [{"id": i, "score": 0.9 - i / 100} for i in filter_ids[:top_k]]
+
+
+def fake_request(counter: SessionCounter, all_waiting: asyncio.Event):
+    waiting = 0
+
+    async def create_completion(chat, max_tokens=None):
+        nonlocal waiting
+        counter.open_during_completion.append(counter.open_by_search[search_id.get()])
+        waiting += 1
+        if waiting == CONCURRENT_SEARCHES:
+            all_waiting.set()
+        await asyncio.sleep(LLM_DELAY_S)
+        return "answer"
+
+    rag = SimpleNamespace(
+        science_embedder=FakeEmbedder(),
+        news_embedder=FakeEmbedder(),
+        llm=SimpleNamespace(create_completion=create_completion),
+        generate_prompt=lambda: "prompt",
+        generate_rephrase_promt=lambda: "rephrase",
+    )
+    return SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(
+        rag=rag,
+        latency_budget=LatencyBudget(),
+        federated_score_floors={"news": 0.2, "science": 0.2},
+    )))
+
+
+@pytest.fixture
+def counter(monkeypatch):
+    counter = SessionCounter()
+    monkeypatch.setattr(vectors, "read_session", counter.read_session)
+    # tiktoken downloads its encodings, token limits are irrelevant here
+    monkeypatch.setattr(vectors, "trim_prompt_to_tokens", lambda text, *args, **kwargs: text)
+    return counter
+
+
+@pytest.mark.parametrize(
+    "search",
+    [vectors.science_search, vectors.news_search, vectors.all_collections_search],
+)
+def test_no_session_held_during_completion(counter, search):
+    async def run():
+        all_waiting = asyncio.Event()
+        request = fake_request(counter, all_waiting)
+
+        async def one_search(number: int):
+            search_id.set(number)
+            params = VectorSearch(query_text=f"query {number}", top_k=3)
+            return await search(request, params, LatencyBudget.start(None))
+
+        tasks = [asyncio.create_task(one_search(number)) for number in range(CONCURRENT_SEARCHES)]
+        # Every search is awaiting the slow completion at the same time
+        await asyncio.wait_for(all_waiting.wait(), 5)
+        open_while_all_wait = counter.open
+        answers = await asyncio.gather(*tasks)
+        return open_while_all_wait, answers
+
+    open_while_all_wait, answers = asyncio.run(run())
+
+    assert all(answer.startswith("answer") for answer in answers)
+    assert open_while_all_wait == 0
+    assert counter.open_during_completion == [0] * CONCURRENT_SEARCHES
+    # One session at a time per search: stages never nest or overlap
+    assert set(counter.peak_by_search.values()) == {1}
+    assert counter.open == 0
@@ -0,0 +1,138 @@
+"""
+Identical vector searches share one execution, but each request keeps its own latency
+budget counted from its arrival: a request whose budget runs out first gets the shared
+ranked sources without the LLM answer, the others still get the full answer.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from acontroller.app.routes import vectors
+from acontroller.app.utils.admission import AdmissionLimiter
+from acontroller.app.utils.deadline import LatencyBudget
+from acontroller.app.utils.single_flight import SingleFlight
+from common.common.routes_vectors import VectorSearch
+
+LLM_DELAY_S = 0.5
+
+
+class FakeResult:
+    def __init__(self, values):
+        self.values = values
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.values
+
+
+class FakeSession:
+    async def execute(self, stmt):
+        if len(stmt.selected_columns) == 1:
+            return FakeResult([1, 2, 3])
+        return FakeResult([
+            SimpleNamespace(
+                id=i, title=f"title {i}", text="text", full_summary="summary",
+                url=f"https://example.com/{i}", published_date=None, publication_datetime=None,
+            )
+            for i in (1, 2, 3)
+        ])
+
+
+@asynccontextmanager
+async def fake_read_session():
+    yield FakeSession()
+
+
+class FakeEmbedder:
+    max_top_k = 100
+
+    def __init__(self, delay_s: float = 0.0):
+        self.delay_s = delay_s
+
+    async def search_similar(self, text, top_k, filter_ids, **kwargs):
+        await asyncio.sleep(self.delay_s)
+        return [{"id": i, "score": 0.9 - i / 100} for i in filter_ids[:top_k]]
+
+
+def fake_request(embedder: FakeEmbedder):
+    completions = []
+
+    async def create_completion(chat, max_tokens=None):
+        completions.append(max_tokens)
+        await asyncio.sleep(LLM_DELAY_S)
+        return "answer"
+
+    rag = SimpleNamespace(
+        science_embedder=embedder,
+        llm=SimpleNamespace(create_completion=create_completion),
+        generate_prompt=lambda: "prompt",
+        generate_rephrase_promt=lambda: "rephrase",
+    )
+    request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(
+        rag=rag,
+        latency_budget=LatencyBudget(completion_min_s=0.0, completion_full_s=0.0),
+        vector_single_flight=SingleFlight("test"),
+        admission={"vectors/science": AdmissionLimiter(
+            f"test-vectors-{id(embedder)}", max_concurrency=4, max_queue=4, queue_timeout=1.0
+        )},
+    )))
+    return request, completions
+
+
+@pytest.fixture(autouse=True)
+def patched(monkeypatch):
+    monkeypatch.setattr(vectors, "read_session", fake_read_session)
+    # tiktoken downloads its encodings, token limits are irrelevant here
+    monkeypatch.setattr(vectors, "trim_prompt_to_tokens", lambda text, *args, **kwargs: text)
+
+
+def test_flight_key_ignores_budget():
+    assert vectors.flight_key("science", VectorSearch(query_text="query", latency_budget_ms=200)) \
+        == vectors.flight_key("science", VectorSearch(query_text=" query ", latency_budget_ms=None))
+
+
+def test_follower_gets_sources_within_its_own_budget():
+    async def run():
+        request, completions = fake_request(FakeEmbedder())
+
+        def one_search(budget_ms):
+            params = VectorSearch(query_text="query", top_k=3, latency_budget_ms=budget_ms)
+            return vectors.run_single_flight(request, "science", params, vectors.science_search)
+
+        leader = asyncio.create_task(one_search(None))
+        await asyncio.sleep(0.05)
+        follower = asyncio.create_task(one_search(200))
+        follower_answer = await follower
+        # The follower gave up waiting, the shared execution goes on for the leader
+        leader_done_early = leader.done()
+        return leader_done_early, follower_answer, await leader, completions
+
+    leader_done_early, follower_answer, leader_answer, completions = asyncio.run(run())
+
+    assert not leader_done_early
+    assert follower_answer["degraded"] is True
+    assert follower_answer["answer"] is None
+    assert [source["id"] for source in follower_answer["sources"]] == [1, 2, 3]
+    assert leader_answer.startswith("answer")
+    assert completions == [None]
+
+
+def test_budget_exceeded_before_sources():
+    async def run():
+        request, _ = fake_request(FakeEmbedder(delay_s=LLM_DELAY_S))
+        params = VectorSearch(query_text="query", top_k=3, latency_budget_ms=100)
+        with pytest.raises(HTTPException) as error:
+            await vectors.run_single_flight(request, "science", params, vectors.science_search)
+        # The abandoned execution is cancelled, its cleanup takes a few loop iterations
+        await asyncio.sleep(0.05)
+        return error.value.status_code, len(request.app.state.vector_single_flight)
+
+    status_code, flights = asyncio.run(run())
+
+    assert status_code == 504
+    assert flights == 0